@@ -3,25 +3,22 @@
 -- ========================================
 
 -- 1. Veículos que precisam de manutenção (rodaram mais de 5000km desde última)
+-- O km da última manutenção é agregado uma vez por veículo (índice parcial
+-- idx_eventos_manutencao) em vez de uma subconsulta correlacionada por linha.
+WITH ultima_manutencao AS (
+    SELECT e.veiculo_id, MAX(e.km_veiculo) as km_manutencao
+    FROM eventos e
+    WHERE e.tipo IN ('Manutenção Preventiva', 'Revisão Completa')
+    GROUP BY e.veiculo_id
+)
 SELECT 
     v.placa,
     v.modelo,
     v.km_atual,
-    v.km_atual - COALESCE(
-        (SELECT MAX(e.km_veiculo) 
-         FROM eventos e 
-         WHERE e.veiculo_id = v.id 
-         AND e.tipo IN ('Manutenção Preventiva', 'Revisão Completa')), 
-        v.km_atual - 5000
-    ) as km_desde_manutencao
+    v.km_atual - COALESCE(um.km_manutencao, v.km_atual - 5000) as km_desde_manutencao
 FROM veiculos v
-WHERE v.km_atual - COALESCE(
-    (SELECT MAX(e.km_veiculo) 
-     FROM eventos e 
-     WHERE e.veiculo_id = v.id 
-     AND e.tipo IN ('Manutenção Preventiva', 'Revisão Completa')), 
-    v.km_atual - 5000
-) > 5000
+LEFT JOIN ultima_manutencao um ON um.veiculo_id = v.id
+WHERE v.km_atual - COALESCE(um.km_manutencao, v.km_atual - 5000) > 5000
 ORDER BY km_desde_manutencao DESC;
 
 -- 2. Viagens em andamento (status tempo real)
@@ -54,6 +51,9 @@ ORDER BY consumo_medio_l_100km;
 -- ========================================
 -- CONSULTAS BIGQUERY (Analítico)
 -- ========================================
+-- resumo_mensal, analise_por_veiculo e desempenho_por_motorista são tabelas
+-- materializadas (src/scripts/bq_aggregates.py), atualizadas de forma incremental.
+-- Horário do último refresh: SELECT * FROM frota_dw._agregados_estado
 
 -- 4. Análise de custos mensais (trend)
 SELECT 
@@ -136,4 +136,7 @@ Exemplo para veículo 'ABC-1234':
 - KM total e custos (BigQuery) 
 - Localização atual e alertas (Firestore)
 - Consolidar em uma única resposta
+
+Implementada em src/scripts/vehicle_360.py: as três fontes são consultadas
+em paralelo, com timeout por fonte e resultado parcial se alguma falhar.
 */
\ No newline at end of file
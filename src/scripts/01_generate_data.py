@@ -1,130 +1,292 @@
+import argparse
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
 import pandas as pd
-import random
-from datetime import datetime, timedelta
 from faker import Faker
-import os # -- ADICIONADO --
 
-fake = Faker('pt_BR')
+import lake
+from instrumentation import profile
+
+# Uso:
+#   python src/scripts/01_generate_data.py                                  # tamanhos originais
+#   python src/scripts/01_generate_data.py --veiculos 10000 --motoristas 20000 \
+#       --viagens 50000000 --eventos 5000000 --workers 8
+#
+# Por padrão a saída é o data lake em Parquet (lake.py: data/lake/<tabela>/, tipado e,
+# para viagens/eventos, particionado por mês), lido pelos setups 02, 03 e 04.
+# --formato csv mantém os CSVs antigos (data/<tabela>.csv), usados pelos benchmarks de carga.
+#
+# Os dados são gerados em blocos vetorizados (NumPy) de --chunk-size linhas, então a
+# memória fica limitada a um bloco por processo. Cada bloco usa um gerador derivado
+# de (seed, tabela, bloco): a saída é a mesma para a mesma seed, independente de --workers.
 
-# Configurações
+# Configurações padrão
 NUM_VEICULOS = 20
 NUM_VIAGENS = 500
 NUM_EVENTOS = 100
-NUM_MOTORISTAS = 30 # -- ADICIONADO --
+NUM_MOTORISTAS = 30
+CHUNK_SIZE = 1_000_000
 
-# -- ADICIONADO --
-# Criar pasta de dados se não existir
-if not os.path.exists('data'):
-    os.makedirs('data')
-
-# 1. Gerar Veículos
-print("Gerando veículos...")
-veiculos = []
 tipos = ['Caminhão', 'Van', 'Utilitário']
 marcas = ['Mercedes', 'Volkswagen', 'Ford', 'Iveco']
+modelos = ['Sprinter', 'Daily', 'Cargo', 'Delivery']
+status_veiculo = ['Disponível', 'Em viagem', 'Manutenção']
+cidades = ['São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Curitiba', 'Porto Alegre',
+           'Salvador', 'Recife', 'Fortaleza', 'Brasília', 'Goiânia']
+tipos_evento = ['Manutenção Preventiva', 'Alerta de Combustível', 'Excesso de Velocidade',
+                'Parada Não Programada', 'Troca de Óleo', 'Revisão Completa']
+prioridades = ['Baixa', 'Média', 'Alta']
 
-for i in range(1, NUM_VEICULOS + 1):
-    veiculo = {
-        'id': i,
-        'placa': fake.license_plate(),
-        'modelo': f"{random.choice(marcas)} {random.choice(['Sprinter', 'Daily', 'Cargo', 'Delivery'])}",
-        'tipo': random.choice(tipos),
-        'ano': random.randint(2018, 2024),
-        'km_atual': random.randint(10000, 150000),
-        'capacidade_carga': random.randint(1000, 5000),
-        'consumo_medio': round(random.uniform(8.0, 15.0), 1),
-        'status': random.choice(['Disponível', 'Em viagem', 'Manutenção'])
-    }
-    veiculos.append(veiculo)
-
-df_veiculos = pd.DataFrame(veiculos)
-
-# -- ADICIONADO: Gerar Motoristas --
-print("Gerando motoristas...")
-motoristas = []
-for i in range(1, NUM_MOTORISTAS + 1):
-    motorista = {
-        'id': i,
-        'nome': fake.name(),
-        'salario': round(random.uniform(2800.0, 6500.0), 2)
-    }
-    motoristas.append(motorista)
+TABELAS = ['veiculos', 'motoristas', 'viagens', 'eventos']
+COLUNAS = {
+    'veiculos': ['id', 'placa', 'modelo', 'tipo', 'ano', 'km_atual', 'capacidade_carga', 'consumo_medio', 'status'],
+    'motoristas': ['id', 'nome', 'salario'],
+    'viagens': ['id', 'veiculo_id', 'motorista_id', 'data_saida', 'data_chegada', 'origem', 'destino',
+                'km_percorridos', 'combustivel_litros', 'custo_combustivel', 'carga_kg'],
+    'eventos': ['id', 'veiculo_id', 'tipo', 'data_evento', 'descricao', 'prioridade', 'resolvido', 'km_veiculo'],
+}
 
-df_motoristas = pd.DataFrame(motoristas)
+# Placas no padrão Mercosul (ABC-1D23): 26^3 * 10 * 26 * 100 combinações.
+# Multiplicar o id por um primo módulo o total dá placas únicas e "embaralhadas".
+_TOTAL_PLACAS = 26 ** 3 * 10 * 26 * 100
+_PRIMO_PLACAS = 1_000_003
+_LETRAS = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'), dtype=object)
+_DIGITOS = np.array(list('0123456789'), dtype=object)
 
+# Pools de textos do Faker (gerar um nome/frase por linha não escala)
+_TAMANHO_POOL = 2000
 
-# 2. Gerar Viagens
-print("Gerando viagens...")
-viagens = []
-cidades = ['São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Curitiba', 'Porto Alegre', 
-           'Salvador', 'Recife', 'Fortaleza', 'Brasília', 'Goiânia']
 
-for i in range(1, NUM_VIAGENS + 1):
-    dias_atras = random.randint(0, 180)
-    data_viagem = datetime.now() - timedelta(days=dias_atras)
-    duracao_horas = random.randint(2, 48)
-    
-    viagem = {
-        'id': i,
-        'veiculo_id': random.randint(1, NUM_VEICULOS),
-        'motorista_id': random.randint(1, NUM_MOTORISTAS), # -- ADICIONADO --
-        'data_saida': data_viagem.strftime('%Y-%m-%d %H:%M:%S'),
-        'data_chegada': (data_viagem + timedelta(hours=duracao_horas)).strftime('%Y-%m-%d %H:%M:%S'),
-        'origem': random.choice(cidades),
-        'destino': random.choice(cidades),
-        'km_percorridos': random.randint(50, 1500),
-        'combustivel_litros': round(random.uniform(20, 200), 2),
-        'custo_combustivel': round(random.uniform(100, 1000), 2),
-        'carga_kg': random.randint(100, 4000)
-    }
-    viagens.append(viagem)
+def gerar_placas(ids):
+    n = (ids.astype(np.int64) * _PRIMO_PLACAS) % _TOTAL_PLACAS
+    n, d2 = np.divmod(n, 100)
+    n, l4 = np.divmod(n, 26)
+    n, d1 = np.divmod(n, 10)
+    n, l3 = np.divmod(n, 26)
+    l1, l2 = np.divmod(n, 26)
+    return (_LETRAS[l1] + _LETRAS[l2] + _LETRAS[l3] + '-' + _DIGITOS[d1]
+            + _LETRAS[l4] + _DIGITOS[d2 // 10] + _DIGITOS[d2 % 10])
 
-df_viagens = pd.DataFrame(viagens)
 
-# 3. Gerar Eventos/Alertas
-print("Gerando eventos...")
-eventos = []
-tipos_evento = ['Manutenção Preventiva', 'Alerta de Combustível', 'Excesso de Velocidade', 
-                'Parada Não Programada', 'Troca de Óleo', 'Revisão Completa']
+def pool_textos(seed):
+    fake = Faker('pt_BR')
+    fake.seed_instance(seed)
+    nomes = np.array([fake.name() for _ in range(_TAMANHO_POOL)], dtype=object)
+    frases = np.array([fake.sentence(nb_words=10) for _ in range(_TAMANHO_POOL)], dtype=object)
+    return nomes, frases
+
+
+def escolher(rng, opcoes, n):
+    return np.array(opcoes, dtype=object)[rng.integers(0, len(opcoes), n)]
+
+
+def datas_passadas(rng, referencia, max_dias, n):
+    # Dias inteiros + segundos: os horários se espalham pelo dia (consultas por hora)
+    dias = rng.integers(0, max_dias, n)
+    segundos = rng.integers(0, 86400, n)
+    return (np.datetime64(referencia, 's') - dias.astype('timedelta64[D]')
+            - segundos.astype('timedelta64[s]'))
+
+
+def gerar_veiculos(rng, ids, cfg, pools):
+    n = len(ids)
+    return pd.DataFrame({
+        'id': ids,
+        'placa': gerar_placas(ids),
+        'modelo': escolher(rng, marcas, n) + ' ' + escolher(rng, modelos, n),
+        'tipo': escolher(rng, tipos, n),
+        'ano': rng.integers(2018, 2025, n),
+        'km_atual': rng.integers(10000, 150001, n),
+        'capacidade_carga': rng.integers(1000, 5001, n),
+        'consumo_medio': np.round(rng.uniform(8.0, 15.0, n), 1),
+        'status': escolher(rng, status_veiculo, n),
+    })
+
+
+def gerar_motoristas(rng, ids, cfg, pools):
+    n = len(ids)
+    nomes, _ = pools
+    return pd.DataFrame({
+        'id': ids,
+        'nome': nomes[rng.integers(0, len(nomes), n)],
+        'salario': np.round(rng.uniform(2800.0, 6500.0, n), 2),
+    })
+
+
+def gerar_viagens(rng, ids, cfg, pools):
+    n = len(ids)
+    data_saida = datas_passadas(rng, cfg['referencia'], 180, n)
+    duracao = rng.integers(2, 49, n).astype('timedelta64[h]')
+    return pd.DataFrame({
+        'id': ids,
+        'veiculo_id': rng.integers(1, cfg['veiculos'] + 1, n),
+        'motorista_id': rng.integers(1, cfg['motoristas'] + 1, n),
+        'data_saida': data_saida,
+        'data_chegada': data_saida + duracao,
+        'origem': escolher(rng, cidades, n),
+        'destino': escolher(rng, cidades, n),
+        'km_percorridos': rng.integers(50, 1501, n),
+        'combustivel_litros': np.round(rng.uniform(20, 200, n), 2),
+        'custo_combustivel': np.round(rng.uniform(100, 1000, n), 2),
+        'carga_kg': rng.integers(100, 4001, n),
+    })
+
+
+def gerar_eventos(rng, ids, cfg, pools):
+    n = len(ids)
+    _, frases = pools
+    return pd.DataFrame({
+        'id': ids,
+        'veiculo_id': rng.integers(1, cfg['veiculos'] + 1, n),
+        'tipo': escolher(rng, tipos_evento, n),
+        'data_evento': datas_passadas(rng, cfg['referencia'], 30, n),
+        'descricao': frases[rng.integers(0, len(frases), n)],
+        'prioridade': escolher(rng, prioridades, n),
+        'resolvido': rng.integers(0, 2, n).astype(bool),
+        'km_veiculo': rng.integers(5000, 150001, n),  # hodômetro no momento do evento
+    })
+
+
+GERADORES = {
+    'veiculos': gerar_veiculos,
+    'motoristas': gerar_motoristas,
+    'viagens': gerar_viagens,
+    'eventos': gerar_eventos,
+}
+
+_pools_cache = {}
 
-for i in range(1, NUM_EVENTOS + 1):
-    dias_atras = random.randint(0, 30)
-    data_evento = datetime.now() - timedelta(days=dias_atras)
-    
-    evento = {
-        'id': i,
-        'veiculo_id': random.randint(1, NUM_VEICULOS),
-        'tipo': random.choice(tipos_evento),
-        'data_evento': data_evento.strftime('%Y-%m-%d %H:%M:%S'),
-        'descricao': fake.sentence(nb_words=10),
-        'prioridade': random.choice(['Baixa', 'Média', 'Alta']),
-        'resolvido': random.choice([True, False])
+
+def gerar_bloco(tabela, bloco, inicio, fim, cfg):
+    """Gera o bloco de ids [inicio, fim) de uma tabela e grava em um arquivo parcial."""
+    if cfg['seed'] not in _pools_cache:
+        _pools_cache[cfg['seed']] = pool_textos(cfg['seed'])
+    rng = np.random.default_rng([cfg['seed'], TABELAS.index(tabela), bloco])
+    ids = np.arange(inicio, fim, dtype=np.int64)
+    df = GERADORES[tabela](rng, ids, cfg, _pools_cache[cfg['seed']])[COLUNAS[tabela]]
+
+    if cfg['formato'] == 'parquet':
+        return lake.write_part(df, tabela, bloco, diretorio_lake(cfg))
+    df.to_csv(caminho_parte(cfg, tabela, bloco), index=False, header=False, encoding='utf-8',
+              date_format='%Y-%m-%d %H:%M:%S')
+    return len(df)
+
+
+def diretorio_lake(cfg):
+    return os.path.join(cfg['saida'], 'lake')
+
+
+def diretorio_partes(cfg, tabela):
+    # Parquet: o diretório é o próprio dataset do lake. CSV: partes temporárias, concatenadas no final.
+    if cfg['formato'] == 'parquet':
+        return lake.table_dir(tabela, diretorio_lake(cfg))
+    return os.path.join(cfg['saida'], f'.partes_{tabela}')
+
+
+def caminho_parte(cfg, tabela, bloco):
+    return os.path.join(diretorio_partes(cfg, tabela), f'part-{bloco:05d}.csv')
+
+
+def juntar_csv(cfg, tabela, num_blocos):
+    diretorio = diretorio_partes(cfg, tabela)
+    with open(os.path.join(cfg['saida'], f'{tabela}.csv'), 'w', encoding='utf-8', newline='') as destino:
+        destino.write(','.join(COLUNAS[tabela]) + '\n')
+        for bloco in range(num_blocos):
+            with open(caminho_parte(cfg, tabela, bloco), encoding='utf-8', newline='') as parte:
+                shutil.copyfileobj(parte, destino, 16 * 1024 * 1024)
+    shutil.rmtree(diretorio)
+
+
+def gerar_tabela(executor, tabela, total, cfg):
+    diretorio = diretorio_partes(cfg, tabela)
+    shutil.rmtree(diretorio, ignore_errors=True)
+    os.makedirs(diretorio)
+
+    blocos = [(b, inicio, min(inicio + cfg['chunk_size'], total + 1))
+              for b, inicio in enumerate(range(1, total + 1, cfg['chunk_size']))]
+    if executor is None:
+        linhas = sum(gerar_bloco(tabela, b, inicio, fim, cfg) for b, inicio, fim in blocos)
+    else:
+        futuros = [executor.submit(gerar_bloco, tabela, b, inicio, fim, cfg) for b, inicio, fim in blocos]
+        linhas = sum(f.result() for f in futuros)
+
+    if cfg['formato'] == 'csv':
+        juntar_csv(cfg, tabela, len(blocos))
+    return linhas
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gera os dados sintéticos da frota")
+    parser.add_argument('--veiculos', type=int, default=NUM_VEICULOS)
+    parser.add_argument('--motoristas', type=int, default=NUM_MOTORISTAS)
+    parser.add_argument('--viagens', type=int, default=NUM_VIAGENS)
+    parser.add_argument('--eventos', type=int, default=NUM_EVENTOS)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=1, help="Processos em paralelo (1 = sem pool)")
+    parser.add_argument('--formato', choices=['csv', 'parquet'], default='parquet')
+    parser.add_argument('--saida', default='data')
+    parser.add_argument('--data-referencia', default=None,
+                        help="Data 'atual' das viagens/eventos (YYYY-MM-DD HH:MM:SS); padrão: agora")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    referencia = (datetime.fromisoformat(args.data_referencia) if args.data_referencia
+                  else datetime.now().replace(microsecond=0))
+    cfg = {
+        'veiculos': args.veiculos,
+        'motoristas': args.motoristas,
+        'seed': args.seed,
+        'chunk_size': args.chunk_size,
+        'formato': args.formato,
+        'saida': args.saida,
+        'referencia': referencia,
+    }
+    totais = {
+        'veiculos': args.veiculos,
+        'motoristas': args.motoristas,
+        'viagens': args.viagens,
+        'eventos': args.eventos,
     }
-    eventos.append(evento)
-
-df_eventos = pd.DataFrame(eventos)
-
-# 4. Salvar arquivos
-print("Salvando arquivos...")
-df_veiculos.to_csv('data/veiculos.csv', index=False, encoding='utf-8')
-df_motoristas.to_csv('data/motoristas.csv', index=False, encoding='utf-8') # -- ADICIONADO --
-df_viagens.to_csv('data/viagens.csv', index=False, encoding='utf-8')
-df_eventos.to_csv('data/eventos.csv', index=False, encoding='utf-8')
-
-# 5. Mostrar resumo
-print("\n✅ Dados gerados com sucesso!")
-print(f"- {NUM_VEICULOS} veículos")
-print(f"- {NUM_MOTORISTAS} motoristas") # -- ADICIONADO --
-print(f"- {NUM_VIAGENS} viagens (últimos 6 meses)")
-print(f"- {NUM_EVENTOS} eventos (últimos 30 dias)")
-
-# Mostrar amostras
-print("\n📊 Amostra dos dados:")
-print("\nVeículos:")
-print(df_veiculos.head(3))
-print("\nMotoristas:") # -- ADICIONADO --
-print(df_motoristas.head(3)) # -- ADICIONADO --
-print("\nViagens:")
-print(df_viagens.head(3))
-print("\nEventos:")
-print(df_eventos.head(3))
\ No newline at end of file
+
+    # Criar pasta de dados se não existir
+    os.makedirs(args.saida, exist_ok=True)
+
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    try:
+        for tabela in TABELAS:
+            print(f"Gerando {tabela}...")
+            # Com --workers > 1 o perfil cobre só o processo principal
+            with profile(f'gerar_{tabela}'):
+                gerar_tabela(executor, tabela, totais[tabela], cfg)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Mostrar resumo
+    print("\n✅ Dados gerados com sucesso!")
+    print(f"- {args.veiculos:,} veículos")
+    print(f"- {args.motoristas:,} motoristas")
+    print(f"- {args.viagens:,} viagens (últimos 6 meses)")
+    print(f"- {args.eventos:,} eventos (últimos 30 dias)")
+
+    # Mostrar amostras
+    print("\n📊 Amostra dos dados:")
+    for tabela in TABELAS:
+        if totais[tabela] == 0:
+            continue
+        print(f"\n{tabela.capitalize()}:")
+        if args.formato == 'parquet':
+            print(lake.dataset(tabela, diretorio_lake(cfg)).head(3, columns=lake.ESQUEMAS[tabela].names).to_pandas())
+        else:
+            print(pd.read_csv(os.path.join(args.saida, f'{tabela}.csv'), nrows=3))
+
+
+if __name__ == '__main__':
+    main()
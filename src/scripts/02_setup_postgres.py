@@ -1,8 +1,9 @@
 import os
-import pandas as pd
-import psycopg2
 from dotenv import load_dotenv
-import time
+from db import pg_connect
+from pg_schema import PARTICIONAMENTO, TABELAS, create_indexes, create_tables
+from pg_partitions import create_future_partitions
+from pg_loader import load_lake, print_stats
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -17,6 +18,9 @@ INSTANCE_CONNECTION_NAME = "trabalho-final-bd-463916:us-central1:postgres"
 DB_USER = "postgres"
 DB_PASS = "123"
 DB_NAME = "frota_db"
+METODO_CARGA = os.getenv("POSTGRES_LOAD_METHOD", "copy")
+# POSTGRES_PARTICIONADO=1: viagens/eventos particionadas por mês
+PARTICIONADO = os.getenv("POSTGRES_PARTICIONADO", "0").lower() in ("1", "true", "sim")
 
 print("\n🔗 Para conectar, precisamos:")
 print("1. Ir no Console GCP → SQL → frota-postgres")
@@ -41,7 +45,7 @@ try:
     print(f"\n🔄 Conectando ao PostgreSQL em {PUBLIC_IP}...")
     
     # Primeiro conecta ao banco padrão para criar nosso banco
-    conn = psycopg2.connect(
+    conn = pg_connect(
         host=PUBLIC_IP,
         user=DB_USER,
         password=DB_PASS,
@@ -59,7 +63,7 @@ try:
     conn.close()
     
     # Conectar ao novo banco
-    conn = psycopg2.connect(
+    conn = pg_connect(
         host=PUBLIC_IP,
         user=DB_USER,
         password=DB_PASS,
@@ -69,91 +73,21 @@ try:
     
     # Criar tabelas
     print("📋 Criando tabelas...")
+    create_tables(cur, particionado=PARTICIONADO)
     
-    # Tabela veículos
-    cur.execute("""
-        CREATE TABLE veiculos (
-            id INTEGER PRIMARY KEY,
-            placa VARCHAR(10) UNIQUE NOT NULL,
-            modelo VARCHAR(100),
-            tipo VARCHAR(50),
-            ano INTEGER,
-            km_atual INTEGER,
-            capacidade_carga INTEGER,
-            consumo_medio DECIMAL(5,2),
-            status VARCHAR(20)
-        )
-    """)
-    
-    # -- ADICIONADO: Tabela motoristas --
-    cur.execute("""
-        CREATE TABLE motoristas (
-            id INTEGER PRIMARY KEY,
-            nome VARCHAR(255) NOT NULL,
-            salario DECIMAL(10, 2)
-        )
-    """)
-    
-    # Tabela viagens -- MODIFICADO --
-    cur.execute("""
-        CREATE TABLE viagens (
-            id INTEGER PRIMARY KEY,
-            veiculo_id INTEGER REFERENCES veiculos(id),
-            motorista_id INTEGER REFERENCES motoristas(id),
-            data_saida TIMESTAMP,
-            data_chegada TIMESTAMP,
-            origem VARCHAR(100),
-            destino VARCHAR(100),
-            km_percorridos INTEGER,
-            combustivel_litros DECIMAL(8,2),
-            custo_combustivel DECIMAL(10,2),
-            carga_kg INTEGER
-        )
-    """)
-    
-    # Tabela eventos
-    cur.execute("""
-        CREATE TABLE eventos (
-            id INTEGER PRIMARY KEY,
-            veiculo_id INTEGER REFERENCES veiculos(id),
-            tipo VARCHAR(100),
-            data_evento TIMESTAMP,
-            descricao TEXT,
-            prioridade VARCHAR(20),
-            resolvido BOOLEAN
-        )
-    """)
-    
-    # Inserir dados
-    print("📥 Inserindo dados...")
-    
-    # Carregar e inserir veículos
-    df_veiculos = pd.read_csv('data/veiculos.csv')
-    for _, row in df_veiculos.iterrows():
-        cur.execute("""
-            INSERT INTO veiculos VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, tuple(row))
-        
-    # -- ADICIONADO: Carregar e inserir motoristas --
-    df_motoristas = pd.read_csv('data/motoristas.csv')
-    for _, row in df_motoristas.iterrows():
-        cur.execute("""
-            INSERT INTO motoristas VALUES (%s, %s, %s)
-        """, tuple(row))
-
-    # Carregar e inserir viagens -- MODIFICADO --
-    df_viagens = pd.read_csv('data/viagens.csv')
-    for _, row in df_viagens.iterrows():
-        cur.execute("""
-            INSERT INTO viagens VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, tuple(row))
-    
-    # Carregar e inserir eventos
-    df_eventos = pd.read_csv('data/eventos.csv')
-    for _, row in df_eventos.iterrows():
-        cur.execute("""
-            INSERT INTO eventos VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, tuple(row))
+    # Inserir dados (COPY em blocos por padrão; POSTGRES_LOAD_METHOD=batch|row para os outros métodos)
+    print(f"📥 Inserindo dados (método: {METODO_CARGA})...")
+    for tabela in TABELAS:
+        particao = PARTICIONAMENTO.get(tabela) if PARTICIONADO else None
+        stats = load_lake(conn, tabela, metodo=METODO_CARGA, particao=particao)
+        print_stats(stats)
+    
+    if PARTICIONADO:
+        print(f"🗂️  Partições futuras garantidas: {len(create_future_partitions(cur))}")
+    
+    # Índices só depois da carga em massa
+    print("🔎 Criando índices...")
+    create_indexes(cur)
     
     conn.commit()
     
@@ -1,79 +1,55 @@
-import os
-import pandas as pd
-from google.cloud import firestore
+import lake
+import pyarrow.dataset as ds
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
-import random
+from db import get_firestore_client
+from fs_writer import BatchWriter, delete_collection, print_stats
+from fs_docs import alert_docs, placas_por_veiculo, ultimas_viagens, vehicle_status_docs
+from fs_metrics import MetricsAggregator, baseline_from_dataframes
+from cache import invalidate
+from dashboard_data import PREFIXO_FIRESTORE
+from instrumentation import profile
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
 # Configurar cliente Firestore
-os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'credentials.json'
-db = firestore.Client(project='trabalho-final-bd-463916')
+db = get_firestore_client()
 
 print("🔄 Configurando Firestore...")
 
-# Carregar dados dos CSVs
-print("📥 Carregando dados dos CSVs...")
-df_veiculos = pd.read_csv('data/veiculos.csv')
-df_viagens = pd.read_csv('data/viagens.csv')
-df_eventos = pd.read_csv('data/eventos.csv')
-df_motoristas = pd.read_csv('data/motoristas.csv') # -- ADICIONADO --
+# Carregar dados do data lake (só as colunas usadas nos documentos)
+print("📥 Carregando dados do data lake...")
+df_veiculos = lake.read('veiculos', ['id', 'placa', 'modelo', 'tipo', 'km_atual', 'status'])
+df_viagens = lake.read('viagens', ['veiculo_id', 'data_saida', 'data_chegada', 'origem', 'destino',
+                                   'km_percorridos', 'carga_kg'])
+# Só os eventos não resolvidos viram alertas: o filtro é aplicado na leitura
+df_eventos = lake.read('eventos', ['id', 'veiculo_id', 'tipo', 'data_evento', 'descricao', 'prioridade', 'resolvido'],
+                       filtro=ds.field('resolvido') == False)
+df_motoristas = lake.read('motoristas', ['id', 'nome']) # -- ADICIONADO --
 
 # 1. Criar coleção de status atual dos veículos
 print("\n🚗 Criando status atual dos veículos...")
 veiculos_ref = db.collection('veiculos_status')
 
-# Limpar coleção existente
-for doc in veiculos_ref.stream():
-    doc.reference.delete()
+# Limpar coleção existente (deletes em lote, antes de qualquer escrita)
+with BatchWriter(db) as writer:
+    removidos = delete_collection(writer, veiculos_ref)
+print(f"🧹 {removidos} documentos antigos removidos")
+print_stats(writer.stats(), 'deletes')
 
-status_opcoes = {
-    'Disponível': {'cor': 'verde', 'icone': '✅'},
-    'Em viagem': {'cor': 'azul', 'icone': '🚛'},
-    'Manutenção': {'cor': 'vermelho', 'icone': '🔧'}
-}
+# Índices por veículo calculados uma única vez (última viagem e placa)
+with profile('indices_por_veiculo'):
+    ultimas = ultimas_viagens(df_viagens)
+    placas = placas_por_veiculo(df_veiculos)
 
 # Inserir status de cada veículo
-for _, veiculo in df_veiculos.iterrows():
-    viagens_veiculo = df_viagens[df_viagens['veiculo_id'] == veiculo['id']]
-    
-    ultima_localizacao = 'Base' if viagens_veiculo.empty else viagens_veiculo.sort_values('data_saida').iloc[-1]['destino']
-    
-    doc_data = {
-        'veiculo_id': int(veiculo['id']),
-        'placa': veiculo['placa'],
-        'modelo': veiculo['modelo'],
-        'status': veiculo['status'],
-        'status_info': status_opcoes[veiculo['status']],
-        'ultima_atualizacao': datetime.now(),
-        'localizacao_atual': ultima_localizacao,
-        'latitude': -23.5505 + random.uniform(-2, 2),  # -- ADICIONADO --
-        'longitude': -46.6333 + random.uniform(-2, 2), # -- ADICIONADO --
-        'km_atual': int(veiculo['km_atual']),
-        'proximo_servico_km': int(veiculo['km_atual']) + 5000,
-        'combustivel_nivel': random.randint(20, 100),
-        'temperatura_motor': random.randint(80, 95),
-    }
-    
-    # Se em viagem, adicionar info da viagem -- MODIFICADO --
-    if veiculo['status'] == 'Em viagem':
-        motorista_aleatorio = df_motoristas.sample(1).iloc[0]
-        viagem_veiculo = viagens_veiculo.iloc[-1] # Pega a ultima viagem
-        
-        doc_data['viagem_atual'] = {
-            'origem': viagem_veiculo['origem'],
-            'destino': viagem_veiculo['destino'],
-            'previsao_chegada': pd.to_datetime(viagem_veiculo['data_chegada']),
-            'carga': f"{viagem_veiculo['carga_kg']} kg",
-            'motorista_id': int(motorista_aleatorio['id']),
-            'motorista_nome': motorista_aleatorio['nome']
-        }
-    
-    veiculos_ref.document(veiculo['placa']).set(doc_data)
+writer = BatchWriter(db)
+for placa, doc_data in vehicle_status_docs(df_veiculos, ultimas, df_motoristas):
+    writer.set(veiculos_ref.document(placa), doc_data)
 
+writer.close()
 print(f"✅ {len(df_veiculos)} status de veículos inseridos!")
+print_stats(writer.stats(), 'escritas')
 
 # ... (o resto do arquivo permanece o mesmo)
 # 2. Criar coleção de alertas/eventos em tempo real
@@ -81,70 +57,32 @@ print("\n🚨 Criando alertas e eventos...")
 alertas_ref = db.collection('alertas')
 
 # Limpar coleção existente
-docs = alertas_ref.stream()
-for doc in docs:
-    doc.reference.delete()
+with BatchWriter(db) as writer:
+    removidos = delete_collection(writer, alertas_ref)
+print(f"🧹 {removidos} alertas antigos removidos")
+print_stats(writer.stats(), 'deletes')
 
-# Criar alertas baseados nos eventos
+# Criar alertas baseados nos eventos (apenas os não resolvidos)
 alertas_ativos = []
-for _, evento in df_eventos.iterrows():
-    if not evento['resolvido']:  # Apenas eventos não resolvidos
-        alerta = {
-            'evento_id': int(evento['id']),
-            'veiculo_id': int(evento['veiculo_id']),
-            'placa': df_veiculos[df_veiculos['id'] == evento['veiculo_id']].iloc[0]['placa'],
-            'tipo': evento['tipo'],
-            'prioridade': evento['prioridade'],
-            'descricao': evento['descricao'],
-            'data_criacao': pd.to_datetime(evento['data_evento']).to_pydatetime(),
-            'tempo_aberto': str(datetime.now() - pd.to_datetime(evento['data_evento']).to_pydatetime()).split('.')[0],
-            'responsavel': random.choice(['João Silva', 'Maria Santos', 'Pedro Costa', None]),
-            'observacoes': []
-        }
-        
-        # Adicionar cores por prioridade
-        cores_prioridade = {
-            'Alta': {'cor': '#FF0000', 'peso': 3},
-            'Média': {'cor': '#FFA500', 'peso': 2},
-            'Baixa': {'cor': '#008000', 'peso': 1}
-        }
-        alerta['prioridade_info'] = cores_prioridade[evento['prioridade']]
-        
-        alertas_ref.add(alerta)
-        alertas_ativos.append(alerta)
+writer = BatchWriter(db)
+for alerta in alert_docs(df_eventos, placas):
+    # Id do documento = id do evento: recarregar não duplica alertas
+    writer.set(alertas_ref.document(str(alerta['evento_id'])), alerta)
+    alertas_ativos.append(alerta)
 
+writer.close()
 print(f"✅ {len(alertas_ativos)} alertas ativos inseridos!")
+print_stats(writer.stats(), 'escritas')
 
 # 3. Criar coleção de métricas em tempo real
+# Valores iniciais calculados uma única vez; depois disso o dashboard é mantido
+# por incrementos atômicos (fs_metrics.MetricsAggregator), sem recálculo
 print("\n📊 Criando métricas em tempo real...")
-metricas_ref = db.collection('metricas_tempo_real')
-
-# Calcular métricas
-viagens_hoje = df_viagens[
-    pd.to_datetime(df_viagens['data_saida']).dt.date == datetime.now().date()
-]
-
-metricas = {
-    'ultima_atualizacao': datetime.now(),
-    'frota_total': len(df_veiculos),
-    'motoristas_total': len(df_motoristas), # -- ADICIONADO --
-    'veiculos_disponiveis': len(df_veiculos[df_veiculos['status'] == 'Disponível']),
-    'veiculos_em_viagem': len(df_veiculos[df_veiculos['status'] == 'Em viagem']),
-    'veiculos_manutencao': len(df_veiculos[df_veiculos['status'] == 'Manutenção']),
-    'viagens_hoje': len(viagens_hoje),
-    'km_total_hoje': int(viagens_hoje['km_percorridos'].sum()) if not viagens_hoje.empty else 0,
-    'alertas_ativos': {
-        'total': len(alertas_ativos),
-        'alta_prioridade': len([a for a in alertas_ativos if a['prioridade'] == 'Alta']),
-        'media_prioridade': len([a for a in alertas_ativos if a['prioridade'] == 'Média']),
-        'baixa_prioridade': len([a for a in alertas_ativos if a['prioridade'] == 'Baixa'])
-    },
-    'eficiencia_frota': round(
-        (len(df_veiculos[df_veiculos['status'] != 'Manutenção']) / len(df_veiculos)) * 100, 1
-    )
-}
-
-metricas_ref.document('dashboard').set(metricas)
+agregador = MetricsAggregator(db)
+agregador.reset(baseline_from_dataframes(df_veiculos, df_motoristas, df_viagens, alertas_ativos))
 print("✅ Métricas em tempo real criadas!")
 
+# Leituras em cache do dashboard (notebook, 05_test_queries.py) ficaram desatualizadas
+invalidate(PREFIXO_FIRESTORE)
+
 # ... (o resto do arquivo permanece o mesmo)
\ No newline at end of file
@@ -1,8 +1,11 @@
 import os
-import psycopg2
-from google.cloud import bigquery, firestore
 from dotenv import load_dotenv
 from datetime import datetime
+from db import get_firestore_client, get_pg_pool, health_check, pg_connection, print_health
+from vehicle_360 import print_latencies, vehicle_360
+from cache import get_cache, print_stats as print_cache_stats
+from dashboard_data import aggregate_df
+from fs_queries import CAMPOS_ALERTAS_PRIORITARIOS, iter_docs, priority_alerts, read_dataframe, vehicles_by_status
 
 # Carregar variáveis
 load_dotenv()
@@ -10,36 +13,31 @@ load_dotenv()
 print("🔍 Testando consultas nos 3 bancos de dados...")
 print("=" * 60)
 
+# 0. Conectividade dos três bancos
+print("\n🩺 Health check")
+print("-" * 40)
+print_health(health_check())
+
 # 1. POSTGRESQL - Consulta Operacional
 print("\n1️⃣ POSTGRESQL - Motoristas e seus salários") # -- MODIFICADO --
 print("-" * 40)
 
 try:
-    conn = psycopg2.connect(
-        host=os.getenv('POSTGRES_HOST'),
-        user=os.getenv('POSTGRES_USER'),
-        password=os.getenv('POSTGRES_PASS'),
-        database=os.getenv('POSTGRES_DB')
-    )
-    cur = conn.cursor()
-    
-    # -- QUERY MODIFICADA --
-    query = """
-    SELECT nome, salario
-    FROM motoristas
-    ORDER BY salario DESC
-    LIMIT 5
-    """
-    
-    cur.execute(query)
-    results = cur.fetchall()
+    with pg_connection() as conn, conn.cursor() as cur:
+        # -- QUERY MODIFICADA --
+        query = """
+        SELECT nome, salario
+        FROM motoristas
+        ORDER BY salario DESC
+        LIMIT 5
+        """
+        
+        cur.execute(query)
+        results = cur.fetchall()
     
     for row in results:
         print(f"  - {row[0]} - Salário: R$ {row[1]:,.2f}")
     
-    cur.close()
-    conn.close()
-    
 except Exception as e:
     print(f"❌ Erro PostgreSQL: {e}")
 
@@ -48,25 +46,16 @@ print("\n2️⃣ BIGQUERY - Desempenho dos motoristas com mais KM") # -- MODIFIC
 print("-" * 40)
 
 try:
-    os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'credentials.json'
-    client = bigquery.Client(project='trabalho-final-bd-463916')
-    
-    # -- QUERY MODIFICADA para usar a nova view --
-    query = """
-    SELECT 
-        nome,
-        total_viagens,
-        km_total
-    FROM `trabalho-final-bd-463916.frota_dw.desempenho_por_motorista`
-    WHERE km_total > 0
-    ORDER BY km_total DESC
-    LIMIT 5
-    """
-    
-    df = client.query(query).to_dataframe()
+    # Agregado inteiro via cache (invalidado pelos scripts que atualizam o BigQuery)
+    df = aggregate_df('desempenho_por_motorista')
+    top = df[df['km_total'] > 0].sort_values('km_total', ascending=False).head(5)
     
-    for _, row in df.iterrows():
+    for _, row in top.iterrows():
         print(f"  - {row['nome']}: {row['total_viagens']} viagens, {row['km_total']:,} km rodados")
+
+    # Os agregados são tabelas materializadas: mostrar quando foram atualizados
+    if not df.empty:
+        print(f"  🕒 Dados atualizados em {df['atualizado_em'].max():%d/%m/%Y %H:%M:%S}")
     
 except Exception as e:
     print(f"❌ Erro BigQuery: {e}")
@@ -76,16 +65,14 @@ print("\n3️⃣ FIRESTORE - Veículos em viagem e seus motoristas") # -- MODIFI
 print("-" * 40)
 
 try:
-    db = firestore.Client(project='trabalho-final-bd-463916')
-    
-    # -- QUERY MODIFICADA --
-    query = db.collection('veiculos_status') \
-        .where('status', '==', 'Em viagem') \
-        .limit(5)
+    db = get_firestore_client()
     
+    # Só os campos exibidos (select): o resto do documento não trafega
+    query = vehicles_by_status(db, 'Em viagem')
+    campos = ['placa', 'viagem_atual.motorista_nome', 'viagem_atual.destino']
+
     count = 0
-    for doc in query.stream():
-        data = doc.to_dict()
+    for data in iter_docs(query, campos, limite=5):
         viagem_info = data.get('viagem_atual', {})
         motorista = viagem_info.get('motorista_nome', 'N/A')
         destino = viagem_info.get('destino', 'N/A')
@@ -94,47 +81,58 @@ try:
     
     if count == 0:
         print("  Nenhum veículo em viagem encontrado.")
+
+    # Consulta 8 (consultas_demo.sql): alertas de alta prioridade sem responsável,
+    # mais recentes primeiro. Precisa do índice composto (python src/scripts/fs_queries.py)
+    print("\n  🚨 Alertas prioritários sem responsável:")
+    df_alertas = read_dataframe(priority_alerts(db), CAMPOS_ALERTAS_PRIORITARIOS, limite=5)
+    for alerta in df_alertas.itertuples(index=False):
+        print(f"  - {alerta.placa}: {alerta.tipo} ({alerta.descricao}), aberto há {alerta.tempo_aberto}")
+    if df_alertas.empty:
+        print("  Nenhum alerta prioritário sem responsável.")
     
 except Exception as e:
     print(f"❌ Erro Firestore: {e}")
 
-# ... (o resto do arquivo permanece o mesmo)
-# 4. CONSULTA INTEGRADA - Visão 360°
-# print("\n4️⃣ CONSULTA INTEGRADA - Status completo da frota")
-# print("-" * 40)
+# 4. CONSULTA INTEGRADA - Visão 360° (as três fontes em paralelo)
+print("\n4️⃣ CONSULTA INTEGRADA - Visão 360° do veículo")
+print("-" * 40)
+
+try:
+    placa = os.getenv('VISAO_360_PLACA')
+    if not placa:
+        with pg_connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT placa FROM veiculos ORDER BY id LIMIT 1")
+            placa = cur.fetchone()[0]
+
+    visao = vehicle_360(placa)
+    veiculo = visao['postgres'] or {}
+    metricas = visao['bigquery'] or {}
+    tempo_real = visao['firestore'] or {}
+    status = tempo_real.get('status') or {}
+
+    print(f"🚛 {placa} - {veiculo.get('modelo', 'N/A')} ({veiculo.get('tipo', 'N/A')}), status: {veiculo.get('status', 'N/A')}")
+    print(f"  • Últimas viagens: {len(veiculo.get('ultimas_viagens', []))}")
+    if metricas:
+        print(f"  • KM total: {metricas['km_total'] or 0:,} (#{metricas['ranking_km']} de {metricas['total_veiculos']})")
+        print(f"  • Custo por km: R$ {metricas['custo_por_km'] or 0:,.2f}")
+    print(f"  • Localização atual: {status.get('localizacao_atual', 'N/A')}")
+    print(f"  • Alertas ativos: {len(tempo_real.get('alertas', []))}")
+    if visao['parcial']:
+        print("  ⚠️  Resultado parcial (fonte indisponível ou lenta)")
+    print_latencies(visao)
 
-# try:
-#     # Firestore - Métricas gerais
-#     db = firestore.Client(project='trabalho-final-bd-463916')
-#     metricas = db.collection('metricas_tempo_real').document('dashboard').get().to_dict()
-    
-#     print(f"📊 Status Geral da Frota:")
-#     print(f"  • Total de veículos: {metricas['frota_total']}")
-#     print(f"  • Total de motoristas: {metricas.get('motoristas_total', 'N/A')}") # -- ADICIONADO --
-#     print(f"  • Disponíveis: {metricas['veiculos_disponiveis']}")
-#     print(f"  • Em viagem: {metricas['veiculos_em_viagem']}")
-#     print(f"  • Em manutenção: {metricas['veiculos_manutencao']}")
-#     print(f"  • Eficiência: {metricas['eficiencia_frota']}%")
-#     print(f"  • Alertas ativos: {metricas['alertas_ativos']['total']}")
-    
-#     # BigQuery - Custo total do mês atual
-#     client = bigquery.Client(project='trabalho-final-bd-463916')
-#     mes_atual = datetime.now().strftime('%Y-%m')
-    
-#     query = f"""
-#     SELECT custo_total, km_total
-#     FROM `trabalho-final-bd-463916.frota_dw.resumo_mensal`
-#     WHERE mes = '{mes_atual}'
-#     """
-    
-    # df = client.query(query).to_dataframe()
-    # if not df.empty:
-    #     print(f"\n💰 Custos do mês atual ({mes_atual}):")
-    #     print(f"  • Total gasto: R$ {df.iloc[0]['custo_total']:,.2f}")
-    #     print(f"  • KM rodados: {df.iloc[0]['km_total']:,}")
-    
 except Exception as e:
     print(f"❌ Erro na consulta integrada: {e}")
 
+try:
+    metricas_pool = get_pg_pool().metrics()
+    print(f"\n🔌 Pool PostgreSQL: {metricas_pool['emprestimos']} empréstimos, pico de {metricas_pool['pico_em_uso']}/"
+          f"{metricas_pool['max_conexoes']} conexões, {metricas_pool['esperas']} esperas")
+except Exception as e:
+    print(f"\n⚠️  Pool PostgreSQL indisponível: {e}")
+
+print_cache_stats(get_cache().stats())
+
 print("\n" + "=" * 60)
 print("✅ Testes concluídos!")
\ No newline at end of file
@@ -0,0 +1,66 @@
+import argparse
+
+from dotenv import load_dotenv
+
+from db import BQ_DATASET, get_bigquery_client, pg_connection
+from bq_loader import BigQueryBackend, DuckDBBackend
+from bq_schema import SCHEMAS
+from warehouse_sync import CHUNK_ROWS, SYNC_TABELAS, print_stats, sync_table
+
+# Sincronização incremental PostgreSQL -> BigQuery (ou DuckDB local)
+#
+# Uso:
+#   python src/scripts/06_sync_incremental.py                         # BigQuery
+#   python src/scripts/06_sync_incremental.py --backend duckdb --duckdb frota.duckdb
+#
+# Só as linhas novas/alteradas desde a última execução são transferidas.
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+parser = argparse.ArgumentParser(description="Sincronização incremental PostgreSQL -> Data Warehouse")
+parser.add_argument('--backend', choices=['bigquery', 'duckdb'], default='bigquery')
+parser.add_argument('--duckdb', default='frota.duckdb', help="Arquivo do DuckDB (backend duckdb)")
+parser.add_argument('--tabelas', nargs='+', choices=list(SYNC_TABELAS), default=list(SYNC_TABELAS))
+parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+args = parser.parse_args()
+
+dataset_id = BQ_DATASET
+
+print("🔄 Sincronização incremental PostgreSQL → Data Warehouse")
+print("=" * 60)
+
+if args.backend == 'bigquery':
+    client = get_bigquery_client()
+    backend = BigQueryBackend(client, dataset_id)
+else:
+    backend = DuckDBBackend(args.duckdb)
+
+try:
+    with pg_connection() as conn:
+        for tabela in args.tabelas:
+            config = SYNC_TABELAS[tabela]
+            print(f"\n📥 Sincronizando {tabela}...")
+            stats = sync_table(conn, backend, tabela, SCHEMAS[tabela], config['coluna'],
+                               chunk_rows=args.chunk_rows)
+            print_stats(stats)
+
+    # Atualizar os agregados só nas chaves tocadas pelas viagens novas
+    # (no DuckDB, o mesmo código roda pelo adaptador de bq_local.py)
+    from bq_aggregates import refresh_aggregates, print_stats as print_aggregate_stats
+    from cache import invalidate
+    from dashboard_data import PREFIXO_BIGQUERY
+
+    if args.backend == 'duckdb':
+        from bq_local import DuckDBClient
+        client = DuckDBClient(con=backend.con)
+
+    print("\n📊 Atualizando agregados...")
+    for stats in refresh_aggregates(client, dataset_id):
+        print_aggregate_stats(stats)
+    invalidate(PREFIXO_BIGQUERY)
+
+    print("\n✅ Sincronização concluída!")
+
+except Exception as e:
+    print(f"\n❌ Erro na sincronização: {e}")
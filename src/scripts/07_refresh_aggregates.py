@@ -0,0 +1,31 @@
+import argparse
+from dotenv import load_dotenv
+from db import BQ_DATASET, get_bigquery_client
+from bq_aggregates import freshness, refresh_aggregates, print_stats
+from cache import invalidate
+from dashboard_data import PREFIXO_BIGQUERY
+
+# Atualiza os agregados materializados do BigQuery
+#
+# Uso:
+#   python src/scripts/07_refresh_aggregates.py           # incremental (só chaves tocadas)
+#   python src/scripts/07_refresh_aggregates.py --full    # recálculo completo
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+parser = argparse.ArgumentParser(description="Refresh dos agregados do BigQuery")
+parser.add_argument('--full', action='store_true', help="Recalcula os agregados por completo")
+args = parser.parse_args()
+
+client = get_bigquery_client()
+dataset_id = BQ_DATASET
+
+print(f"📊 Atualizando agregados ({'completo' if args.full else 'incremental'})...")
+for stats in refresh_aggregates(client, dataset_id, completo=args.full):
+    print_stats(stats)
+invalidate(PREFIXO_BIGQUERY)
+
+print("\n🕒 Atualização dos agregados:")
+for agregado, atualizado_em in sorted(freshness(client, dataset_id).items()):
+    print(f"  - {agregado}: {atualizado_em:%d/%m/%Y %H:%M:%S}")
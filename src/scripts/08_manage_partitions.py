@@ -0,0 +1,44 @@
+import argparse
+from dotenv import load_dotenv
+from db import pg_connection
+from pg_partitions import create_future_partitions, detach_old_partitions, is_partitioned, list_partitions
+from pg_schema import PARTICIONAMENTO
+
+# Manutenção das partições mensais de viagens/eventos (rodar mensalmente, ex.: cron)
+#
+# Uso:
+#   python src/scripts/08_manage_partitions.py --meses-futuros 3 --manter-meses 24
+#   python src/scripts/08_manage_partitions.py --manter-meses 24 --apagar   # apaga em vez de arquivar
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+parser = argparse.ArgumentParser(description="Cria partições futuras e arquiva as antigas")
+parser.add_argument('--meses-futuros', type=int, default=3)
+parser.add_argument('--manter-meses', type=int, default=None,
+                    help="Desanexa partições mais antigas que isso (padrão: não desanexa)")
+parser.add_argument('--apagar', action='store_true', help="Apaga as partições antigas em vez de arquivar")
+args = parser.parse_args()
+
+try:
+    with pg_connection() as conn, conn.cursor() as cur:
+        tabelas = [t for t in PARTICIONAMENTO if is_partitioned(cur, t)]
+        if not tabelas:
+            print("ℹ️  Nenhuma tabela particionada (crie com POSTGRES_PARTICIONADO=1 no 02_setup_postgres.py)")
+        else:
+            print(f"🗂️  Garantindo partições para os próximos {args.meses_futuros} meses...")
+            create_future_partitions(cur, args.meses_futuros)
+
+            if args.manter_meses is not None:
+                destino = "apagadas" if args.apagar else "arquivadas no schema 'arquivo'"
+                for tabela in tabelas:
+                    removidas = detach_old_partitions(cur, tabela, args.manter_meses, apagar=args.apagar)
+                    print(f"📦 {tabela}: {len(removidas)} partição(ões) {destino}")
+
+            for tabela in tabelas:
+                particoes = list_partitions(cur, tabela)
+                if particoes:
+                    print(f"  - {tabela}: {len(particoes)} partições ({particoes[0][1]:%Y-%m} a {particoes[-1][1]:%Y-%m})")
+
+except Exception as e:
+    print(f"❌ Erro: {e}")
@@ -0,0 +1,83 @@
+import argparse
+
+from dotenv import load_dotenv
+
+from alert_rules import AlertEngine
+from bq_loader import BigQueryBackend, DuckDBBackend
+from db import BQ_DATASET, get_bigquery_client, get_firestore_client
+from fs_metrics import MetricsAggregator
+import lake
+from telemetry import TelemetryPipeline, generate_replay, print_stats, replay_file, serve_socket
+
+# Ingestão de telemetria: Firestore (estado atual) + Data Warehouse (histórico bruto)
+#
+# Uso:
+#   python src/scripts/09_ingest_telemetry.py --gerar 1000000              # gera o replay e ingere
+#   python src/scripts/09_ingest_telemetry.py --arquivo telemetria.jsonl --taxa 5000
+#   python src/scripts/09_ingest_telemetry.py --socket 9009                # recebe por TCP até Ctrl+C
+#   python src/scripts/09_ingest_telemetry.py --gerar 200000 --backend duckdb --sem-firestore
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+parser = argparse.ArgumentParser(description="Ingestão de telemetria dos veículos")
+parser.add_argument('--arquivo', default='data/telemetria.jsonl', help="Arquivo de replay (JSON por linha)")
+parser.add_argument('--gerar', type=int, default=None, help="Gera um replay com N mensagens antes de ingerir")
+parser.add_argument('--veiculos', type=int, default=None,
+                    help="Veículos no replay gerado (padrão: placas do data lake)")
+parser.add_argument('--taxa', type=float, default=None, help="Mensagens/s do replay (padrão: sem limite)")
+parser.add_argument('--socket', type=int, default=None, metavar='PORTA', help="Recebe mensagens por TCP")
+parser.add_argument('--backend', choices=['bigquery', 'duckdb', 'nenhum'], default='bigquery')
+parser.add_argument('--duckdb', default='frota.duckdb', help="Arquivo do DuckDB (backend duckdb)")
+parser.add_argument('--sem-firestore', action='store_true', help="Não atualiza veiculos_status")
+parser.add_argument('--alertas', action='store_true', help="Avalia as regras de alerta sobre a telemetria")
+parser.add_argument('--batch-size', type=int, default=5_000)
+parser.add_argument('--max-espera', type=float, default=0.5, help="Segundos máximos para fechar um micro-lote")
+parser.add_argument('--fila', type=int, default=50_000, help="Tamanho máximo da fila (backpressure)")
+args = parser.parse_args()
+
+print("📡 Ingestão de telemetria")
+print("=" * 60)
+
+if args.gerar:
+    if args.veiculos:
+        placas = [f"TEL{i:04d}" for i in range(args.veiculos)]
+    else:
+        placas = lake.read('veiculos', ['placa'])['placa'].tolist()
+    total = generate_replay(args.arquivo, placas, args.gerar)
+    print(f"🎲 Replay gerado: {total:,} mensagens de {len(placas):,} veículos em {args.arquivo}")
+
+if args.backend == 'bigquery':
+    backend = BigQueryBackend(get_bigquery_client(), BQ_DATASET)
+elif args.backend == 'duckdb':
+    backend = DuckDBBackend(args.duckdb)
+else:
+    backend = None
+db = None if args.sem_firestore else get_firestore_client()
+
+motor_alertas = metricas = None
+if args.alertas and db is not None:
+    motor_alertas = AlertEngine()
+    motor_alertas.load_open(db)
+    metricas = MetricsAggregator(db)
+
+pipeline = TelemetryPipeline(db, backend, batch_size=args.batch_size, max_espera=args.max_espera,
+                             tamanho_fila=args.fila, motor_alertas=motor_alertas, metricas=metricas)
+try:
+    with pipeline:
+        if args.socket:
+            servidor = serve_socket(pipeline, porta=args.socket)
+            print(f"🔌 Aguardando telemetria na porta {args.socket} (Ctrl+C para encerrar)...")
+            try:
+                servidor.serve_forever()
+            except KeyboardInterrupt:
+                servidor.server_close()
+        else:
+            print(f"▶️  Reproduzindo {args.arquivo}...")
+            replay_file(pipeline, args.arquivo, taxa=args.taxa)
+
+    print("\n✅ Ingestão concluída!")
+    print_stats(pipeline.stats())
+
+except Exception as e:
+    print(f"\n❌ Erro na ingestão: {e}")
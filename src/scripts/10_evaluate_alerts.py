@@ -0,0 +1,56 @@
+import argparse
+import time
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from alert_rules import AlertEngine, print_stats
+from db import get_firestore_client
+from fs_metrics import MetricsAggregator
+from fs_writer import BatchWriter, print_stats as print_writer_stats
+
+# Avalia as regras de alerta sobre o estado atual de veiculos_status
+# (combustível, velocidade, temperatura do motor, revisão) e grava só as mudanças.
+#
+# Uso:
+#   python src/scripts/10_evaluate_alerts.py                  # uma avaliação
+#   python src/scripts/10_evaluate_alerts.py --intervalo 60   # a cada 60s, até Ctrl+C
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+parser = argparse.ArgumentParser(description="Motor de regras de alerta")
+parser.add_argument('--intervalo', type=float, default=None, help="Reavalia a cada N segundos")
+args = parser.parse_args()
+
+CAMPOS = ['placa', 'combustivel_nivel', 'velocidade_atual', 'temperatura_motor', 'km_atual', 'proximo_servico_km']
+
+db = get_firestore_client()
+motor = AlertEngine()
+metricas = MetricsAggregator(db)
+
+print("🚨 Motor de regras de alerta")
+print("=" * 60)
+print(f"📂 {motor.load_open(db)} alertas de regras já abertos")
+
+try:
+    while True:
+        inicio = time.perf_counter()
+        # Só os campos usados pelas regras; o id do documento é a placa
+        docs = db.collection('veiculos_status').select(CAMPOS[1:]).stream()
+        estado = pd.DataFrame([{**doc.to_dict(), 'placa': doc.id} for doc in docs], columns=CAMPOS)
+        leitura = time.perf_counter() - inicio
+
+        with BatchWriter(db) as writer:
+            stats = motor.apply(db, writer, estado, metricas)
+        metricas.flush(consolidar=True)
+
+        print(f"\n🕒 {pd.Timestamp.now():%H:%M:%S} - {len(estado):,} veículos lidos em {leitura:.2f}s")
+        print_stats(stats)
+        print_writer_stats(writer.stats(), 'escritas')
+
+        if args.intervalo is None:
+            break
+        time.sleep(args.intervalo)
+except KeyboardInterrupt:
+    pass
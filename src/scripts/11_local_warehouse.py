@@ -0,0 +1,69 @@
+import argparse
+import time
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from bq_aggregates import refresh_aggregates, print_stats as print_aggregate_stats
+from bq_local import DuckDBClient
+from cache import invalidate
+from dashboard_data import PREFIXO_BIGQUERY
+from db import BQ_DATASET
+from demo_queries import CONSULTAS_BIGQUERY, load_demo_queries
+
+# Data Warehouse local (DuckDB sobre o data lake), no lugar do BigQuery
+#
+# Cria veiculos/motoristas/viagens a partir de data/lake, calcula os agregados
+# com o mesmo código do BigQuery (bq_aggregates.py) e executa as consultas 4-6
+# de queries/consultas_demo.sql, tudo offline.
+#
+# Uso:
+#   python src/scripts/11_local_warehouse.py                               # em memória
+#   python src/scripts/11_local_warehouse.py --duckdb data/frota_dw.duckdb
+#   BQ_LOCAL=data/frota_dw.duckdb python src/scripts/05_test_queries.py    # scripts usam o arquivo local
+#
+# Com --materializar, as tabelas são copiadas (em vez de views sobre o Parquet):
+# necessário para receber as cargas incrementais do 06_sync_incremental.py.
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+parser = argparse.ArgumentParser(description="Data Warehouse local em DuckDB")
+parser.add_argument('--duckdb', default=':memory:', help="Arquivo do DuckDB (padrão: em memória)")
+parser.add_argument('--lake', default=None, help="Diretório do data lake (padrão: data/lake)")
+parser.add_argument('--materializar', action='store_true', help="Copia as tabelas em vez de criar views")
+parser.add_argument('--linhas', type=int, default=5, help="Linhas exibidas por consulta")
+args = parser.parse_args()
+
+print("🦆 Data Warehouse local (DuckDB)")
+print("=" * 60)
+
+client = DuckDBClient(args.duckdb)
+
+inicio = time.perf_counter()
+tabelas = client.attach_lake(args.lake, materializar=args.materializar)
+print(f"📥 {', '.join(tabelas)} {'copiadas' if args.materializar else 'expostas como views'} "
+      f"em {time.perf_counter() - inicio:.2f}s")
+for tabela in tabelas:
+    print(f"  - {tabela}: {client.get_table(tabela).num_rows:,} linhas")
+
+print("\n📊 Criando agregados analíticos...")
+inicio = time.perf_counter()
+for stats in refresh_aggregates(client, BQ_DATASET, completo=True):
+    print_aggregate_stats(stats)
+print(f"  ⏱️  {time.perf_counter() - inicio:.2f}s")
+if args.duckdb != ':memory:':
+    invalidate(PREFIXO_BIGQUERY)
+
+pd.set_option('display.width', 140)
+for numero, consulta in load_demo_queries().items():
+    if numero not in CONSULTAS_BIGQUERY:
+        continue
+    inicio = time.perf_counter()
+    df = client.query(consulta['sql']).to_dataframe()
+    print(f"\n🔎 {numero}. {consulta['titulo']} ({len(df)} linhas, {(time.perf_counter() - inicio) * 1000:.1f} ms)")
+    print(df.head(args.linhas).to_string(index=False))
+
+if args.duckdb != ':memory:':
+    print(f"\n✅ Warehouse local salvo em {args.duckdb}")
+    print(f"   Para usá-lo nos outros scripts: BQ_LOCAL={args.duckdb}")
@@ -0,0 +1,97 @@
+import argparse
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from cache import invalidate
+from checkpoint import Checkpoint
+from dashboard_data import PREFIXO_BIGQUERY, PREFIXO_FIRESTORE
+from db import BQ_DATASET
+from fanout import FirestoreSink, PostgresSink, WarehouseSink, fan_out, print_stats
+
+# Pipeline de carga idempotente e retomável: data lake -> PostgreSQL, BigQuery e Firestore
+#
+# Sem perguntas (a configuração vem do .env, como nos outros scripts): cada tabela
+# é carregada em blocos confirmados um a um, de forma idempotente
+#   - PostgreSQL: COPY numa tabela temporária + INSERT ... ON CONFLICT (pg_loader, método 'upsert')
+#   - BigQuery:   load job (append) com id derivado da geração do checkpoint e do bloco
+#                 (bq_loader.load_chunk); a tabela é recriada quando a carga recomeça do zero
+#   - Firestore:  ids determinísticos (placa em veiculos_status, evento_id em alertas)
+# e cada bloco confirmado é registrado em data/checkpoints/<destino>.json. Se a
+# execução cair no meio, rodar de novo continua do primeiro bloco pendente;
+# repetir um bloco não duplica linhas. Se o lake for regravado (01_generate_data.py),
+# a assinatura dos arquivos muda e a tabela recomeça.
+#
+# O lake é lido uma vez só e cada bloco segue para os destinos em paralelo
+# (fanout.py): uma thread e uma fila limitada por tabela e destino, e as tabelas
+# independentes são gravadas ao mesmo tempo. No fim, o tempo de cada destino e
+# quanto a leitura esperou por ele mostram qual é o gargalo.
+#
+# Uso:
+#   python src/scripts/12_run_pipeline.py                          # os três destinos
+#   python src/scripts/12_run_pipeline.py --destinos postgres bigquery --chunk-rows 100000
+#   python src/scripts/12_run_pipeline.py --reiniciar              # ignora os checkpoints e recarrega tudo
+#
+# --reiniciar também esvazia as tabelas do PostgreSQL (o upsert não remove linhas que
+# saíram do lake); no BigQuery, as tabelas são recriadas.
+# Com BQ_LOCAL definido, o Data Warehouse é o DuckDB local (bq_local.py).
+# Documentos que não existem mais no lake não são apagados: para uma carga limpa
+# do Firestore, use o 04_setup_firestore.py.
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+DESTINOS = ['postgres', 'bigquery', 'firestore']
+
+parser = argparse.ArgumentParser(description="Carga idempotente e retomável nos três bancos")
+parser.add_argument('--destinos', nargs='+', choices=DESTINOS, default=DESTINOS)
+parser.add_argument('--chunk-rows', type=int, default=200_000, help="Linhas por bloco (um commit/checkpoint por bloco)")
+parser.add_argument('--fila', type=int, default=4, help="Blocos em espera por tabela e destino (limita a memória)")
+parser.add_argument('--lake', default=None, help="Diretório do data lake (padrão: data/lake)")
+parser.add_argument('--checkpoint-dir', default=None, help="Diretório dos checkpoints (padrão: data/checkpoints)")
+parser.add_argument('--reiniciar', action='store_true', help="Apaga os checkpoints e esvazia as tabelas do PostgreSQL antes de começar")
+args = parser.parse_args()
+
+# POSTGRES_PARTICIONADO=1: viagens/eventos particionadas por mês (como no 02_setup_postgres.py)
+PARTICIONADO = os.getenv("POSTGRES_PARTICIONADO", "0").lower() in ("1", "true", "sim")
+
+
+def build_sink(destino):
+    checkpoint = Checkpoint(destino, args.checkpoint_dir)
+    if args.reiniciar:
+        checkpoint.clear()
+    if destino == 'postgres':
+        return PostgresSink(checkpoint, particionado=PARTICIONADO, limpar=args.reiniciar, tamanho_fila=args.fila)
+    if destino == 'bigquery':
+        return WarehouseSink(checkpoint, BQ_DATASET, tamanho_fila=args.fila)
+    return FirestoreSink(checkpoint, tamanho_fila=args.fila)
+
+
+print("🚚 Pipeline de carga (idempotente e retomável)")
+print("=" * 60)
+print(f"📥 Destinos: {', '.join(args.destinos)}")
+
+inicio = time.perf_counter()
+sinks = [build_sink(destino) for destino in args.destinos]
+
+resultado = fan_out(sinks, chunk_rows=args.chunk_rows, diretorio=args.lake)
+
+print("\n📊 Por destino:")
+print_stats(resultado)
+print(f"  ⏱️  total: {time.perf_counter() - inicio:.2f}s")
+
+PREFIXOS = {'bigquery': PREFIXO_BIGQUERY, 'firestore': PREFIXO_FIRESTORE}
+falhas = [sink for sink in sinks if sink.erro is not None]
+for sink in sinks:
+    if sink.erro is None and sink.nome in PREFIXOS:
+        invalidate(PREFIXOS[sink.nome])
+
+if falhas:
+    for sink in falhas:
+        print(f"\n❌ Erro em {sink.nome}: {sink.erro}")
+        print(f"   Os blocos já confirmados estão em {sink.checkpoint.caminho}: rode de novo para continuar.")
+    sys.exit(1)
+
+print("\n✅ Pipeline concluído!")
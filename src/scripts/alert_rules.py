@@ -0,0 +1,191 @@
+# Motor de regras de alerta (vetorizado)
+#
+# Avalia as regras sobre um lote de estados de veículos (DataFrame com uma linha
+# por placa) de uma vez, com NumPy, e compara com os alertas abertos:
+#   - novo:       regra disparou e não havia alerta aberto -> cria
+#   - escalado:   alerta aberto e a prioridade subiu       -> atualiza
+#   - resolvido:  alerta aberto e a regra não dispara mais  -> remove
+#   - o resto (mesmo alerta, mesma ou menor prioridade) não gera escrita
+#
+# O id do documento é '<placa>_<regra>': no máximo um alerta aberto por
+# veículo e regra (deduplicação). A coleção alertas continua guardando só
+# alertas ativos, como no 04_setup_firestore.py.
+#
+# Regras cujas colunas não estão no lote são ignoradas, e só os veículos do lote
+# podem ter alertas resolvidos: lotes parciais (ex.: só telemetria) são seguros.
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from fs_docs import CORES_PRIORIDADE
+
+PRIORIDADES = ['Baixa', 'Média', 'Alta']  # índice + 1 = nível (0 = não dispara)
+
+# Cada regra: colunas usadas e uma função que devolve o nível (0-3) por linha
+REGRAS = {
+    'combustivel_baixo': {
+        'tipo': 'Combustível baixo',
+        'colunas': ['combustivel_nivel'],
+        'valor': 'combustivel_nivel',
+        'nivel': lambda df: np.select(
+            [df['combustivel_nivel'] < 5, df['combustivel_nivel'] < 10, df['combustivel_nivel'] < 20], [3, 2, 1], 0),
+        'descricao': "Nível de combustível em {valor:.0f}%",
+    },
+    'excesso_velocidade': {
+        'tipo': 'Excesso de velocidade',
+        'colunas': ['velocidade_atual'],
+        'valor': 'velocidade_atual',
+        'nivel': lambda df: np.select(
+            [df['velocidade_atual'] > 120, df['velocidade_atual'] > 100, df['velocidade_atual'] > 90], [3, 2, 1], 0),
+        'descricao': "Velocidade de {valor:.0f} km/h",
+    },
+    'temperatura_motor': {
+        'tipo': 'Temperatura do motor',
+        'colunas': ['temperatura_motor'],
+        'valor': 'temperatura_motor',
+        'nivel': lambda df: np.select(
+            [df['temperatura_motor'] > 110, df['temperatura_motor'] > 100], [3, 2], 0),
+        'descricao': "Motor a {valor:.0f} °C",
+    },
+    'manutencao_vencida': {
+        'tipo': 'Manutenção',
+        'colunas': ['km_atual', 'proximo_servico_km'],
+        'valor': 'km_para_servico',
+        'nivel': lambda df: np.select(
+            [df['km_para_servico'] <= -2000, df['km_para_servico'] <= 0, df['km_para_servico'] <= 500], [3, 2, 1], 0),
+        'descricao': "{valor:,.0f} km até a revisão (negativo = vencida)",
+    },
+}
+
+
+def evaluate(df_estado, regras=REGRAS):
+    """Alertas disparados no lote: DataFrame (placa, regra, nivel, valor), um por placa/regra."""
+    df = df_estado
+    if 'km_atual' in df and 'proximo_servico_km' in df:
+        df = df.assign(km_para_servico=df['proximo_servico_km'] - df['km_atual'])
+
+    partes = []
+    for nome, regra in regras.items():
+        if not all(coluna in df for coluna in regra['colunas']):
+            continue
+        nivel = regra['nivel'](df)
+        disparou = nivel > 0
+        partes.append(pd.DataFrame({
+            'placa': df['placa'].to_numpy()[disparou],
+            'regra': nome,
+            'nivel': nivel[disparou],
+            'valor': df[regra['valor']].to_numpy()[disparou],
+        }))
+    if not partes:
+        return pd.DataFrame(columns=['placa', 'regra', 'nivel', 'valor'])
+    return pd.concat(partes, ignore_index=True)
+
+
+def evaluated_rules(df_estado, regras=REGRAS):
+    return [nome for nome, regra in regras.items() if all(coluna in df_estado for coluna in regra['colunas'])]
+
+
+def alert_doc(placa, regra, nivel, valor, agora):
+    prioridade = PRIORIDADES[nivel - 1]
+    config = REGRAS[regra]
+    return {
+        'placa': placa,
+        'tipo': config['tipo'],
+        'regra': regra,
+        'origem': 'regras',
+        'prioridade': prioridade,
+        'nivel': int(nivel),
+        'valor': float(valor),
+        'descricao': config['descricao'].format(valor=valor),
+        'data_criacao': agora,
+        'responsavel': None,
+        'observacoes': [],
+        'prioridade_info': CORES_PRIORIDADE[prioridade],
+    }
+
+
+class AlertEngine:
+    """Mantém os alertas abertos gerados pelas regras e calcula só as mudanças."""
+
+    def __init__(self, regras=REGRAS):
+        self.regras = regras
+        self.abertos = pd.DataFrame({'placa': pd.Series(dtype=object), 'regra': pd.Series(dtype=object),
+                                     'nivel': pd.Series(dtype='int64')})
+
+    def load_open(self, db):
+        """Carrega os alertas de regras já abertos no Firestore (ao iniciar)."""
+        docs = db.collection('alertas').where('origem', '==', 'regras').stream()
+        linhas = [{'placa': d.get('placa'), 'regra': d.get('regra'), 'nivel': d.get('nivel')} for d in docs]
+        if linhas:
+            self.abertos = pd.DataFrame(linhas).astype({'nivel': 'int64'})
+        return len(self.abertos)
+
+    def diff(self, df_estado):
+        """Compara o lote com os alertas abertos. Devolve (novos, escalados, resolvidos)
+        e atualiza o estado interno."""
+        disparados = evaluate(df_estado, self.regras)
+
+        # Só os abertos que este lote pode confirmar ou resolver
+        no_escopo = (self.abertos['placa'].isin(df_estado['placa'])
+                     & self.abertos['regra'].isin(evaluated_rules(df_estado, self.regras)))
+        abertos = self.abertos[no_escopo]
+
+        juntos = disparados.merge(abertos, on=['placa', 'regra'], how='outer',
+                                  suffixes=('', '_aberto'), indicator=True)
+        novos = juntos[juntos['_merge'] == 'left_only']
+        resolvidos = juntos[juntos['_merge'] == 'right_only']
+        ambos = juntos[juntos['_merge'] == 'both']
+        escalados = ambos[ambos['nivel'] > ambos['nivel_aberto']]
+
+        # Novo estado: abertos fora do escopo + (escopo: o que continua disparando, com o maior nível)
+        mantidos = ambos.assign(nivel=np.maximum(ambos['nivel'], ambos['nivel_aberto']))
+        self.abertos = pd.concat([
+            self.abertos[~no_escopo],
+            novos[['placa', 'regra', 'nivel']],
+            mantidos[['placa', 'regra', 'nivel']],
+        ], ignore_index=True).astype({'nivel': 'int64'})
+
+        colunas = ['placa', 'regra', 'nivel', 'valor']
+        return (novos[colunas].astype({'nivel': 'int64'}).reset_index(drop=True),
+                escalados[colunas + ['nivel_aberto']].astype({'nivel': 'int64', 'nivel_aberto': 'int64'})
+                .reset_index(drop=True),
+                resolvidos[['placa', 'regra', 'nivel_aberto']].astype({'nivel_aberto': 'int64'})
+                .reset_index(drop=True))
+
+    def apply(self, db, writer, df_estado, metricas=None):
+        """Avalia o lote e grava só as mudanças (writer: fs_writer.BatchWriter).
+        Se metricas (fs_metrics.MetricsAggregator) for passado, atualiza os contadores."""
+        novos, escalados, resolvidos = self.diff(df_estado)
+        colecao = db.collection('alertas')
+        agora = datetime.now()
+
+        for placa, regra, nivel, valor in novos.itertuples(index=False):
+            writer.set(colecao.document(f"{placa}_{regra}"), alert_doc(placa, regra, nivel, valor, agora))
+            if metricas:
+                metricas.alert_opened(PRIORIDADES[nivel - 1])
+
+        for placa, regra, nivel, valor, nivel_aberto in escalados.itertuples(index=False):
+            prioridade = PRIORIDADES[nivel - 1]
+            writer.set(colecao.document(f"{placa}_{regra}"), {
+                'prioridade': prioridade,
+                'nivel': int(nivel),
+                'valor': float(valor),
+                'descricao': REGRAS[regra]['descricao'].format(valor=valor),
+                'prioridade_info': CORES_PRIORIDADE[prioridade],
+                'escalado_em': agora,
+            }, merge=True)
+            if metricas:
+                metricas.alert_escalated(PRIORIDADES[int(nivel_aberto) - 1], prioridade)
+
+        for placa, regra, nivel_aberto in resolvidos.itertuples(index=False):
+            writer.delete(colecao.document(f"{placa}_{regra}"))
+            if metricas:
+                metricas.alert_resolved(PRIORIDADES[int(nivel_aberto) - 1])
+
+        return {'novos': len(novos), 'escalados': len(escalados), 'resolvidos': len(resolvidos)}
+
+
+def print_stats(stats):
+    print(f"  🚨 Alertas: {stats['novos']} novos, {stats['escalados']} escalados, {stats['resolvidos']} resolvidos")
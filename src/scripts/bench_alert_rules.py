@@ -0,0 +1,84 @@
+# Benchmark do motor de regras de alerta (alert_rules.py)
+#
+# Gera o estado de N veículos, avalia as regras e calcula as mudanças em relação
+# aos alertas abertos em várias rodadas (cada rodada altera parte da frota).
+# Meta: avaliar + comparar 100 mil veículos em menos de 1 segundo.
+#
+# Uso:
+#   python src/scripts/bench_alert_rules.py --veiculos 100000 --rodadas 5
+
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from alert_rules import AlertEngine, evaluate
+
+parser = argparse.ArgumentParser(description="Desempenho do motor de regras de alerta")
+parser.add_argument('--veiculos', type=int, default=100_000)
+parser.add_argument('--rodadas', type=int, default=5)
+parser.add_argument('--mudanca', type=float, default=0.05, help="Fração da frota alterada a cada rodada")
+parser.add_argument('--seed', type=int, default=42)
+parser.add_argument('--saida', default=None, help="Arquivo JSON com os resultados")
+args = parser.parse_args()
+
+rng = np.random.default_rng(args.seed)
+n = args.veiculos
+km_atual = rng.integers(10_000, 300_000, n)
+estado = pd.DataFrame({
+    'placa': [f"B{i:07d}" for i in range(n)],
+    'combustivel_nivel': rng.uniform(0, 100, n).round(1),
+    'velocidade_atual': rng.normal(75, 20, n).clip(0, 140).round(1),
+    'temperatura_motor': rng.normal(90, 7, n).round(1),
+    'km_atual': km_atual,
+    'proximo_servico_km': km_atual + rng.integers(-3_000, 5_000, n),
+})
+
+print("🚨 Benchmark do motor de regras de alerta")
+print("=" * 60)
+print(f"🚛 {n:,} veículos, {args.rodadas} rodadas, {args.mudanca:.0%} da frota alterada por rodada\n")
+
+motor = AlertEngine()
+resultados = []
+for rodada in range(args.rodadas):
+    if rodada:
+        # Parte da frota muda de estado entre as rodadas
+        alterados = rng.choice(n, int(n * args.mudanca), replace=False)
+        estado.loc[alterados, 'combustivel_nivel'] = rng.uniform(0, 100, len(alterados)).round(1)
+        estado.loc[alterados, 'velocidade_atual'] = rng.normal(75, 20, len(alterados)).clip(0, 140).round(1)
+        estado.loc[alterados, 'temperatura_motor'] = rng.normal(90, 7, len(alterados)).round(1)
+
+    inicio = time.perf_counter()
+    disparados = evaluate(estado)
+    avaliacao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    novos, escalados, resolvidos = motor.diff(estado)
+    total = time.perf_counter() - inicio  # diff inclui a avaliação
+
+    resultado = {
+        'rodada': rodada + 1,
+        'avaliacao_ms': avaliacao * 1000,
+        'avaliacao_e_diff_ms': total * 1000,
+        'disparados': len(disparados),
+        'novos': len(novos),
+        'escalados': len(escalados),
+        'resolvidos': len(resolvidos),
+        'abertos': len(motor.abertos),
+    }
+    resultados.append(resultado)
+    print(f"  rodada {rodada + 1}: avaliação {resultado['avaliacao_ms']:7.1f} ms, com diff {resultado['avaliacao_e_diff_ms']:7.1f} ms"
+          f" | {resultado['novos']:6,} novos, {resultado['escalados']:5,} escalados, {resultado['resolvidos']:5,} resolvidos"
+          f" (escritas: {resultado['novos'] + resultado['escalados'] + resultado['resolvidos']:,})")
+
+mediana = statistics.median(r['avaliacao_e_diff_ms'] for r in resultados)
+marca = "✅" if mediana < 1000 else "⚠️"
+print(f"\n{marca} Mediana (avaliação + diff): {mediana:.1f} ms para {n:,} veículos")
+
+if args.saida:
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2)
+    print(f"\n💾 Resultados salvos em {args.saida}")
@@ -0,0 +1,139 @@
+# Relatório de custo das consultas do BigQuery (bytes processados antes x depois)
+#
+# "Antes": tabela viagens sem particionamento/clustering (cópia temporária) e os
+# agregados calculados como views. "Depois": viagens particionada por data_saida,
+# com cluster por veiculo_id/motorista_id, e os agregados materializados.
+#
+# Por padrão usa dry run (gratuito). O dry run já reflete a poda de partições;
+# a economia do clustering só aparece executando as consultas (--executar).
+#
+# Uso:
+#   python src/scripts/bench_bq_cost.py --saida cost_report.json
+
+import argparse
+import json
+
+from google.cloud import bigquery
+from dotenv import load_dotenv
+
+from bq_aggregates import AGREGADOS
+from db import BQ_DATASET, get_bigquery_client
+
+load_dotenv()
+
+parser = argparse.ArgumentParser(description="Bytes processados pelas consultas, antes e depois do particionamento")
+parser.add_argument('--executar', action='store_true', help="Executa as consultas (cobrado) em vez de dry run")
+parser.add_argument('--manter-copia', action='store_true', help="Não apaga a cópia sem particionamento no final")
+parser.add_argument('--saida', default=None, help="Arquivo JSON com os resultados")
+args = parser.parse_args()
+
+client = get_bigquery_client()
+ds = BQ_DATASET
+copia = f"{ds}.viagens_sem_particao"
+
+
+def view_original(nome, viagens):
+    # Mesma definição das antigas views, lendo a tabela indicada
+    return AGREGADOS[nome]['calculo'].format(ds=ds, filtro='TRUE').replace(f"`{ds}.viagens`", f"`{viagens}`")
+
+
+# Consultas direto na tabela fato: {viagens} = cópia sem partição (antes) ou viagens (depois)
+CONSULTAS_FATO = {
+    'viagens_ultimos_30_dias': """
+        SELECT veiculo_id, COUNT(*) AS viagens, SUM(km_percorridos) AS km
+        FROM `{viagens}`
+        WHERE data_saida >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 30 DAY)
+        GROUP BY veiculo_id
+    """,
+    'resumo_mes_atual': """
+        SELECT FORMAT_TIMESTAMP('%Y-%m', data_saida) AS mes, SUM(km_percorridos) AS km_total,
+               SUM(custo_combustivel) AS custo_total
+        FROM `{viagens}`
+        WHERE data_saida >= TIMESTAMP_TRUNC(CURRENT_TIMESTAMP(), MONTH)
+        GROUP BY mes
+    """,
+    'historico_um_veiculo': """
+        SELECT data_saida, origem, destino, km_percorridos
+        FROM `{viagens}`
+        WHERE veiculo_id = 1
+    """,
+}
+
+# Consultas 4-6 de queries/consultas_demo.sql: antes leem a view, depois o agregado materializado
+CONSULTAS_DEMO = {
+    '4_custos_mensais': ('resumo_mensal', """
+        SELECT mes, veiculos_ativos, total_viagens, km_total, custo_total,
+               ROUND(custo_total / km_total, 2) as custo_por_km,
+               ROUND(custo_total / total_viagens, 2) as custo_medio_viagem
+        FROM {tabela}
+        ORDER BY mes DESC
+        LIMIT 6
+    """),
+    '5_ranking_veiculos': ('analise_por_veiculo', """
+        SELECT placa, modelo, tipo, total_viagens, km_total, custo_total, custo_por_km,
+               RANK() OVER (ORDER BY custo_por_km ASC) as ranking_eficiencia
+        FROM {tabela}
+        WHERE km_total > 0
+        ORDER BY ranking_eficiencia
+    """),
+    '6_yoy': ('resumo_mensal', """
+        SELECT EXTRACT(YEAR FROM PARSE_TIMESTAMP('%Y-%m', mes)) as ano,
+               SUM(km_total) as km_anual, SUM(custo_total) as custo_anual,
+               COUNT(DISTINCT mes) as meses_operacao,
+               ROUND(SUM(custo_total) / SUM(km_total), 2) as custo_medio_km_anual
+        FROM {tabela}
+        GROUP BY ano
+        ORDER BY ano DESC
+    """),
+}
+
+
+def bytes_processados(query):
+    job_config = bigquery.QueryJobConfig(dry_run=not args.executar, use_query_cache=False)
+    job = client.query(query, job_config=job_config)
+    if args.executar:
+        job.result()
+        return job.total_bytes_billed or 0
+    return job.total_bytes_processed or 0
+
+
+def formatar(n):
+    for unidade in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if n < 1024:
+            return f"{n:,.1f} {unidade}"
+        n /= 1024
+    return f"{n:,.1f} PB"
+
+
+print(f"💰 Relatório de custo BigQuery ({'execução' if args.executar else 'dry run'})")
+print("=" * 60)
+
+print("\n📋 Criando cópia sem particionamento para comparação...")
+client.query(f"CREATE OR REPLACE TABLE `{copia}` AS SELECT * FROM `{ds}.viagens`").result()
+
+consultas = {}
+for nome, sql in CONSULTAS_FATO.items():
+    consultas[nome] = (sql.format(viagens=copia), sql.format(viagens=f"{ds}.viagens"))
+for nome, (agregado, sql) in CONSULTAS_DEMO.items():
+    antes = f"WITH {agregado} AS ({view_original(agregado, copia)}) {sql.format(tabela=agregado)}"
+    consultas[nome] = (antes, sql.format(tabela=f"`{ds}.{agregado}`"))
+
+resultados = []
+try:
+    print(f"\n{'consulta':28s} {'antes':>14s} {'depois':>14s} {'redução':>9s}")
+    print("-" * 68)
+    for nome, (antes, depois) in consultas.items():
+        b_antes = bytes_processados(antes)
+        b_depois = bytes_processados(depois)
+        reducao = 100 * (1 - b_depois / b_antes) if b_antes else 0.0
+        print(f"{nome:28s} {formatar(b_antes):>14s} {formatar(b_depois):>14s} {reducao:8.1f}%")
+        resultados.append({'consulta': nome, 'bytes_antes': b_antes, 'bytes_depois': b_depois,
+                           'reducao_pct': round(reducao, 2)})
+finally:
+    if not args.manter_copia:
+        client.delete_table(copia, not_found_ok=True)
+
+if args.saida:
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump({'modo': 'execucao' if args.executar else 'dry_run', 'resultados': resultados}, f, indent=2)
+    print(f"\n💾 Resultados salvos em {args.saida}")
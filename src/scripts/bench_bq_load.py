@@ -0,0 +1,50 @@
+# Teste/benchmark offline da carga do Data Warehouse
+# Usa o mesmo caminho de carga do 03_setup_bigquery.py (lake -> Parquet -> load),
+# mas com o DuckDB como destino no lugar do BigQuery. Com --origem csv, lê os
+# CSVs antigos (gerados com --formato csv), para comparar.
+#
+# Uso:
+#   python src/scripts/bench_bq_load.py --data-dir data --chunk-rows 100000
+#   python src/scripts/bench_bq_load.py --origem csv
+
+import argparse
+import os
+import time
+
+from bq_loader import DuckDBBackend, load_tables, print_stats
+from bq_schema import SCHEMAS
+from lake import ESQUEMAS
+
+parser = argparse.ArgumentParser(description="Carga do DW em DuckDB local")
+parser.add_argument('--data-dir', default='data')
+parser.add_argument('--origem', choices=['lake', 'csv'], default='lake')
+parser.add_argument('--duckdb', default=':memory:', help="Arquivo do DuckDB (padrão: em memória)")
+parser.add_argument('--chunk-rows', type=int, default=500_000)
+parser.add_argument('--workers', type=int, default=4)
+args = parser.parse_args()
+
+print(f"🦆 Carga do Data Warehouse em DuckDB (offline, a partir do {args.origem})")
+print("=" * 60)
+
+backend = DuckDBBackend(args.duckdb)
+origens = {tabela: (os.path.join(args.data_dir, f'{tabela}.csv') if args.origem == 'csv'
+                    else os.path.join(args.data_dir, 'lake'))
+           for tabela in SCHEMAS if tabela in ESQUEMAS}
+tarefas = [(tabela, SCHEMAS[tabela], origem) for tabela, origem in origens.items()]
+
+inicio = time.perf_counter()
+resultados = load_tables(backend, tarefas, max_workers=args.workers, chunk_rows=args.chunk_rows)
+total = time.perf_counter() - inicio
+
+for stats in resultados:
+    print_stats(stats)
+
+# Conferir se o DuckDB recebeu tudo
+print("\n✅ Verificando contagens:")
+for stats in resultados:
+    contagem = backend.con.execute(f"SELECT COUNT(*) FROM {stats['tabela']}").fetchone()[0]
+    status = "✅" if contagem == stats['linhas'] else "❌"
+    print(f"  {status} {stats['tabela']}: {contagem:,} linhas")
+
+linhas = sum(s['linhas'] for s in resultados)
+print(f"\n⏱️  Total: {linhas:,} linhas em {total:.2f}s ({linhas / total:,.0f} linhas/s)")
@@ -0,0 +1,88 @@
+# Benchmark: montagem dos documentos de veiculos_status e alertas
+# Compara a varredura por veículo (código original) com os índices pré-calculados
+# do fs_docs. Não escreve no Firestore: mede só a montagem dos documentos.
+#
+# Uso:
+#   python src/scripts/bench_firestore_docs.py --veiculos 10000 --viagens 10000000
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from fs_docs import alert_docs, placas_por_veiculo, ultimas_viagens, vehicle_status_docs
+
+parser = argparse.ArgumentParser(description="Benchmark da montagem dos documentos do Firestore")
+parser.add_argument('--veiculos', type=int, default=10_000)
+parser.add_argument('--viagens', type=int, default=10_000_000)
+parser.add_argument('--eventos', type=int, default=100_000)
+parser.add_argument('--motoristas', type=int, default=20_000)
+parser.add_argument('--amostra-antigo', type=int, default=100,
+                    help="Veículos medidos no método antigo (o tempo total é extrapolado)")
+args = parser.parse_args()
+
+rng = np.random.default_rng(42)
+status = np.array(['Disponível', 'Em viagem', 'Manutenção'], dtype=object)
+cidades = np.array(['São Paulo', 'Curitiba', 'Recife', 'Brasília'], dtype=object)
+
+print(f"🧪 Gerando dados: {args.veiculos:,} veículos, {args.viagens:,} viagens, {args.eventos:,} eventos...")
+df_veiculos = pd.DataFrame({
+    'id': np.arange(1, args.veiculos + 1),
+    'placa': [f"BEN-{i:05d}" for i in range(1, args.veiculos + 1)],
+    'modelo': 'Iveco Daily',
+    'status': status[rng.integers(0, 3, args.veiculos)],
+    'km_atual': rng.integers(10000, 150000, args.veiculos),
+})
+df_motoristas = pd.DataFrame({
+    'id': np.arange(1, args.motoristas + 1),
+    'nome': [f"Motorista {i}" for i in range(1, args.motoristas + 1)],
+})
+saida = np.datetime64('2025-06-01T00:00:00') - rng.integers(0, 180 * 86400, args.viagens).astype('timedelta64[s]')
+df_viagens = pd.DataFrame({
+    'veiculo_id': rng.integers(1, args.veiculos + 1, args.viagens),
+    'data_saida': np.datetime_as_string(saida, unit='s'),
+    'data_chegada': np.datetime_as_string(saida + np.timedelta64(10, 'h'), unit='s'),
+    'origem': cidades[rng.integers(0, 4, args.viagens)],
+    'destino': cidades[rng.integers(0, 4, args.viagens)],
+    'carga_kg': rng.integers(100, 4000, args.viagens),
+})
+df_eventos = pd.DataFrame({
+    'id': np.arange(1, args.eventos + 1),
+    'veiculo_id': rng.integers(1, args.veiculos + 1, args.eventos),
+    'tipo': 'Troca de Óleo',
+    'data_evento': '2025-06-01 00:00:00',
+    'descricao': 'Evento de teste',
+    'prioridade': np.array(['Baixa', 'Média', 'Alta'], dtype=object)[rng.integers(0, 3, args.eventos)],
+    'resolvido': rng.integers(0, 2, args.eventos).astype(bool),
+})
+
+print("=" * 60)
+
+# 1. Método antigo: filtra df_viagens e ordena para cada veículo
+amostra = df_veiculos.head(args.amostra_antigo)
+inicio = time.perf_counter()
+for _, veiculo in amostra.iterrows():
+    viagens_veiculo = df_viagens[df_viagens['veiculo_id'] == veiculo['id']]
+    if not viagens_veiculo.empty:
+        viagens_veiculo.sort_values('data_saida').iloc[-1]['destino']
+por_veiculo = (time.perf_counter() - inicio) / max(len(amostra), 1)
+antigo = por_veiculo * args.veiculos
+print(f"1️⃣  Varredura por veículo: {por_veiculo * 1000:.1f} ms/veículo "
+      f"→ ~{antigo:,.0f}s estimados para {args.veiculos:,} veículos")
+
+# 2. Índices pré-calculados
+inicio = time.perf_counter()
+ultimas = ultimas_viagens(df_viagens)
+placas = placas_por_veiculo(df_veiculos)
+indices = time.perf_counter() - inicio
+
+inicio = time.perf_counter()
+docs_veiculos = sum(1 for _ in vehicle_status_docs(df_veiculos, ultimas, df_motoristas))
+docs_alertas = sum(1 for _ in alert_docs(df_eventos, placas))
+montagem = time.perf_counter() - inicio
+
+novo = indices + montagem
+print(f"2️⃣  Índices pré-calculados: {indices:.2f}s (índices) + {montagem:.2f}s "
+      f"({docs_veiculos:,} veículos, {docs_alertas:,} alertas)")
+print(f"\n📊 Ganho estimado: {antigo / novo:,.0f}x")
@@ -0,0 +1,69 @@
+# Benchmark: escrita no Firestore documento a documento x em lote (BatchWriter)
+#
+# Pensado para rodar contra o emulador:
+#   gcloud emulators firestore start --host-port=localhost:8080
+#   FIRESTORE_EMULATOR_HOST=localhost:8080 python src/scripts/bench_firestore_write.py --docs 5000
+
+import argparse
+import os
+import random
+import time
+
+from google.cloud import firestore
+
+from fs_writer import BatchWriter, delete_collection, print_stats
+
+parser = argparse.ArgumentParser(description="Compara escrita individual e em lote no Firestore")
+parser.add_argument('--docs', type=int, default=2000)
+parser.add_argument('--colecao', default='bench_escrita')
+parser.add_argument('--workers', type=int, default=8)
+parser.add_argument('--project', default=os.getenv('GOOGLE_CLOUD_PROJECT', 'demo-frota'))
+args = parser.parse_args()
+
+if not os.getenv('FIRESTORE_EMULATOR_HOST'):
+    print("⚠️  FIRESTORE_EMULATOR_HOST não definido: o benchmark vai escrever no Firestore real!")
+
+db = firestore.Client(project=args.project)
+colecao = db.collection(args.colecao)
+
+
+def documento(i):
+    return {
+        'veiculo_id': i,
+        'placa': f"BEN-{i:04d}",
+        'status': random.choice(['Disponível', 'Em viagem', 'Manutenção']),
+        'latitude': -23.5505 + random.uniform(-2, 2),
+        'longitude': -46.6333 + random.uniform(-2, 2),
+        'combustivel_nivel': random.randint(20, 100),
+    }
+
+
+print(f"🏁 Benchmark de escrita no Firestore ({args.docs:,} documentos)")
+print("=" * 60)
+
+# 1. Um set() por documento (comportamento original)
+with BatchWriter(db, max_workers=args.workers) as writer:
+    delete_collection(writer, colecao)
+inicio = time.perf_counter()
+for i in range(args.docs):
+    colecao.document(f"doc-{i}").set(documento(i))
+individual = time.perf_counter() - inicio
+print(f"\n1️⃣  set() individual: {individual:.2f}s ({args.docs / individual:,.0f} docs/s)")
+
+# 2. BatchWriter
+with BatchWriter(db, max_workers=args.workers) as writer:
+    delete_collection(writer, colecao)
+with BatchWriter(db, max_workers=args.workers) as writer:
+    for i in range(args.docs):
+        writer.set(colecao.document(f"doc-{i}"), documento(i))
+stats = writer.stats()
+print("\n2️⃣  BatchWriter:")
+print_stats(stats, 'escritas')
+
+# Limpeza
+with BatchWriter(db, max_workers=args.workers) as writer:
+    removidos = delete_collection(writer, colecao)
+print("\n3️⃣  Limpeza (delete em lote):")
+print_stats(writer.stats(), 'deletes')
+
+print(f"\n📊 Ganho do lote: {individual / stats['segundos']:.1f}x")
@@ -0,0 +1,116 @@
+# Benchmark do índice espacial (geo.py) contra a varredura completa
+#
+# Espalha N veículos em volta das cidades atendidas e executa consultas de
+# raio, retângulo e "N mais próximos" (com filtros de status/tipo) a partir de
+# pontos aleatórios, conferindo se o índice devolve as mesmas placas que a
+# varredura completa.
+#
+# Uso:
+#   python src/scripts/bench_geo.py --veiculos 100000 --consultas 200
+
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from geo import CIDADES, SpatialIndex, brute_force_radius, geohash_encode, haversine_km
+
+parser = argparse.ArgumentParser(description="Desempenho do índice espacial")
+parser.add_argument('--veiculos', type=int, default=100_000)
+parser.add_argument('--consultas', type=int, default=200)
+parser.add_argument('--raio', type=float, default=25.0, help="Raio das consultas (km)")
+parser.add_argument('--vizinhos', type=int, default=10)
+parser.add_argument('--celula', type=float, default=0.25, help="Tamanho da célula da grade (graus)")
+parser.add_argument('--seed', type=int, default=42)
+parser.add_argument('--saida', default=None, help="Arquivo JSON com os resultados")
+args = parser.parse_args()
+
+rng = np.random.default_rng(args.seed)
+n = args.veiculos
+centros = np.array(list(CIDADES.values()))
+cidade = rng.integers(0, len(centros), n)
+frota = pd.DataFrame({
+    'placa': [f"G{i:07d}" for i in range(n)],
+    'latitude': centros[cidade, 0] + rng.normal(0, 0.5, n),
+    'longitude': centros[cidade, 1] + rng.normal(0, 0.5, n),
+    'status': rng.choice(['Disponível', 'Em viagem', 'Manutenção'], n),
+    'tipo': rng.choice(['Caminhão', 'Van', 'Utilitário'], n),
+})
+
+# Pontos de consulta perto das cidades (onde estão os veículos)
+pontos = centros[rng.integers(0, len(centros), args.consultas)] + rng.normal(0, 0.3, (args.consultas, 2))
+
+
+def medir(funcao):
+    tempos, resultados = [], []
+    for lat, lng in pontos:
+        inicio = time.perf_counter()
+        resultados.append(funcao(lat, lng))
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos, resultados
+
+
+def resumo(tempos):
+    return {'mediana_ms': statistics.median(tempos), 'p95_ms': float(np.percentile(tempos, 95))}
+
+
+print("🗺️  Benchmark do índice espacial")
+print("=" * 60)
+print(f"🚛 {n:,} veículos, {args.consultas} consultas, raio {args.raio:g} km, célula {args.celula:g}°\n")
+
+inicio = time.perf_counter()
+geohash_encode(frota['latitude'].to_numpy(), frota['longitude'].to_numpy())
+print(f"  geohash de {n:,} posições: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+inicio = time.perf_counter()
+indice = SpatialIndex(frota, celula_graus=args.celula)
+print(f"  construção do índice:    {(time.perf_counter() - inicio) * 1000:.1f} ms\n")
+
+meio = args.raio / 111.32
+casos = {
+    'raio': (
+        lambda lat, lng: indice.within_radius(lat, lng, args.raio),
+        lambda lat, lng: brute_force_radius(frota, lat, lng, args.raio),
+    ),
+    'raio_filtrado': (
+        lambda lat, lng: indice.within_radius(lat, lng, args.raio, status='Disponível', tipo='Van'),
+        lambda lat, lng: brute_force_radius(frota, lat, lng, args.raio, status='Disponível', tipo='Van'),
+    ),
+    'retangulo': (
+        lambda lat, lng: indice.within_bbox(lat - meio, lat + meio, lng - meio, lng + meio),
+        lambda lat, lng: frota[frota['latitude'].between(lat - meio, lat + meio)
+                               & frota['longitude'].between(lng - meio, lng + meio)],
+    ),
+    'mais_proximos': (
+        lambda lat, lng: indice.nearest(lat, lng, args.vizinhos, status='Disponível'),
+        lambda lat, lng: frota[frota['status'] == 'Disponível']
+        .assign(distancia_km=lambda df: haversine_km(lat, lng, df['latitude'].to_numpy(), df['longitude'].to_numpy()))
+        .nsmallest(args.vizinhos, 'distancia_km'),
+    ),
+}
+
+resultados = {}
+for nome, (com_indice, varredura) in casos.items():
+    tempos_indice, respostas_indice = medir(com_indice)
+    tempos_varredura, respostas_varredura = medir(varredura)
+    iguais = all(set(a['placa']) == set(b['placa']) for a, b in zip(respostas_indice, respostas_varredura))
+    r = {
+        'indice': resumo(tempos_indice),
+        'varredura': resumo(tempos_varredura),
+        'media_resultados': float(np.mean([len(a) for a in respostas_indice])),
+        'resultados_iguais': iguais,
+    }
+    r['ganho'] = r['varredura']['mediana_ms'] / r['indice']['mediana_ms']
+    resultados[nome] = r
+    marca = "✅" if iguais else "❌"
+    print(f"  {marca} {nome:<14} índice {r['indice']['mediana_ms']:7.2f} ms (p95 {r['indice']['p95_ms']:6.2f})"
+          f" | varredura {r['varredura']['mediana_ms']:7.2f} ms | {r['ganho']:5.1f}x"
+          f" | {r['media_resultados']:,.0f} resultados em média")
+
+if args.saida:
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2)
+    print(f"\n💾 Resultados salvos em {args.saida}")
@@ -0,0 +1,126 @@
+# Harness de EXPLAIN ANALYZE para as consultas operacionais (1-3 de consultas_demo.sql)
+#
+# Para cada escala: gera os dados (01_generate_data.py), carrega no PostgreSQL
+# local com COPY, roda cada consulta com EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)
+# sem e com os índices de pg_schema.INDICES, e grava planos e latências.
+#
+# Uso:
+#   python src/scripts/bench_pg_explain.py --dsn "host=localhost user=postgres dbname=bench" \
+#       --escalas 10000 100000 1000000 --saida-dir explain_results
+#
+# ATENÇÃO: as tabelas do banco indicado são recriadas.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import psycopg2
+from dotenv import load_dotenv
+
+from demo_queries import CONSULTAS_POSTGRES, load_demo_queries
+from pg_loader import load_lake
+from pg_schema import TABELAS, create_indexes, create_tables
+
+load_dotenv()
+
+parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE das consultas operacionais em escalas crescentes")
+parser.add_argument('--dsn', default=os.getenv('BENCH_POSTGRES_DSN', 'host=localhost user=postgres dbname=postgres'))
+parser.add_argument('--escalas', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                    help="Número de viagens em cada rodada (as outras tabelas são proporcionais)")
+parser.add_argument('--repeticoes', type=int, default=5)
+parser.add_argument('--sem-comparacao', action='store_true', help="Mede só com índices")
+parser.add_argument('--saida-dir', default='explain_results')
+parser.add_argument('--seed', type=int, default=42)
+args = parser.parse_args()
+
+GERADOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '01_generate_data.py')
+consultas = {n: c for n, c in load_demo_queries().items() if n in CONSULTAS_POSTGRES}
+os.makedirs(args.saida_dir, exist_ok=True)
+
+
+def gerar_dados(viagens, destino):
+    # Mesmas proporções dos tamanhos padrão do gerador (20 veículos / 30 motoristas / 500 viagens / 100 eventos)
+    subprocess.run([
+        sys.executable, GERADOR,
+        '--viagens', str(viagens),
+        '--veiculos', str(max(20, viagens // 25)),
+        '--motoristas', str(max(30, viagens * 3 // 50)),
+        '--eventos', str(max(100, viagens // 5)),
+        '--seed', str(args.seed),
+        '--saida', destino,
+    ], check=True, stdout=subprocess.DEVNULL)
+
+
+def explain(cur, sql):
+    cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+    return cur.fetchone()[0][0]
+
+
+def medir(conn, escala, fase):
+    resultados = []
+    with conn.cursor() as cur:
+        for numero, consulta in consultas.items():
+            planos = [explain(cur, consulta['sql']) for _ in range(args.repeticoes)]
+            tempos = sorted(p['Execution Time'] for p in planos)
+            resultado = {
+                'escala': escala,
+                'fase': fase,
+                'consulta': numero,
+                'titulo': consulta['titulo'],
+                'execucao_mediana_ms': statistics.median(tempos),
+                'execucao_p95_ms': tempos[min(len(tempos) - 1, int(round(0.95 * (len(tempos) - 1))))],
+                'planejamento_mediana_ms': statistics.median(p['Planning Time'] for p in planos),
+                'no_raiz': planos[-1]['Plan']['Node Type'],
+            }
+            resultados.append(resultado)
+            caminho = os.path.join(args.saida_dir, f"{escala}-{fase}-consulta{numero}.json")
+            with open(caminho, 'w', encoding='utf-8') as f:
+                json.dump(planos[-1], f, indent=2)
+            print(f"  {fase:12s} consulta {numero}: {resultado['execucao_mediana_ms']:10.2f} ms "
+                  f"(p95 {resultado['execucao_p95_ms']:.2f} ms, raiz {resultado['no_raiz']})")
+    conn.rollback()
+    return resultados
+
+
+print("🔎 EXPLAIN ANALYZE das consultas operacionais")
+print("=" * 60)
+
+conn = psycopg2.connect(args.dsn)
+resultados = []
+try:
+    for escala in args.escalas:
+        print(f"\n📦 Escala: {escala:,} viagens")
+        with tempfile.TemporaryDirectory(prefix='bench_explain_') as tmpdir:
+            gerar_dados(escala, tmpdir)
+            with conn.cursor() as cur:
+                create_tables(cur, drop=True)
+            for tabela in TABELAS:
+                load_lake(conn, tabela, diretorio=os.path.join(tmpdir, 'lake'))
+            conn.commit()
+
+        if not args.sem_comparacao:
+            with conn.cursor() as cur:
+                for tabela in TABELAS:
+                    cur.execute(f"ANALYZE {tabela}")
+            conn.commit()
+            resultados += medir(conn, escala, 'sem_indices')
+
+        with conn.cursor() as cur:
+            create_indexes(cur)
+        conn.commit()
+        resultados += medir(conn, escala, 'com_indices')
+finally:
+    with conn.cursor() as cur:
+        for tabela in reversed(list(TABELAS)):
+            cur.execute(f"DROP TABLE IF EXISTS {tabela} CASCADE")
+    conn.commit()
+    conn.close()
+
+caminho = os.path.join(args.saida_dir, 'resultados.json')
+with open(caminho, 'w', encoding='utf-8') as f:
+    json.dump(resultados, f, indent=2, ensure_ascii=False)
+print(f"\n💾 Planos e latências salvos em {args.saida_dir}/")
@@ -0,0 +1,73 @@
+# Benchmark: carga no PostgreSQL local por método (copy x batch x row),
+# a partir do data lake (padrão) ou dos CSVs (--origem csv)
+#
+# Uso:
+#   python src/scripts/bench_pg_load.py --dsn "host=localhost user=postgres password=postgres dbname=bench"
+#
+# ATENÇÃO: as tabelas do banco indicado são recriadas a cada rodada.
+
+import argparse
+import os
+
+import psycopg2
+from dotenv import load_dotenv
+
+from pg_loader import METODOS, load_csv, load_lake, print_stats
+from pg_schema import TABELAS, create_tables
+
+load_dotenv()
+
+parser = argparse.ArgumentParser(description="Compara os métodos de carga do PostgreSQL")
+parser.add_argument('--dsn', default=os.getenv('BENCH_POSTGRES_DSN', 'host=localhost user=postgres dbname=postgres'))
+parser.add_argument('--data-dir', default='data')
+parser.add_argument('--origem', choices=['lake', 'csv'], default='lake')
+parser.add_argument('--metodos', nargs='+', choices=METODOS, default=list(METODOS))
+parser.add_argument('--repeticoes', type=int, default=3)
+args = parser.parse_args()
+
+print(f"🏁 Benchmark de carga PostgreSQL ({args.repeticoes} repetições)")
+print("=" * 60)
+
+conn = psycopg2.connect(args.dsn)
+resultados = {}
+
+try:
+    for metodo in args.metodos:
+        print(f"\n📥 Método: {metodo}")
+        tempos = []
+        for rodada in range(1, args.repeticoes + 1):
+            with conn.cursor() as cur:
+                create_tables(cur, drop=True)
+            conn.commit()
+
+            total_linhas = 0
+            total_segundos = 0.0
+            for tabela in TABELAS:
+                if args.origem == 'csv':
+                    stats = load_csv(conn, tabela, os.path.join(args.data_dir, f'{tabela}.csv'), metodo=metodo)
+                else:
+                    stats = load_lake(conn, tabela, metodo=metodo, diretorio=os.path.join(args.data_dir, 'lake'))
+                conn.commit()
+                if rodada == 1:
+                    print_stats(stats)
+                total_linhas += stats['linhas']
+                total_segundos += stats['segundos']
+            tempos.append(total_segundos)
+
+        melhor = min(tempos)
+        resultados[metodo] = (total_linhas, melhor)
+        print(f"  ⏱️  Melhor tempo: {melhor:.2f}s ({total_linhas / melhor:,.0f} linhas/s)")
+finally:
+    with conn.cursor() as cur:
+        for tabela in reversed(list(TABELAS)):
+            cur.execute(f"DROP TABLE IF EXISTS {tabela} CASCADE")
+    conn.commit()
+    conn.close()
+
+# Resumo comparativo
+print("\n📊 Resumo")
+print("-" * 40)
+base = resultados.get('row')
+for metodo, (linhas, segundos) in resultados.items():
+    ganho = f" ({base[1] / segundos:.1f}x mais rápido que row)" if base and metodo != 'row' else ""
+    print(f"  - {metodo:6s}: {segundos:8.2f}s{ganho}")
@@ -0,0 +1,128 @@
+# Benchmark: latência da janela recente (consulta 3, "últimos 30 dias") com o
+# histórico crescendo, tabela única x particionada por mês.
+#
+# Os dados são inseridos em ordem cronológica, passo a passo, em dois schemas do
+# mesmo banco (bench_heap e bench_part); a "data atual" da consulta acompanha o
+# último mês inserido.
+#
+# Uso:
+#   python src/scripts/bench_pg_partitions.py --dsn "host=localhost user=postgres dbname=bench" \
+#       --viagens-por-mes 500000 --passos 8 --meses-por-passo 6
+
+import argparse
+import json
+import os
+import statistics
+from datetime import date
+
+import psycopg2
+from dotenv import load_dotenv
+
+from demo_queries import load_demo_queries
+from pg_partitions import add_months, ensure_partitions
+from pg_schema import create_indexes, create_tables
+
+load_dotenv()
+
+parser = argparse.ArgumentParser(description="Janela recente x tamanho do histórico, com e sem particionamento")
+parser.add_argument('--dsn', default=os.getenv('BENCH_POSTGRES_DSN', 'host=localhost user=postgres dbname=postgres'))
+parser.add_argument('--viagens-por-mes', type=int, default=100_000)
+parser.add_argument('--passos', type=int, default=6)
+parser.add_argument('--meses-por-passo', type=int, default=6)
+parser.add_argument('--veiculos', type=int, default=2_000)
+parser.add_argument('--repeticoes', type=int, default=5)
+parser.add_argument('--saida', default=None, help="Arquivo JSON com os resultados")
+args = parser.parse_args()
+
+SCHEMAS = {'bench_heap': False, 'bench_part': True}
+INICIO = date(2020, 1, 1)
+
+# Consulta 3 com a "data atual" como parâmetro
+consulta = load_demo_queries()[3]['sql'].replace('CURRENT_DATE', '%(referencia)s::date')
+
+INSERIR_VIAGENS = """
+    INSERT INTO viagens (id, veiculo_id, motorista_id, data_saida, data_chegada, origem, destino,
+                         km_percorridos, combustivel_litros, custo_combustivel, carga_kg)
+    SELECT id, veiculo_id, motorista_id, data_saida, data_saida + (2 + floor(random() * 47)) * interval '1 hour',
+           origem, destino, km, round((20 + random() * 180)::numeric, 2), round((100 + random() * 900)::numeric, 2),
+           100 + floor(random() * 3900)::int
+    FROM (
+        SELECT g AS id,
+               1 + floor(random() * %(veiculos)s)::int AS veiculo_id,
+               1 + floor(random() * %(motoristas)s)::int AS motorista_id,
+               %(inicio)s::timestamp + random() * (%(fim)s::timestamp - %(inicio)s::timestamp) AS data_saida,
+               (ARRAY['São Paulo', 'Curitiba', 'Recife', 'Brasília'])[1 + floor(random() * 4)::int] AS origem,
+               (ARRAY['São Paulo', 'Curitiba', 'Recife', 'Brasília'])[1 + floor(random() * 4)::int] AS destino,
+               50 + floor(random() * 1450)::int AS km
+        FROM generate_series(%(primeiro)s, %(ultimo)s) g
+    ) s
+    ORDER BY data_saida
+"""
+
+
+def preparar(cur, schema, particionado):
+    cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+    cur.execute(f"CREATE SCHEMA {schema}")
+    cur.execute(f"SET search_path TO {schema}")
+    create_tables(cur, particionado=particionado)
+    cur.execute("""
+        INSERT INTO veiculos (id, placa, modelo, tipo, ano, km_atual, capacidade_carga, consumo_medio, status)
+        SELECT g, 'B' || lpad(g::text, 7, '0'), 'Iveco Daily',
+               (ARRAY['Caminhão', 'Van', 'Utilitário'])[1 + floor(random() * 3)::int],
+               2020, 50000, 3000, 10.0, 'Disponível'
+        FROM generate_series(1, %s) g
+    """, (args.veiculos,))
+    cur.execute("INSERT INTO motoristas (id, nome, salario) SELECT g, 'Motorista ' || g, 4000 "
+                "FROM generate_series(1, %s) g", (args.veiculos,))
+
+
+def medir(cur, referencia):
+    tempos = []
+    for _ in range(args.repeticoes):
+        cur.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {consulta}", {'referencia': referencia})
+        plano = cur.fetchone()[0][0]
+        tempos.append(plano['Planning Time'] + plano['Execution Time'])
+    return statistics.median(tempos)
+
+
+print("🗂️  Benchmark: janela recente x histórico (tabela única x particionada)")
+print("=" * 60)
+
+conn = psycopg2.connect(args.dsn)
+conn.autocommit = True
+cur = conn.cursor()
+resultados = []
+try:
+    for schema, particionado in SCHEMAS.items():
+        preparar(cur, schema, particionado)
+
+    print(f"\n{'meses':>6s} {'viagens':>12s} {'única (ms)':>12s} {'particionada (ms)':>18s}")
+    print("-" * 52)
+    proximo_id = 1
+    for passo in range(args.passos):
+        inicio = add_months(INICIO, passo * args.meses_por_passo)
+        fim = add_months(inicio, args.meses_por_passo)
+        total = args.viagens_por_mes * args.meses_por_passo
+        parametros = {'veiculos': args.veiculos, 'motoristas': args.veiculos, 'inicio': inicio, 'fim': fim,
+                      'primeiro': proximo_id, 'ultimo': proximo_id + total - 1}
+        proximo_id += total
+
+        linha = {'meses': (passo + 1) * args.meses_por_passo, 'viagens': proximo_id - 1}
+        for schema, particionado in SCHEMAS.items():
+            cur.execute(f"SET search_path TO {schema}")
+            if particionado:
+                ensure_partitions(cur, 'viagens', inicio, add_months(fim, -1))
+            cur.execute(INSERIR_VIAGENS, parametros)
+            create_indexes(cur)
+            linha[schema] = medir(cur, fim)
+        resultados.append(linha)
+        print(f"{linha['meses']:6d} {linha['viagens']:12,d} {linha['bench_heap']:12.2f} {linha['bench_part']:18.2f}")
+finally:
+    for schema in SCHEMAS:
+        cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+    conn.close()
+
+if args.saida:
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2)
+    print(f"\n💾 Resultados salvos em {args.saida}")
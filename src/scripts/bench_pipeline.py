@@ -0,0 +1,394 @@
+# Benchmark ponta a ponta do pipeline: geração -> cargas -> consultas
+#
+# Para cada escala (número de viagens; as outras tabelas são proporcionais):
+#   - gerar:     01_generate_data.py no data lake de um diretório temporário
+#   - postgres:  carga COPY do lake + índices + consultas 1-3 (PostgreSQL local)
+#   - warehouse: DuckDB sobre o lake (bq_local.py) + agregados + consultas 4-6
+#   - firestore: documentos de veiculos_status/alertas + consultas (só no emulador)
+#
+# Cada etapa roda num processo separado: o pico de memória (RSS) é o da etapa,
+# medido pelo sistema (wait4), e uma etapa não aquece o cache da outra. São
+# registrados tempo total, linhas/s, pico de RSS e percentis de latência de
+# cada consulta. A seed e a data de referência são fixas, então os dados são
+# os mesmos em todas as rodadas e os resultados são comparáveis entre commits.
+#
+# Uso:
+#   python src/scripts/bench_pipeline.py --escalas 1000 100000 1000000 10000000
+#   python src/scripts/bench_pipeline.py --escalas 100000 --etapas gerar warehouse
+#   python src/scripts/bench_pipeline.py --escalas 100000 --comparar bench_results/pipeline-abc1234.json
+#
+# PostgreSQL: BENCH_POSTGRES_DSN (ou --dsn); as tabelas do banco indicado são recriadas.
+# Firestore: só com FIRESTORE_EMULATOR_HOST definido (a etapa é pulada caso contrário).
+# Etapas sem o banco disponível são registradas como puladas, com o motivo.
+#
+# Com --comparar, tempos e latências p50 acima da tolerância em relação ao
+# arquivo anterior são listados como regressão e o script termina com código 1.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+GERADOR = os.path.join(AQUI, '01_generate_data.py')
+ETAPAS = ['gerar', 'postgres', 'warehouse', 'firestore']
+PERCENTIS = (50, 95, 99)
+PREFIXO_FIRESTORE = 'bench_'
+
+parser = argparse.ArgumentParser(description="Benchmark ponta a ponta do pipeline")
+parser.add_argument('--escalas', type=int, nargs='+', default=[1_000, 100_000, 1_000_000],
+                    help="Número de viagens em cada rodada (as outras tabelas são proporcionais)")
+parser.add_argument('--etapas', nargs='+', choices=ETAPAS, default=ETAPAS)
+parser.add_argument('--repeticoes', type=int, default=20, help="Execuções de cada consulta (após 1 de aquecimento)")
+parser.add_argument('--dsn', default=os.getenv('BENCH_POSTGRES_DSN', 'host=localhost user=postgres dbname=postgres'))
+parser.add_argument('--workers', type=int, default=1, help="Processos do gerador")
+parser.add_argument('--seed', type=int, default=42)
+parser.add_argument('--data-referencia', default='2025-06-30 12:00:00',
+                    help="Data 'atual' dos dados gerados (fixa, para rodadas comparáveis)")
+parser.add_argument('--saida', default=None, help="Arquivo JSON (padrão: bench_results/pipeline-<commit>.json)")
+parser.add_argument('--comparar', default=None, help="JSON de uma rodada anterior")
+parser.add_argument('--tolerancia', type=float, default=0.2, help="Piora relativa aceita no --comparar (0.2 = 20%%)")
+# Uso interno: executa uma etapa (processo filho) sobre um lake já gerado
+parser.add_argument('--etapa', choices=ETAPAS[1:], help=argparse.SUPPRESS)
+parser.add_argument('--lake', help=argparse.SUPPRESS)
+parser.add_argument('--resultado', help=argparse.SUPPRESS)
+args = parser.parse_args()
+
+
+def tamanhos(viagens):
+    # Mesmas proporções dos tamanhos padrão do gerador (20 veículos / 30 motoristas / 500 viagens / 100 eventos)
+    return {
+        'veiculos': max(20, viagens // 25),
+        'motoristas': max(30, viagens * 3 // 50),
+        'viagens': viagens,
+        'eventos': max(100, viagens // 5),
+    }
+
+
+def percentis(tempos_ms):
+    resumo = {f'p{p}_ms': float(np.percentile(tempos_ms, p)) for p in PERCENTIS}
+    resumo.update({'min_ms': float(min(tempos_ms)), 'max_ms': float(max(tempos_ms)), 'execucoes': len(tempos_ms)})
+    return resumo
+
+
+def medir_consulta(executar):
+    """Latências (ms) de `repeticoes` execuções, depois de uma de aquecimento."""
+    executar()
+    tempos = []
+    for _ in range(args.repeticoes):
+        inicio = time.perf_counter()
+        executar()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return percentis(tempos)
+
+
+def contar_linhas(diretorio):
+    import lake
+
+    return sum(lake.count(tabela, diretorio=diretorio) for tabela in lake.ESQUEMAS if lake.exists(tabela, diretorio))
+
+
+# --- etapas (executadas no processo filho) ---
+
+def etapa_postgres():
+    import psycopg2
+
+    from demo_queries import CONSULTAS_POSTGRES, load_demo_queries
+    from pg_loader import load_lake
+    from pg_schema import TABELAS, create_indexes, create_tables
+
+    conn = psycopg2.connect(args.dsn)
+    try:
+        with conn.cursor() as cur:
+            create_tables(cur, drop=True)
+        conn.commit()
+
+        fases = {}
+        inicio = time.perf_counter()
+        for tabela in TABELAS:
+            stats = load_lake(conn, tabela, diretorio=args.lake)
+            conn.commit()
+            fases[f'carga_{tabela}'] = {'segundos': stats['segundos'], 'linhas': stats['linhas']}
+        fases['carga'] = {'segundos': time.perf_counter() - inicio}
+
+        inicio = time.perf_counter()
+        with conn.cursor() as cur:
+            create_indexes(cur)
+        conn.commit()
+        fases['indices'] = {'segundos': time.perf_counter() - inicio}
+
+        def executar(sql):
+            with conn.cursor() as cur:
+                cur.execute(sql)
+                cur.fetchall()
+            conn.rollback()
+
+        consultas = {f"consulta_{n}": medir_consulta(lambda sql=c['sql']: executar(sql))
+                     for n, c in load_demo_queries().items() if n in CONSULTAS_POSTGRES}
+    finally:
+        with conn.cursor() as cur:
+            for tabela in reversed(list(TABELAS)):
+                cur.execute(f"DROP TABLE IF EXISTS {tabela} CASCADE")
+        conn.commit()
+        conn.close()
+    return fases, consultas
+
+
+def etapa_warehouse():
+    from bq_aggregates import refresh_aggregates
+    from bq_local import DuckDBClient
+    from db import BQ_DATASET
+    from demo_queries import CONSULTAS_BIGQUERY, load_demo_queries
+
+    client = DuckDBClient()
+    fases = {}
+    inicio = time.perf_counter()
+    # Materializado: mede a carga (como o load job do 03), não só a criação das views
+    client.attach_lake(args.lake, materializar=True)
+    fases['carga'] = {'segundos': time.perf_counter() - inicio}
+
+    inicio = time.perf_counter()
+    refresh_aggregates(client, BQ_DATASET, completo=True)
+    fases['agregados'] = {'segundos': time.perf_counter() - inicio}
+
+    consultas = {f"consulta_{n}": medir_consulta(lambda sql=c['sql']: client.query(sql).to_dataframe())
+                 for n, c in load_demo_queries().items() if n in CONSULTAS_BIGQUERY}
+    client.close()
+    return fases, consultas
+
+
+def etapa_firestore():
+    from google.cloud import firestore
+
+    import lake
+    from fs_docs import alert_docs, placas_por_veiculo, ultimas_viagens, vehicle_status_docs
+    from fs_writer import BatchWriter, delete_collection
+
+    db = firestore.Client(project=os.getenv('GOOGLE_CLOUD_PROJECT', 'demo-frota'))
+    veiculos_ref = db.collection(f'{PREFIXO_FIRESTORE}veiculos_status')
+    alertas_ref = db.collection(f'{PREFIXO_FIRESTORE}alertas')
+    fases = {}
+
+    inicio = time.perf_counter()
+    df_veiculos = lake.read('veiculos', ['id', 'placa', 'modelo', 'tipo', 'km_atual', 'status'], diretorio=args.lake)
+    df_viagens = lake.read('viagens', ['veiculo_id', 'data_saida', 'data_chegada', 'origem', 'destino',
+                                       'km_percorridos', 'carga_kg'], diretorio=args.lake)
+    df_eventos = lake.read('eventos', ['id', 'veiculo_id', 'tipo', 'data_evento', 'descricao', 'prioridade',
+                                       'resolvido'], diretorio=args.lake)
+    df_eventos = df_eventos[df_eventos['resolvido'] == False]
+    df_motoristas = lake.read('motoristas', ['id', 'nome'], diretorio=args.lake)
+    fases['leitura'] = {'segundos': time.perf_counter() - inicio}
+
+    try:
+        with BatchWriter(db) as writer:
+            for placa, doc in vehicle_status_docs(df_veiculos, ultimas_viagens(df_viagens), df_motoristas):
+                writer.set(veiculos_ref.document(placa), doc)
+        stats = writer.stats()
+        fases['escrita_veiculos_status'] = {'segundos': stats['segundos'], 'linhas': stats['operacoes']}
+
+        with BatchWriter(db) as writer:
+            for alerta in alert_docs(df_eventos, placas_por_veiculo(df_veiculos)):
+                writer.set(alertas_ref.document(), alerta)
+        stats = writer.stats()
+        fases['escrita_alertas'] = {'segundos': stats['segundos'], 'linhas': stats['operacoes']}
+
+        # Mesmas consultas do dashboard/05_test_queries.py
+        consultas = {
+            'em_viagem': medir_consulta(
+                lambda: list(veiculos_ref.where('status', '==', 'Em viagem').limit(5).stream())),
+            'alertas_alta': medir_consulta(
+                lambda: list(alertas_ref.where('prioridade', '==', 'Alta').limit(20).stream())),
+            'documento': medir_consulta(
+                lambda: veiculos_ref.document(df_veiculos['placa'].iloc[0]).get()),
+        }
+    finally:
+        for colecao in (veiculos_ref, alertas_ref):
+            with BatchWriter(db) as writer:
+                delete_collection(writer, colecao)
+    return fases, consultas
+
+
+def executar_etapa():
+    funcoes = {'postgres': etapa_postgres, 'warehouse': etapa_warehouse, 'firestore': etapa_firestore}
+    fases, consultas = funcoes[args.etapa]()
+    with open(args.resultado, 'w', encoding='utf-8') as f:
+        json.dump({'fases': fases, 'consultas': consultas}, f)
+
+
+# --- orquestração ---
+
+def rodar(comando):
+    """Executa o comando e devolve (código de saída, segundos, pico de RSS em MB)."""
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(comando, stdout=subprocess.DEVNULL)
+    _, status, uso = os.wait4(processo.pid, 0)
+    processo.returncode = os.waitstatus_to_exitcode(status)
+    segundos = time.perf_counter() - inicio
+    # ru_maxrss em KB no Linux, em bytes no macOS
+    pico = uso.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return processo.returncode, segundos, pico
+
+
+def motivo_para_pular(etapa):
+    if etapa == 'firestore' and not os.getenv('FIRESTORE_EMULATOR_HOST'):
+        return "FIRESTORE_EMULATOR_HOST não definido (o benchmark não escreve no Firestore real)"
+    if etapa == 'postgres':
+        import psycopg2
+
+        try:
+            psycopg2.connect(args.dsn, connect_timeout=5).close()
+        except psycopg2.OperationalError as e:
+            return f"PostgreSQL indisponível: {str(e).strip()}"
+    return None
+
+
+def etapa_gerar(escala, diretorio):
+    n = tamanhos(escala)
+    comando = [sys.executable, GERADOR, '--seed', str(args.seed), '--data-referencia', args.data_referencia,
+               '--workers', str(args.workers), '--saida', diretorio]
+    for tabela, total in n.items():
+        comando += [f'--{tabela}', str(total)]
+    codigo, segundos, pico = rodar(comando)
+    if codigo != 0:
+        return {'erro': f"gerador terminou com código {codigo}"}
+    return {'segundos': segundos, 'linhas': sum(n.values()), 'pico_rss_mb': pico}
+
+
+def etapa_filho(etapa, lake_dir, linhas):
+    motivo = motivo_para_pular(etapa)
+    if motivo:
+        return {'pulada': motivo}
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        caminho = f.name
+    try:
+        comando = [sys.executable, os.path.abspath(__file__), '--etapa', etapa, '--lake', lake_dir,
+                   '--resultado', caminho, '--dsn', args.dsn, '--repeticoes', str(args.repeticoes)]
+        codigo, segundos, pico = rodar(comando)
+        if codigo != 0:
+            return {'erro': f"etapa terminou com código {codigo}"}
+        with open(caminho, encoding='utf-8') as f:
+            resultado = json.load(f)
+    finally:
+        os.remove(caminho)
+    resultado.update({'segundos': segundos, 'linhas': linhas, 'pico_rss_mb': pico})
+    return resultado
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def imprimir(etapa, r):
+    if 'pulada' in r:
+        print(f"  ⏭️  {etapa:<10} pulada: {r['pulada']}")
+        return
+    if 'erro' in r:
+        print(f"  ❌ {etapa:<10} {r['erro']}")
+        return
+    print(f"  ✅ {etapa:<10} {r['segundos']:8.2f}s  {r['linhas_s']:>12,.0f} linhas/s  pico {r['pico_rss_mb']:,.0f} MB")
+    for nome, fase in r.get('fases', {}).items():
+        print(f"       - {nome}: {fase['segundos']:.2f}s")
+    for nome, c in r.get('consultas', {}).items():
+        print(f"       🔎 {nome}: p50 {c['p50_ms']:.2f} ms, p95 {c['p95_ms']:.2f} ms, p99 {c['p99_ms']:.2f} ms")
+
+
+def metricas_comparaveis(resultados):
+    """{(escala, etapa, métrica): valor} com os tempos e latências p50 das etapas concluídas."""
+    metricas = {}
+    for r in resultados:
+        if 'segundos' not in r:
+            continue
+        chave = (r['escala'], r['etapa'])
+        metricas[chave + ('segundos',)] = r['segundos']
+        for nome, c in r.get('consultas', {}).items():
+            metricas[chave + (f'{nome}.p50_ms',)] = c['p50_ms']
+    return metricas
+
+
+def comparar(anteriores, atuais):
+    base = metricas_comparaveis(anteriores)
+    regressoes = []
+    for chave, valor in metricas_comparaveis(atuais).items():
+        if chave not in base or base[chave] <= 0:
+            continue
+        variacao = valor / base[chave] - 1
+        marca = "🔺" if variacao > args.tolerancia else ("🔻" if variacao < -args.tolerancia else "  ")
+        escala, etapa, metrica = chave
+        print(f"  {marca} {escala:>10,} {etapa:<10} {metrica:<24} {base[chave]:10.2f} -> {valor:10.2f} ({variacao:+.0%})")
+        if variacao > args.tolerancia:
+            regressoes.append(chave)
+    return regressoes
+
+
+def main():
+    print("🏁 Benchmark ponta a ponta do pipeline")
+    print("=" * 60)
+    commit = commit_atual()
+    meta = {
+        'commit': commit,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'data_referencia': args.data_referencia,
+        'repeticoes': args.repeticoes,
+    }
+    resultados = []
+
+    for escala in args.escalas:
+        print(f"\n📦 Escala: {escala:,} viagens")
+        with tempfile.TemporaryDirectory(prefix='bench_pipeline_') as tmpdir:
+            lake_dir = os.path.join(tmpdir, 'lake')
+            # As outras etapas precisam do lake: ele é gerado mesmo sem 'gerar' em --etapas
+            geracao = etapa_gerar(escala, tmpdir)
+            linhas = contar_linhas(lake_dir) if 'erro' not in geracao else 0
+            for etapa in args.etapas:
+                if etapa == 'gerar':
+                    r = geracao
+                elif 'erro' in geracao:
+                    r = {'erro': "dados não gerados"}
+                else:
+                    r = etapa_filho(etapa, lake_dir, linhas)
+                if 'segundos' in r:
+                    r['linhas_s'] = r['linhas'] / r['segundos'] if r['segundos'] > 0 else 0.0
+                r.update({'escala': escala, 'etapa': etapa})
+                resultados.append(r)
+                imprimir(etapa, r)
+
+    saida = args.saida or os.path.join('bench_results', f"pipeline-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(saida) or '.', exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'resultados': resultados}, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados salvos em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anterior = json.load(f)
+        print(f"\n📊 Comparação com {anterior['meta'].get('commit')} (tolerância {args.tolerancia:.0%})")
+        regressoes = comparar(anterior['resultados'], resultados)
+        if regressoes:
+            print(f"\n❌ {len(regressoes)} regressão(ões) acima da tolerância")
+            sys.exit(1)
+        print("\n✅ Nenhuma regressão acima da tolerância")
+
+
+if __name__ == '__main__':
+    if args.etapa:
+        executar_etapa()
+    else:
+        main()
@@ -0,0 +1,315 @@
+# Agregados materializados do Data Warehouse
+#
+# resumo_mensal, analise_por_veiculo e desempenho_por_motorista eram views: cada
+# leitura reprocessava a tabela viagens inteira. Agora são tabelas, criadas uma
+# vez com o cálculo completo e depois atualizadas de forma incremental: só os
+# meses/veículos/motoristas tocados desde o último refresh são recalculados e
+# aplicados com MERGE. Uma chave é tocada por:
+#   - viagens novas sem atualizado_em (id acima da marca: cargas do lake/CSV);
+#   - viagens inseridas ou alteradas pela sincronização (atualizado_em do warehouse
+#     acima da marca); a chave antiga de uma viagem que mudou de mês, veículo ou
+#     motorista vem de viagens_anteriores, gravada pela sincronização antes do MERGE;
+#   - nos agregados por veículo/motorista, as linhas da dimensão alteradas
+#     (placa/modelo/nome editados, veículos/motoristas novos ainda sem viagens).
+# As janelas por atualizado_em recomeçam SYNC_ATRASO_S antes da marca, como a
+# sincronização (warehouse_sync.py): transações longas chegam com atualizado_em
+# anterior à marca.
+#
+# A tabela _agregados_estado guarda, por agregado, as marcas já consideradas e o
+# horário do último refresh (ver freshness()).
+
+import os
+from datetime import datetime, timezone
+
+from google.cloud import bigquery
+
+from bq_schema import ANTERIORES
+
+ESTADO_AGREGADOS = '_agregados_estado'
+# Valores anteriores de veiculo_id/motorista_id/data_saida (bq_schema.ANTERIORES)
+VIAGENS_ANTERIORES = 'viagens_anteriores'
+# Mesmo atraso da sincronização (warehouse_sync.py)
+ATRASO_S = int(os.getenv('SYNC_ATRASO_S', '300'))
+
+# Para cada agregado:
+#   chave:     coluna usada no MERGE
+#   tipo:      tipo da chave (parâmetro do BigQuery)
+#   tocadas:   expressão que extrai a chave de uma linha de viagens
+#   dimensao:  tabela cujas linhas alteradas (atualizado_em) também tocam a chave (id)
+#   calculo:   SELECT do agregado; {filtro} restringe às chaves tocadas
+AGREGADOS = {
+    'resumo_mensal': {
+        'chave': 'mes',
+        'tipo': 'STRING',
+        'tocadas': "FORMAT_TIMESTAMP('%Y-%m', data_saida)",
+        'calculo': """
+            SELECT
+                FORMAT_TIMESTAMP('%Y-%m', data_saida) as mes,
+                COUNT(DISTINCT veiculo_id) as veiculos_ativos,
+                COUNT(DISTINCT motorista_id) as motoristas_ativos,
+                COUNT(*) as total_viagens,
+                SUM(km_percorridos) as km_total,
+                SUM(custo_combustivel) as custo_total,
+                ROUND(AVG(custo_combustivel / NULLIF(km_percorridos, 0)), 2) as custo_medio_por_km,
+                CURRENT_TIMESTAMP() as atualizado_em
+            FROM `{ds}.viagens`
+            WHERE {filtro}
+            GROUP BY mes
+        """,
+        # O intervalo em data_saida permite ao BigQuery podar as partições de viagens
+        'filtro': ("data_saida >= @inicio AND data_saida < @fim "
+                   "AND FORMAT_TIMESTAMP('%Y-%m', data_saida) IN UNNEST(@chaves)"),
+        'intervalo_mensal': True,
+    },
+    'analise_por_veiculo': {
+        'chave': 'veiculo_id',
+        'tipo': 'INT64',
+        'tocadas': "veiculo_id",
+        'dimensao': 'veiculos',
+        'calculo': """
+            SELECT
+                v.id as veiculo_id,
+                v.placa, v.modelo, v.tipo,
+                COUNT(vg.id) as total_viagens,
+                SUM(vg.km_percorridos) as km_total,
+                SUM(vg.custo_combustivel) as custo_total,
+                ROUND(SUM(vg.custo_combustivel) / SUM(vg.km_percorridos), 2) as custo_por_km,
+                CURRENT_TIMESTAMP() as atualizado_em
+            FROM `{ds}.veiculos` v
+            LEFT JOIN `{ds}.viagens` vg ON v.id = vg.veiculo_id
+            WHERE {filtro}
+            GROUP BY v.id, v.placa, v.modelo, v.tipo
+        """,
+        'filtro': "v.id IN UNNEST(@chaves)",
+    },
+    'desempenho_por_motorista': {
+        'chave': 'motorista_id',
+        'tipo': 'INT64',
+        'tocadas': "motorista_id",
+        'dimensao': 'motoristas',
+        'calculo': """
+            SELECT
+                m.id as motorista_id,
+                m.nome,
+                COUNT(vg.id) as total_viagens,
+                SUM(vg.km_percorridos) as km_total,
+                SUM(vg.custo_combustivel) as custo_total,
+                ROUND(SUM(vg.custo_combustivel) / SUM(vg.km_percorridos), 2) as custo_por_km,
+                CURRENT_TIMESTAMP() as atualizado_em
+            FROM `{ds}.motoristas` m
+            LEFT JOIN `{ds}.viagens` vg ON m.id = vg.motorista_id
+            WHERE {filtro}
+            GROUP BY m.id, m.nome
+        """,
+        'filtro': "m.id IN UNNEST(@chaves)",
+    },
+}
+
+
+def _max_viagem_id(client, ds):
+    linhas = list(client.query(f"SELECT MAX(id) AS max_id FROM `{ds}.viagens`").result())
+    return linhas[0]['max_id'] or 0
+
+
+def _max_atualizado_em(client, ds, tabela):
+    linhas = list(client.query(f"SELECT MAX(atualizado_em) AS marca FROM `{ds}.{tabela}`").result())
+    return linhas[0]['marca']
+
+
+def _marcas(client, ds, config):
+    """Marcas atuais: maior id de viagem, maior atualizado_em de viagens e da dimensão."""
+    return {
+        'marca_viagem_id': _max_viagem_id(client, ds),
+        'marca_viagem': _max_atualizado_em(client, ds, 'viagens'),
+        'marca_dimensao': _max_atualizado_em(client, ds, config['dimensao']) if 'dimensao' in config else None,
+    }
+
+
+def _set_estado(client, ds, nome, marcas):
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter('agregado', 'STRING', nome),
+        bigquery.ScalarQueryParameter('marca', 'INT64', marcas['marca_viagem_id']),
+        bigquery.ScalarQueryParameter('marca_viagem', 'TIMESTAMP', marcas['marca_viagem']),
+        bigquery.ScalarQueryParameter('marca_dimensao', 'TIMESTAMP', marcas['marca_dimensao']),
+    ])
+    client.query(f"""
+        MERGE `{ds}.{ESTADO_AGREGADOS}` T
+        USING (SELECT @agregado AS agregado) S ON T.agregado = S.agregado
+        WHEN MATCHED THEN UPDATE SET marca_viagem_id = @marca, marca_viagem = @marca_viagem,
+            marca_dimensao = @marca_dimensao, atualizado_em = CURRENT_TIMESTAMP()
+        WHEN NOT MATCHED THEN INSERT (agregado, marca_viagem_id, marca_viagem, marca_dimensao, atualizado_em)
+            VALUES (@agregado, @marca, @marca_viagem, @marca_dimensao, CURRENT_TIMESTAMP())
+    """, job_config=job_config).result()
+
+
+def _ensure_estado(client, ds):
+    client.query(f"""
+        CREATE TABLE IF NOT EXISTS `{ds}.{ESTADO_AGREGADOS}` (
+            agregado STRING NOT NULL,
+            marca_viagem_id INT64,
+            marca_viagem TIMESTAMP,
+            marca_dimensao TIMESTAMP,
+            atualizado_em TIMESTAMP
+        )
+    """).result()
+    # Estado criado antes das marcas por atualizado_em
+    for coluna in ('marca_viagem', 'marca_dimensao'):
+        client.query(f"ALTER TABLE `{ds}.{ESTADO_AGREGADOS}` ADD COLUMN IF NOT EXISTS {coluna} TIMESTAMP").result()
+
+
+def _tipo_tabela(client, ds, nome):
+    """'VIEW', 'BASE TABLE' ou None se o nome não existe no dataset."""
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter('nome', 'STRING', nome)])
+    linhas = list(client.query(
+        f"SELECT table_type FROM `{ds}.INFORMATION_SCHEMA.TABLES` WHERE table_name = @nome",
+        job_config=job_config).result())
+    return linhas[0]['table_type'] if linhas else None
+
+
+def build_aggregate(client, ds, nome):
+    """Cálculo completo: (re)cria a tabela do agregado."""
+    config = AGREGADOS[nome]
+    _ensure_estado(client, ds)
+    marcas = _marcas(client, ds, config)
+    # A versão anterior era uma view com o mesmo nome (DROP VIEW numa tabela é erro)
+    if _tipo_tabela(client, ds, nome) == 'VIEW':
+        client.query(f"DROP VIEW `{ds}.{nome}`").result()
+    client.query(f"""
+        CREATE OR REPLACE TABLE `{ds}.{nome}` AS
+        {config['calculo'].format(ds=ds, filtro='TRUE')}
+    """).result()
+    _set_estado(client, ds, nome, marcas)
+    return {'agregado': nome, 'modo': 'completo', 'chaves': None}
+
+
+def _janela(parametros, nome, marca, nova_marca):
+    """Filtro por atualizado_em em (marca - atraso, nova_marca]; sem marca anterior, todas as linhas datadas."""
+    parametros.append(bigquery.ScalarQueryParameter(f'nova_{nome}', 'TIMESTAMP', nova_marca))
+    filtro = f"atualizado_em <= @nova_{nome}"
+    if marca is not None:
+        parametros.append(bigquery.ScalarQueryParameter(nome, 'TIMESTAMP', marca))
+        filtro += f" AND atualizado_em > TIMESTAMP_SUB(@{nome}, INTERVAL {ATRASO_S} SECOND)"
+    return filtro
+
+
+def refresh_aggregate(client, ds, nome):
+    """Refresh incremental: recalcula só as chaves tocadas por viagens novas ou
+    alteradas (chave nova e antiga) e por linhas alteradas da dimensão."""
+    config = AGREGADOS[nome]
+    _ensure_estado(client, ds)
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter('agregado', 'STRING', nome)])
+    estado = list(client.query(
+        f"SELECT marca_viagem_id, marca_viagem, marca_dimensao FROM `{ds}.{ESTADO_AGREGADOS}` "
+        f"WHERE agregado = @agregado",
+        job_config=job_config).result())
+    if not estado:
+        return build_aggregate(client, ds, nome)
+
+    marcas = dict(estado[0].items())
+    marcas['marca_viagem_id'] = marcas['marca_viagem_id'] or 0
+    novas = _marcas(client, ds, config)
+    viagens_novas = novas['marca_viagem_id'] > marcas['marca_viagem_id']
+    # A janela é consultada mesmo sem marca nova: linhas de transações longas chegam
+    # com atualizado_em abaixo da marca, dentro do atraso
+    viagens_alteradas = novas['marca_viagem'] is not None
+    dimensao_mudou = novas['marca_dimensao'] is not None
+    if not (viagens_novas or viagens_alteradas or dimensao_mudou):
+        _set_estado(client, ds, nome, marcas)
+        return {'agregado': nome, 'modo': 'incremental', 'chaves': 0}
+
+    chaves = set()
+    if viagens_novas or viagens_alteradas:
+        parametros = [bigquery.ScalarQueryParameter('marca', 'INT64', marcas['marca_viagem_id']),
+                      bigquery.ScalarQueryParameter('nova_marca', 'INT64', novas['marca_viagem_id'])]
+        colunas = ', '.join(ANTERIORES['viagens'])
+        origens = [f"SELECT {colunas} FROM `{ds}.viagens` WHERE id > @marca AND id <= @nova_marca"]
+        if viagens_alteradas:
+            janela = _janela(parametros, 'marca_viagem', marcas['marca_viagem'], novas['marca_viagem'])
+            origens.append(f"SELECT {colunas} FROM `{ds}.viagens` WHERE {janela}")
+            # Chaves de antes da alteração (a tabela só existe depois da primeira sincronização)
+            if _tipo_tabela(client, ds, VIAGENS_ANTERIORES) is not None:
+                origens.append(f"SELECT {colunas} FROM `{ds}.{VIAGENS_ANTERIORES}` WHERE {janela}")
+        chaves.update(linha['chave'] for linha in client.query(f"""
+            SELECT DISTINCT {config['tocadas']} AS chave
+            FROM ({' UNION ALL '.join(origens)})
+        """, job_config=bigquery.QueryJobConfig(query_parameters=parametros)).result()
+            if linha['chave'] is not None)
+    if dimensao_mudou:
+        parametros = []
+        janela = _janela(parametros, 'marca_dimensao', marcas['marca_dimensao'], novas['marca_dimensao'])
+        chaves.update(linha['id'] for linha in client.query(
+            f"SELECT id FROM `{ds}.{config['dimensao']}` WHERE {janela}",
+            job_config=bigquery.QueryJobConfig(query_parameters=parametros)).result())
+    chaves = sorted(chaves)
+    if not chaves:
+        _set_estado(client, ds, nome, novas)
+        return {'agregado': nome, 'modo': 'incremental', 'chaves': 0}
+
+    parametros = [bigquery.ArrayQueryParameter('chaves', config['tipo'], chaves)]
+    if config.get('intervalo_mensal'):
+        inicio, fim = _intervalo_meses(chaves)
+        parametros += [bigquery.ScalarQueryParameter('inicio', 'TIMESTAMP', inicio),
+                       bigquery.ScalarQueryParameter('fim', 'TIMESTAMP', fim)]
+    job_config = bigquery.QueryJobConfig(query_parameters=parametros)
+    client.query(f"""
+        MERGE `{ds}.{nome}` T
+        USING ({config['calculo'].format(ds=ds, filtro=config['filtro'])}) S
+        ON T.{config['chave']} = S.{config['chave']}
+        WHEN MATCHED THEN UPDATE SET {', '.join(
+            f"{c} = S.{c}" for c in _colunas(client, ds, nome) if c != config['chave'])}
+        WHEN NOT MATCHED THEN INSERT ROW
+    """, job_config=job_config).result()
+    _set_estado(client, ds, nome, novas)
+    return {'agregado': nome, 'modo': 'incremental', 'chaves': len(chaves)}
+
+
+def _intervalo_meses(meses):
+    """['2025-03', '2025-05'] -> (2025-03-01, 2025-06-01), em UTC."""
+    primeiro = datetime.strptime(min(meses), '%Y-%m').replace(tzinfo=timezone.utc)
+    ultimo = datetime.strptime(max(meses), '%Y-%m').replace(tzinfo=timezone.utc)
+    fim = ultimo.replace(year=ultimo.year + 1, month=1) if ultimo.month == 12 else ultimo.replace(month=ultimo.month + 1)
+    return primeiro, fim
+
+
+def _colunas(client, ds, nome):
+    return [campo.name for campo in client.get_table(f"{ds}.{nome}").schema]
+
+
+def refresh_aggregates(client, ds, completo=False):
+    funcao = build_aggregate if completo else refresh_aggregate
+    resultados = [funcao(client, ds, nome) for nome in AGREGADOS]
+    _prune_anteriores(client, ds)
+    return resultados
+
+
+def _prune_anteriores(client, ds):
+    """Apaga de viagens_anteriores as linhas que nenhum agregado ainda precisa
+    (abaixo da menor marca de viagens, descontado o atraso)."""
+    if _tipo_tabela(client, ds, VIAGENS_ANTERIORES) is None:
+        return
+    linhas = list(client.query(
+        f"SELECT COUNTIF(marca_viagem IS NULL) AS sem_marca, MIN(marca_viagem) AS marca "
+        f"FROM `{ds}.{ESTADO_AGREGADOS}`").result())
+    if linhas[0]['sem_marca'] or linhas[0]['marca'] is None:
+        return
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter('marca', 'TIMESTAMP', linhas[0]['marca'])])
+    client.query(
+        f"DELETE FROM `{ds}.{VIAGENS_ANTERIORES}` "
+        f"WHERE atualizado_em <= TIMESTAMP_SUB(@marca, INTERVAL {ATRASO_S} SECOND)",
+        job_config=job_config).result()
+
+
+def freshness(client, ds):
+    """Horário do último refresh de cada agregado ({nome: datetime})."""
+    linhas = client.query(f"SELECT agregado, atualizado_em FROM `{ds}.{ESTADO_AGREGADOS}`").result()
+    return {linha['agregado']: linha['atualizado_em'] for linha in linhas}
+
+
+def print_stats(stats):
+    if stats['chaves'] is None:
+        print(f"  ✅ {stats['agregado']}: recalculado por completo")
+    else:
+        print(f"  ✅ {stats['agregado']}: {stats['chaves']} chave(s) recalculada(s)")
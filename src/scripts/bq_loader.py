@@ -0,0 +1,399 @@
+# Carga no Data Warehouse via arquivos Parquet + load jobs
+#
+# Cada tabela é lida do data lake (lake.py) ou de um CSV em blocos, convertida para os tipos do esquema,
+# gravada em um Parquet temporário e enviada como load job (não é cobrado como
+# streaming e não tem o limite de tamanho do insert_rows_json). Tabelas
+# independentes são carregadas em paralelo.
+#
+# Com checkpoint (checkpoint.Checkpoint), a tabela só é recriada quando a carga
+# recomeça do zero (nova geração do checkpoint). Cada bloco vai num load job
+# (WRITE_APPEND) com id derivado da geração e do número do bloco, e é registrado;
+# uma nova execução pula os blocos já registrados (12_run_pipeline.py). O MERGE
+# fica para a sincronização (warehouse_sync.py), com um único MERGE por execução:
+# aplicado bloco a bloco, cada MERGE relê a tabela inteira, e o custo cresceria
+# com o quadrado do tamanho.
+#
+# Cargas com job_id (determinístico) são idempotentes: o BigQuery recusa um
+# segundo job com o mesmo id, e o DuckDB registra os ids aplicados em _cargas.
+# Reenviar um bloco depois de uma falha não duplica linhas.
+#
+# O destino é plugável:
+#   - BigQueryBackend: produção
+#   - DuckDBBackend:   substituto local, para testar a carga offline
+
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import lake
+from bq_schema import sort_columns
+
+CHUNK_ROWS = 500_000
+
+# Marca d'água (high-water mark) da sincronização incremental, por tabela
+ESTADO_SYNC = '_sync_estado'
+ESTADO_SYNC_SCHEMA = [
+    ("tabela", "STRING", "REQUIRED"),
+    ("coluna", "STRING", "REQUIRED"),
+    ("valor", "STRING", "NULLABLE"),
+    ("atualizado_em", "TIMESTAMP", "NULLABLE"),
+]
+
+# Load jobs já aplicados no DuckDB (no BigQuery, o próprio job_id faz esse papel)
+CARGAS = '_cargas'
+# Sufixos tentados quando um job com o mesmo id existe mas falhou
+MAX_TENTATIVAS_JOB = 5
+# Tabelas de staging do MERGE expiram sozinhas se o processo cair antes de apagá-las
+STAGING_EXPIRACAO_HORAS = 6
+
+_DUCKDB_TIPOS = {
+    'INTEGER': 'BIGINT',
+    'FLOAT': 'DOUBLE',
+    'STRING': 'VARCHAR',
+    'TIMESTAMP': 'TIMESTAMPTZ',
+    'BOOLEAN': 'BOOLEAN',
+}
+
+
+class BigQueryBackend:
+    def __init__(self, client, dataset_id):
+        self.client = client
+        self.dataset_id = dataset_id
+
+    def table_id(self, tabela):
+        return f"{self.dataset_id}.{tabela}"
+
+    def create_table(self, tabela, schema):
+        from bq_schema import to_bigquery_table
+
+        table_id = self.table_id(tabela)
+        self.client.delete_table(table_id, not_found_ok=True)
+        self.client.create_table(to_bigquery_table(table_id, tabela, schema))
+
+    def ensure_table(self, tabela, schema):
+        from bq_schema import to_bigquery_schema, to_bigquery_table
+
+        table = self.client.create_table(to_bigquery_table(self.table_id(tabela), tabela, schema), exists_ok=True)
+        # Tabelas criadas com uma versão anterior do esquema: acrescenta as colunas novas (NULLABLE)
+        existentes = {campo.name for campo in table.schema}
+        novas = [campo for campo in to_bigquery_schema(schema) if campo.name not in existentes]
+        if novas:
+            table.schema = list(table.schema) + novas
+            self.client.update_table(table, ['schema'])
+
+    def _load_job(self, tabela, caminho, schema, write_disposition, job_id=None):
+        from google.api_core.exceptions import Conflict, GoogleAPICallError
+        from google.cloud import bigquery
+        from bq_schema import to_bigquery_schema
+
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition=write_disposition,
+            schema=to_bigquery_schema(schema),
+        )
+        for tentativa in range(MAX_TENTATIVAS_JOB):
+            id_job = job_id if job_id is None or tentativa == 0 else f"{job_id}_{tentativa}"
+            try:
+                with open(caminho, 'rb') as arquivo:
+                    job = self.client.load_table_from_file(arquivo, self.table_id(tabela), job_config=job_config,
+                                                           job_id=id_job)
+            except Conflict:
+                # Job com o mesmo id já existe: se terminou bem, o bloco já foi carregado
+                try:
+                    self.client.get_job(id_job).result()
+                    return
+                except GoogleAPICallError:
+                    continue
+            job.result()
+            return
+        raise RuntimeError(f"Load job {job_id}: {MAX_TENTATIVAS_JOB} tentativas com o mesmo id falharam")
+
+    def load_file(self, tabela, caminho, schema, job_id=None):
+        self._load_job(tabela, caminho, schema, 'WRITE_APPEND', job_id)
+
+    def merge_files(self, tabela, caminhos, schema, chave='id', anteriores=None):
+        # Carrega os blocos em uma tabela de staging própria (execuções em paralelo não
+        # se atrapalham), aplica um único MERGE pela chave e apaga a staging.
+        # anteriores: colunas cujos valores antigos vão para <tabela>_anteriores (bq_schema.ANTERIORES)
+        from datetime import datetime, timedelta, timezone
+
+        from google.cloud import bigquery
+        from bq_schema import anteriores_schema, to_bigquery_schema
+
+        staging = f"{tabela}__staging_{uuid.uuid4().hex[:12]}"
+        tabela_staging = bigquery.Table(self.table_id(staging), schema=to_bigquery_schema(schema))
+        tabela_staging.expires = datetime.now(timezone.utc) + timedelta(hours=STAGING_EXPIRACAO_HORAS)
+        self.client.create_table(tabela_staging)
+        try:
+            for caminho in caminhos:
+                self._load_job(staging, caminho, schema, 'WRITE_APPEND')
+            if anteriores:
+                # Antes do MERGE: se ele falhar, chaves a mais só custam um recálculo
+                log = f"{tabela}_anteriores"
+                self.ensure_table(log, anteriores_schema(schema, anteriores))
+                self.client.query(_insert_anteriores(f"`{self.table_id(tabela)}`", f"`{self.table_id(log)}`",
+                                                     f"`{self.table_id(staging)}`", anteriores, chave)).result()
+            colunas = [nome for nome, _, _ in schema]
+            atualizacoes = ', '.join(f"{c} = S.{c}" for c in colunas if c != chave)
+            self.client.query(f"""
+                MERGE `{self.table_id(tabela)}` T
+                USING `{self.table_id(staging)}` S
+                ON T.{chave} = S.{chave}
+                WHEN MATCHED THEN UPDATE SET {atualizacoes}
+                WHEN NOT MATCHED THEN INSERT ({', '.join(colunas)}) VALUES ({', '.join('S.' + c for c in colunas)})
+            """).result()
+        finally:
+            self.client.delete_table(self.table_id(staging), not_found_ok=True)
+
+    def max_value(self, tabela, coluna):
+        linhas = list(self.client.query(f"SELECT MAX({coluna}) AS valor FROM `{self.table_id(tabela)}`").result())
+        return linhas[0]['valor']
+
+    # --- estado da sincronização incremental ---
+
+    def get_state(self, tabela):
+        from google.cloud import bigquery
+
+        self.ensure_table(ESTADO_SYNC, ESTADO_SYNC_SCHEMA)
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter('tabela', 'STRING', tabela)])
+        linhas = list(self.client.query(
+            f"SELECT valor FROM `{self.table_id(ESTADO_SYNC)}` WHERE tabela = @tabela",
+            job_config=job_config).result())
+        return linhas[0]['valor'] if linhas else None
+
+    def set_state(self, tabela, coluna, valor):
+        from google.cloud import bigquery
+
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter('tabela', 'STRING', tabela),
+            bigquery.ScalarQueryParameter('coluna', 'STRING', coluna),
+            bigquery.ScalarQueryParameter('valor', 'STRING', valor),
+        ])
+        self.client.query(f"""
+            MERGE `{self.table_id(ESTADO_SYNC)}` T
+            USING (SELECT @tabela AS tabela) S ON T.tabela = S.tabela
+            WHEN MATCHED THEN UPDATE SET coluna = @coluna, valor = @valor, atualizado_em = CURRENT_TIMESTAMP()
+            WHEN NOT MATCHED THEN INSERT (tabela, coluna, valor, atualizado_em)
+                VALUES (@tabela, @coluna, @valor, CURRENT_TIMESTAMP())
+        """, job_config=job_config).result()
+
+
+class DuckDBBackend:
+    def __init__(self, caminho=':memory:'):
+        import duckdb
+
+        self.con = duckdb.connect(caminho)
+        self._local = threading.local()
+
+    def _cursor(self):
+        # Conexões DuckDB não são thread-safe: um cursor por thread
+        if not hasattr(self._local, 'cur'):
+            self._local.cur = self.con.cursor()
+        return self._local.cur
+
+    def _ddl(self, tabela, schema, if_not_exists=False):
+        colunas = ', '.join(
+            f"{nome} {_DUCKDB_TIPOS[tipo]}{' NOT NULL' if modo == 'REQUIRED' else ''}"
+            for nome, tipo, modo in schema
+        )
+        return f"CREATE TABLE {'IF NOT EXISTS ' if if_not_exists else ''}{tabela} ({colunas})"
+
+    def create_table(self, tabela, schema):
+        cur = self._cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {tabela}")
+        cur.execute(self._ddl(tabela, schema))
+
+    def ensure_table(self, tabela, schema):
+        cur = self._cursor()
+        cur.execute(self._ddl(tabela, schema, if_not_exists=True))
+        for nome, tipo, _ in schema:
+            cur.execute(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS {nome} {_DUCKDB_TIPOS[tipo]}")
+
+    def load_file(self, tabela, caminho, schema, job_id=None):
+        colunas = ', '.join(nome for nome, _, _ in schema)
+        inserir = f"INSERT INTO {tabela} ({colunas}) SELECT {colunas} FROM read_parquet(?)"
+        cur = self._cursor()
+        if job_id is None:
+            cur.execute(inserir, [caminho])
+            return
+        # Mesma garantia do job_id do BigQuery: o id é gravado na transação da carga
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {CARGAS} (job_id VARCHAR PRIMARY KEY, tabela VARCHAR, "
+                    f"carregado_em TIMESTAMPTZ)")
+        cur.execute("BEGIN TRANSACTION")
+        try:
+            if cur.execute(f"SELECT 1 FROM {CARGAS} WHERE job_id = ?", [job_id]).fetchone() is None:
+                cur.execute(inserir, [caminho])
+                cur.execute(f"INSERT INTO {CARGAS} VALUES (?, ?, now())", [job_id, tabela])
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+    def merge_files(self, tabela, caminhos, schema, chave='id', anteriores=None):
+        from bq_schema import anteriores_schema
+
+        colunas = ', '.join(nome for nome, _, _ in schema)
+        cur = self._cursor()
+        if anteriores:
+            self.ensure_table(f"{tabela}_anteriores", anteriores_schema(schema, anteriores))
+        cur.execute("BEGIN TRANSACTION")
+        try:
+            if anteriores:
+                cur.execute(_insert_anteriores(tabela, f"{tabela}_anteriores", "read_parquet(?)", anteriores, chave),
+                            [caminhos])
+            cur.execute(f"DELETE FROM {tabela} WHERE {chave} IN (SELECT {chave} FROM read_parquet(?))", [caminhos])
+            cur.execute(f"INSERT INTO {tabela} ({colunas}) SELECT {colunas} FROM read_parquet(?)", [caminhos])
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+    def max_value(self, tabela, coluna):
+        return self._cursor().execute(f"SELECT MAX({coluna}) FROM {tabela}").fetchone()[0]
+
+    # --- estado da sincronização incremental ---
+
+    def get_state(self, tabela):
+        self.ensure_table(ESTADO_SYNC, ESTADO_SYNC_SCHEMA)
+        linha = self._cursor().execute(f"SELECT valor FROM {ESTADO_SYNC} WHERE tabela = ?", [tabela]).fetchone()
+        return linha[0] if linha else None
+
+    def set_state(self, tabela, coluna, valor):
+        cur = self._cursor()
+        cur.execute(f"DELETE FROM {ESTADO_SYNC} WHERE tabela = ?", [tabela])
+        cur.execute(f"INSERT INTO {ESTADO_SYNC} VALUES (?, ?, ?, now())", [tabela, coluna, valor])
+
+
+def _insert_anteriores(destino, log, origem, colunas, chave):
+    """INSERT dos valores atuais (antes do MERGE) das linhas de origem em que alguma das colunas muda."""
+    return f"""
+        INSERT INTO {log} ({chave}, {', '.join(colunas)}, atualizado_em)
+        SELECT T.{chave}, {', '.join('T.' + c for c in colunas)}, S.atualizado_em
+        FROM {destino} T JOIN {origem} S ON T.{chave} = S.{chave}
+        WHERE NOT ({' AND '.join(f'T.{c} IS NOT DISTINCT FROM S.{c}' for c in colunas)})
+    """
+
+
+def job_id(*partes):
+    """Id de load job determinístico a partir das partes (só letras, números, _ e -)."""
+    return re.sub(r'[^A-Za-z0-9_-]', '_', '_'.join(str(parte) for parte in partes))
+
+
+def prepare_table(backend, tabela, schema, checkpoint):
+    """Carga com checkpoint: recria a tabela uma vez por geração (os blocos são
+    acrescentados) e só garante que ela existe ao retomar."""
+    if checkpoint.is_prepared(tabela):
+        backend.ensure_table(tabela, schema)
+        return
+    backend.create_table(tabela, schema)
+    checkpoint.prepare(tabela)
+
+
+def load_chunk(backend, tabela, caminho, schema, checkpoint, bloco):
+    """Acrescenta o bloco com job_id (geração + bloco): repetir depois de uma falha não duplica."""
+    backend.load_file(tabela, caminho, schema,
+                      job_id=job_id('carga', tabela, checkpoint.generation(tabela), f'{bloco:05d}'))
+
+
+def typed_chunk(chunk, schema):
+    """Converte um bloco (lido do CSV, do lake ou do PostgreSQL) para os tipos do esquema."""
+    saida = {}
+    for nome, tipo, _ in schema:
+        # Colunas só do Data Warehouse (atualizado_em) ficam nulas nas cargas do lake/CSV
+        coluna = chunk[nome] if nome in chunk else pd.Series(None, index=chunk.index, dtype='object')
+        if tipo == 'INTEGER':
+            saida[nome] = pd.to_numeric(coluna).astype('Int64')
+        elif tipo == 'FLOAT':
+            saida[nome] = pd.to_numeric(coluna).astype('float64')
+        elif tipo == 'TIMESTAMP':
+            saida[nome] = pd.to_datetime(coluna).dt.tz_localize('UTC')
+        elif tipo == 'BOOLEAN':
+            saida[nome] = coluna.replace({'True': True, 'False': False, 'true': True, 'false': False}).astype('boolean')
+        else:
+            saida[nome] = coluna.astype('string')
+    return pd.DataFrame(saida)
+
+
+def partition_sorted(df, tabela):
+    """Ordena o bloco por partição + cluster: cada arquivo toca poucas partições
+    e as linhas chegam agrupadas como o clustering espera."""
+    colunas = sort_columns(tabela)
+    return df.sort_values(colunas, kind='stable') if colunas else df
+
+
+def read_chunks(tabela, schema, origem=None, chunk_rows=CHUNK_ROWS):
+    """Blocos da tabela: origem é um CSV (*.csv) ou o diretório do lake (None = lake.LAKE_DIR).
+    Do lake, só as colunas do esquema são lidas (as que só existem no warehouse ficam
+    de fora e typed_chunk as preenche com nulo)."""
+    if origem is not None and origem.endswith('.csv'):
+        return pd.read_csv(origem, chunksize=chunk_rows, dtype=str, keep_default_na=False, na_values=[''])
+    no_lake = set(lake.ESQUEMAS[tabela].names)
+    return lake.batches(tabela, colunas=[nome for nome, _, _ in schema if nome in no_lake],
+                        linhas=chunk_rows, diretorio=origem)
+
+
+def _assinatura(tabela, origem, chunk_rows):
+    if origem is not None and origem.endswith('.csv'):
+        info = os.stat(origem)
+        return f"{info.st_size}:{info.st_mtime_ns}:{chunk_rows}"
+    return f"{lake.fingerprint(tabela, origem)}:{chunk_rows}"
+
+
+def load_table(backend, tabela, schema, origem=None, chunk_rows=CHUNK_ROWS, checkpoint=None):
+    inicio = time.perf_counter()
+    if checkpoint is None:
+        backend.create_table(tabela, schema)
+    else:
+        checkpoint.start(tabela, _assinatura(tabela, origem, chunk_rows))
+        prepare_table(backend, tabela, schema, checkpoint)
+
+    linhas = 0
+    arquivos = 0
+    pulados = 0
+    with tempfile.TemporaryDirectory(prefix=f'bq_{tabela}_') as tmpdir:
+        for i, chunk in enumerate(read_chunks(tabela, schema, origem, chunk_rows)):
+            if checkpoint is not None and checkpoint.done(tabela, i):
+                pulados += 1
+                continue
+            caminho = os.path.join(tmpdir, f'{tabela}-{i:05d}.parquet')
+            partition_sorted(typed_chunk(chunk, schema), tabela).to_parquet(caminho, index=False)
+            if checkpoint is None:
+                backend.load_file(tabela, caminho, schema)
+            else:
+                load_chunk(backend, tabela, caminho, schema, checkpoint, i)
+                checkpoint.mark(tabela, i, len(chunk))
+            os.remove(caminho)
+            linhas += len(chunk)
+            arquivos += 1
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'tabela': tabela,
+        'linhas': linhas,
+        'arquivos': arquivos,
+        'blocos_pulados': pulados,
+        'segundos': segundos,
+        'linhas_por_segundo': linhas / segundos if segundos > 0 else 0.0,
+    }
+
+
+def load_tables(backend, tarefas, max_workers=4, chunk_rows=CHUNK_ROWS, checkpoint=None):
+    """tarefas: lista de (tabela, schema, origem), origem como em read_chunks.
+    Devolve as estatísticas na mesma ordem."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futuros = [executor.submit(load_table, backend, tabela, schema, caminho, chunk_rows, checkpoint)
+                   for tabela, schema, caminho in tarefas]
+        return [f.result() for f in futuros]
+
+
+def print_stats(stats):
+    pulados = f", {stats['blocos_pulados']} bloco(s) já carregado(s)" if stats.get('blocos_pulados') else ""
+    print(f"  - {stats['tabela']}: {stats['linhas']:,} linhas em {stats['segundos']:.2f}s "
+          f"({stats['linhas_por_segundo']:,.0f} linhas/s, {stats['arquivos']} load job(s){pulados})")
@@ -0,0 +1,222 @@
+# Substituto local do BigQuery: DuckDB sobre o data lake
+#
+# DuckDBClient imita a parte do bigquery.Client usada pelos scripts (query com
+# QueryJobConfig/parâmetros, result(), to_dataframe(), get_table().schema).
+# Assim o mesmo código (bq_aggregates.py, dashboard_data.py, vehicle_360.py,
+# consultas 4-6 de queries/consultas_demo.sql) roda sem BigQuery. O SQL passa
+# por translate(), um adaptador pequeno do dialeto do BigQuery para o do DuckDB:
+#   - `projeto.dataset.tabela`            -> tabela
+#   - @parametro                           -> $parametro
+#   - x IN UNNEST(@lista)                  -> x IN (SELECT UNNEST($lista))
+#   - TIMESTAMP_TRUNC / TIMESTAMP_SUB / TIMESTAMP_ADD, CURRENT_TIMESTAMP()
+#   - FORMAT_TIMESTAMP, PARSE_TIMESTAMP, SAFE_DIVIDE, COUNTIF: macros do DuckDB
+#   - STRING / INT64 / FLOAT64 / BOOL e TIMESTAMP nos CREATE TABLE / ALTER TABLE
+#   - `dataset.INFORMATION_SCHEMA.TABLES` -> information_schema.tables
+#   - MERGE ... WHEN MATCHED THEN UPDATE ... WHEN NOT MATCHED THEN INSERT
+#     -> UPDATE ... FROM + INSERT ... WHERE NOT EXISTS (o DuckDB 1.3 não tem MERGE)
+# Não é um tradutor completo: cobre o SQL deste repositório.
+#
+# Uso:
+#   client = DuckDBClient('data/frota_dw.duckdb')
+#   client.attach_lake()                       # veiculos/motoristas/viagens como views sobre data/lake
+#   refresh_aggregates(client, BQ_DATASET, completo=True)
+# ou, para os scripts que usam db.get_bigquery_client():
+#   BQ_LOCAL=data/frota_dw.duckdb python src/scripts/05_test_queries.py
+
+import os
+import re
+import threading
+from collections import namedtuple
+
+import pandas as pd
+
+import lake
+from bq_loader import _DUCKDB_TIPOS
+from bq_schema import SCHEMAS
+
+Campo = namedtuple('Campo', ['name', 'field_type'])
+Tabela = namedtuple('Tabela', ['table_id', 'schema', 'num_rows'])
+
+_TIPOS_DDL = {'STRING': 'VARCHAR', 'INT64': 'BIGINT', 'FLOAT64': 'DOUBLE', 'BOOL': 'BOOLEAN', 'NUMERIC': 'DECIMAL(38,9)'}
+
+# (padrão, substituição) aplicados em ordem; argumentos sem parênteses aninhados
+_REGRAS = [
+    (re.compile(r'`(?:[\w-]+\.)*INFORMATION_SCHEMA\.TABLES`', re.I), 'information_schema.tables'),
+    (re.compile(r'`(?:[\w-]+\.)*([\w-]+)`'), r'\1'),
+    (re.compile(r'\bCURRENT_TIMESTAMP\(\)', re.I), 'current_timestamp'),
+    (re.compile(r'\bCURRENT_DATE\(\)', re.I), 'current_date'),
+    (re.compile(r'\bIN\s+UNNEST\(\s*(@\w+)\s*\)', re.I), r'IN (SELECT UNNEST(\1))'),
+    (re.compile(r'\bTIMESTAMP_TRUNC\(\s*([^(),]+?)\s*,\s*(\w+)\s*\)', re.I), r"date_trunc('\2', \1)"),
+    (re.compile(r'\bTIMESTAMP_SUB\(\s*([^(),]+?)\s*,\s*(INTERVAL [^()]+?)\s*\)', re.I), r'(\1 - \2)'),
+    (re.compile(r'\bTIMESTAMP_ADD\(\s*([^(),]+?)\s*,\s*(INTERVAL [^()]+?)\s*\)', re.I), r'(\1 + \2)'),
+    (re.compile(r'@(\w+)'), r'$\1'),
+]
+
+# Funções do BigQuery sem equivalente direto (com argumentos quaisquer, inclusive aninhados)
+_MACROS = [
+    "CREATE OR REPLACE MACRO format_timestamp(formato, ts) AS strftime(ts, formato)",
+    "CREATE OR REPLACE MACRO parse_timestamp(formato, texto) AS strptime(texto, formato)",
+    "CREATE OR REPLACE MACRO safe_divide(a, b) AS a / NULLIF(b, 0)",
+    "CREATE OR REPLACE MACRO countif(condicao) AS count_if(condicao)",
+]
+
+_DDL_TIPOS = re.compile(r'^\s*(?:CREATE\s+TABLE\b[^(]*\(|ALTER\s+TABLE\b)', re.I)
+_MERGE = re.compile(r'^\s*MERGE\s+(?:INTO\s+)?(\w+)\s+(?:AS\s+)?(\w+)\s+USING\s+', re.I)
+_MERGE_ON = re.compile(r'\s*(?:AS\s+)?(\w+)\s+ON\s+(.+?)\s+WHEN\s+MATCHED\s+THEN\s+UPDATE\s+SET\s+(.+?)'
+                       r'\s+WHEN\s+NOT\s+MATCHED\s+THEN\s+INSERT\s*(.+?)\s*;?\s*$', re.I | re.S)
+_INSERT_COLUNAS = re.compile(r'^\((.*?)\)\s*VALUES\s*\((.*)\)$', re.S)
+
+
+def _fecha_parenteses(texto, inicio):
+    """Índice logo depois do ')' que fecha o '(' em texto[inicio]."""
+    nivel = 0
+    for i in range(inicio, len(texto)):
+        if texto[i] == '(':
+            nivel += 1
+        elif texto[i] == ')':
+            nivel -= 1
+            if nivel == 0:
+                return i + 1
+    raise ValueError("Parênteses desbalanceados no MERGE")
+
+
+def _merge_statements(sql):
+    """MERGE do BigQuery -> [UPDATE ... FROM, INSERT ... WHERE NOT EXISTS]."""
+    cabecalho = _MERGE.match(sql)
+    alvo, t = cabecalho.group(1), cabecalho.group(2)
+    resto = sql[cabecalho.end():]
+    if resto.startswith('('):
+        fim = _fecha_parenteses(resto, 0)
+        origem, resto = resto[:fim], resto[fim:]
+    else:
+        origem, _, resto = resto.partition(' ')
+        resto = ' ' + resto
+    partes = _MERGE_ON.match(resto)
+    if not partes:
+        raise ValueError("MERGE não suportado pelo adaptador local")
+    s, condicao, atribuicoes, insercao = partes.groups()
+
+    update = f"UPDATE {alvo} AS {t} SET {atribuicoes} FROM {origem} AS {s} WHERE {condicao}"
+    nao_existe = f"NOT EXISTS (SELECT 1 FROM {alvo} AS {t} WHERE {condicao})"
+    if insercao.upper() == 'ROW':
+        insert = f"INSERT INTO {alvo} BY NAME SELECT {s}.* FROM {origem} AS {s} WHERE {nao_existe}"
+    else:
+        colunas, valores = _INSERT_COLUNAS.match(insercao).groups()
+        insert = f"INSERT INTO {alvo} ({colunas}) SELECT {valores} FROM {origem} AS {s} WHERE {nao_existe}"
+    return [update, insert]
+
+
+def translate(sql):
+    """Traduz uma instrução do dialeto do BigQuery para o do DuckDB. Devolve uma
+    lista de instruções (o MERGE vira duas)."""
+    for padrao, substituicao in _REGRAS:
+        sql = padrao.sub(substituicao, sql)
+    if _DDL_TIPOS.match(sql):
+        sql = re.sub(r'\b(STRING|INT64|FLOAT64|BOOL|NUMERIC)\b', lambda m: _TIPOS_DDL[m.group(1).upper()], sql)
+        sql = re.sub(r'\bTIMESTAMP\b', 'TIMESTAMPTZ', sql)
+    if _MERGE.match(sql):
+        return _merge_statements(sql)
+    return [sql]
+
+
+def _parametros(job_config):
+    if job_config is None:
+        return {}
+    parametros = {}
+    for p in job_config.query_parameters:
+        parametros[p.name] = list(p.values) if hasattr(p, 'values') else p.value
+    return parametros
+
+
+class LocalQueryJob:
+    def __init__(self, df):
+        self._df = df
+
+    def result(self, timeout=None):
+        # Nulos como None, como nas linhas do BigQuery (e não NaN/NaT do pandas)
+        return self._df.astype(object).where(self._df.notna(), None).to_dict('records')
+
+    def to_dataframe(self):
+        return self._df
+
+
+class DuckDBClient:
+    """Parte do bigquery.Client usada pelos scripts, executada no DuckDB."""
+
+    def __init__(self, caminho=':memory:', con=None):
+        import duckdb
+
+        self.con = con if con is not None else duckdb.connect(caminho)
+        # Datas como no BigQuery (TIMESTAMP em UTC), inclusive em strftime
+        self.con.execute("SET TimeZone = 'UTC'")
+        for macro in _MACROS:
+            self.con.execute(macro)
+        self._local = threading.local()
+
+    def _cursor(self):
+        # Conexões DuckDB não são thread-safe: um cursor por thread (vehicle_360 consulta em paralelo)
+        if not hasattr(self._local, 'cur'):
+            self._local.cur = self.con.cursor()
+        return self._local.cur
+
+    def attach_lake(self, diretorio=None, materializar=False, tabelas=None):
+        """Expõe as tabelas do lake com os tipos do Data Warehouse (bq_schema.SCHEMAS).
+        Views por padrão (sem cópia: o DuckDB lê só as colunas usadas); materializar=True
+        copia para tabelas, necessário para receber cargas incrementais (06)."""
+        cur = self._cursor()
+        tabelas = tabelas or [t for t in SCHEMAS if t in lake.ESQUEMAS]
+        for tabela in tabelas:
+            arquivos = os.path.join(lake.table_dir(tabela, diretorio), '**', '*.parquet').replace("'", "''")
+            no_lake = set(lake.ESQUEMAS[tabela].names)
+            colunas = ', '.join(f"CAST({nome if nome in no_lake else 'NULL'} AS {_DUCKDB_TIPOS[tipo]}) AS {nome}"
+                                for nome, tipo, _ in SCHEMAS[tabela])
+            origem = f"SELECT {colunas} FROM read_parquet('{arquivos}', hive_partitioning = false)"
+            objeto = 'TABLE' if materializar else 'VIEW'
+            cur.execute(f"DROP VIEW IF EXISTS {tabela}" if self._tipo(tabela) == 'VIEW' else f"DROP TABLE IF EXISTS {tabela}")
+            cur.execute(f"CREATE {objeto} {tabela} AS {origem}")
+        return tabelas
+
+    def _tipo(self, nome):
+        linha = self._cursor().execute(
+            "SELECT table_type FROM information_schema.tables WHERE table_name = ?", [nome]).fetchone()
+        return None if linha is None else ('VIEW' if linha[0] == 'VIEW' else 'TABLE')
+
+    def query(self, sql, job_config=None, timeout=None):
+        cur = self._cursor()
+        parametros = _parametros(job_config)
+
+        instrucoes = translate(sql)
+
+        if len(instrucoes) > 1:
+            cur.execute("BEGIN TRANSACTION")
+        try:
+            for instrucao in instrucoes:
+                usados = {nome: valor for nome, valor in parametros.items() if re.search(rf'\${nome}\b', instrucao)}
+                relacao = cur.sql(instrucao, params=usados or None)
+            if len(instrucoes) > 1:
+                cur.execute("COMMIT")
+        except Exception:
+            if len(instrucoes) > 1:
+                cur.execute("ROLLBACK")
+            raise
+        if relacao is None:  # DDL/DML
+            return LocalQueryJob(pd.DataFrame())
+        df = relacao.df()
+        # SUM de inteiros é HUGEINT no DuckDB (vira float no pandas); no BigQuery é INT64
+        for coluna, tipo in zip(relacao.columns, relacao.types):
+            if str(tipo) == 'HUGEINT':
+                df[coluna] = df[coluna].astype('Int64')
+        return LocalQueryJob(df)
+
+    def get_table(self, table_id):
+        nome = table_id.replace('`', '').split('.')[-1]
+        colunas = self._cursor().execute(
+            "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position",
+            [nome]).fetchall()
+        if not colunas:
+            raise KeyError(f"Tabela não encontrada: {table_id}")
+        linhas = self._cursor().execute(f"SELECT COUNT(*) FROM {nome}").fetchone()[0]
+        return Tabela(table_id, [Campo(c, t) for c, t in colunas], linhas)
+
+    def close(self):
+        self.con.close()
@@ -0,0 +1,127 @@
+# Esquemas das tabelas do Data Warehouse (BigQuery)
+# Definidos como (nome, tipo, modo) para não depender da biblioteca do BigQuery:
+# assim o mesmo esquema serve para os backends locais (DuckDB).
+
+import os
+
+SCHEMAS = {
+    'veiculos': [
+        ("id", "INTEGER", "REQUIRED"),
+        ("placa", "STRING", "REQUIRED"),
+        ("modelo", "STRING", "NULLABLE"),
+        ("tipo", "STRING", "NULLABLE"),
+        ("ano", "INTEGER", "NULLABLE"),
+        ("km_atual", "INTEGER", "NULLABLE"),
+        ("capacidade_carga", "INTEGER", "NULLABLE"),
+        ("consumo_medio", "FLOAT", "NULLABLE"),
+        ("status", "STRING", "NULLABLE"),
+        # Marca d'água da sincronização (warehouse_sync) e dos agregados (bq_aggregates);
+        # nula nas cargas do lake/CSV
+        ("atualizado_em", "TIMESTAMP", "NULLABLE"),
+    ],
+    'motoristas': [
+        ("id", "INTEGER", "REQUIRED"),
+        ("nome", "STRING", "NULLABLE"),
+        ("salario", "FLOAT", "NULLABLE"),
+        ("atualizado_em", "TIMESTAMP", "NULLABLE"),
+    ],
+    'viagens': [
+        ("id", "INTEGER", "REQUIRED"),
+        ("veiculo_id", "INTEGER", "NULLABLE"),
+        ("motorista_id", "INTEGER", "NULLABLE"),
+        ("data_saida", "TIMESTAMP", "NULLABLE"),
+        ("data_chegada", "TIMESTAMP", "NULLABLE"),
+        ("origem", "STRING", "NULLABLE"),
+        ("destino", "STRING", "NULLABLE"),
+        ("km_percorridos", "INTEGER", "NULLABLE"),
+        ("combustivel_litros", "FLOAT", "NULLABLE"),
+        ("custo_combustivel", "FLOAT", "NULLABLE"),
+        ("carga_kg", "INTEGER", "NULLABLE"),
+        ("atualizado_em", "TIMESTAMP", "NULLABLE"),
+    ],
+    'eventos': [
+        ("id", "INTEGER", "REQUIRED"),
+        ("veiculo_id", "INTEGER", "NULLABLE"),
+        ("tipo", "STRING", "NULLABLE"),
+        ("data_evento", "TIMESTAMP", "NULLABLE"),
+        ("descricao", "STRING", "NULLABLE"),
+        ("prioridade", "STRING", "NULLABLE"),
+        ("resolvido", "BOOLEAN", "NULLABLE"),
+        ("km_veiculo", "INTEGER", "NULLABLE"),
+        ("atualizado_em", "TIMESTAMP", "NULLABLE"),
+    ],
+    # Histórico bruto de telemetria (telemetry.py)
+    'telemetria': [
+        ("placa", "STRING", "REQUIRED"),
+        ("ts", "TIMESTAMP", "REQUIRED"),
+        ("latitude", "FLOAT", "NULLABLE"),
+        ("longitude", "FLOAT", "NULLABLE"),
+        ("velocidade", "FLOAT", "NULLABLE"),
+        ("combustivel_nivel", "FLOAT", "NULLABLE"),
+        ("temperatura_motor", "FLOAT", "NULLABLE"),
+        ("km_atual", "INTEGER", "NULLABLE"),
+    ],
+}
+
+# Valores anteriores das colunas que definem as chaves dos agregados (bq_aggregates):
+# antes do MERGE, a sincronização grava em <tabela>_anteriores as linhas cujo mês,
+# veículo ou motorista mudou, com o atualizado_em da versão nova. Assim o refresh
+# recalcula também a chave antiga (o mês de onde a viagem saiu, por exemplo).
+ANTERIORES = {
+    'viagens': ['veiculo_id', 'motorista_id', 'data_saida'],
+}
+
+
+def anteriores_schema(schema, colunas):
+    """Esquema de <tabela>_anteriores: id, as colunas guardadas e o atualizado_em da versão nova."""
+    tipos = {nome: tipo for nome, tipo, _ in schema}
+    return ([("id", "INTEGER", "REQUIRED")]
+            + [(nome, tipos[nome], "NULLABLE") for nome in colunas]
+            + [("atualizado_em", "TIMESTAMP", "NULLABLE")])
+
+
+# Particionamento por tempo e clustering das tabelas fato.
+# A granularidade de viagens pode ser trocada com BQ_PARTICAO_VIAGENS=DAY|MONTH|NONE.
+OPCOES_TABELAS = {
+    'viagens': {
+        'particao': 'data_saida',
+        'granularidade': os.getenv('BQ_PARTICAO_VIAGENS', 'MONTH').upper(),
+        'cluster': ['veiculo_id', 'motorista_id'],
+    },
+    'eventos': {
+        'particao': 'data_evento',
+        'granularidade': 'MONTH',
+        'cluster': ['veiculo_id'],
+    },
+    'telemetria': {
+        'particao': 'ts',
+        'granularidade': 'DAY',
+        'cluster': ['placa'],
+    },
+}
+
+
+def to_bigquery_schema(schema):
+    from google.cloud import bigquery
+    return [bigquery.SchemaField(nome, tipo, mode=modo) for nome, tipo, modo in schema]
+
+
+def to_bigquery_table(table_id, tabela, schema):
+    """Monta a bigquery.Table com o particionamento/clustering de OPCOES_TABELAS."""
+    from google.cloud import bigquery
+
+    table = bigquery.Table(table_id, schema=to_bigquery_schema(schema))
+    opcoes = OPCOES_TABELAS.get(tabela)
+    if opcoes and opcoes['granularidade'] != 'NONE':
+        table.time_partitioning = bigquery.TimePartitioning(
+            type_=opcoes['granularidade'], field=opcoes['particao'])
+        table.clustering_fields = opcoes['cluster']
+    return table
+
+
+def sort_columns(tabela):
+    """Colunas pelas quais ordenar os blocos antes da carga (partição + cluster)."""
+    opcoes = OPCOES_TABELAS.get(tabela)
+    if not opcoes or opcoes['granularidade'] == 'NONE':
+        return []
+    return [opcoes['particao']] + opcoes['cluster']
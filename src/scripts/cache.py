@@ -0,0 +1,218 @@
+# Cache de leitura (read-through) para o dashboard e consultas repetidas
+#
+#   - memória: LRU com TTL, thread-safe
+#   - disco (CACHE_DIR, padrão .cache na raiz do repositório): sobrevive entre
+#     execuções e é compartilhado entre processos; é por ele que os scripts de
+#     carga invalidam as chaves usadas pelo notebook/05_test_queries.py
+#
+# Chaves por convenção '<banco>:<recurso>' (ex.: 'firestore:veiculos_status',
+# 'bigquery:resumo_mensal'), para invalidar por prefixo.
+#
+# Configuração (.env): CACHE_DIR (padrão: .cache; vazio = só memória, e aí a invalidação
+# não passa de um processo para outro), CACHE_TTL (segundos, padrão 300), CACHE_MAX_ITENS (padrão 256).
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_AUSENTE = object()
+CACHE_DIR_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '.cache')
+
+
+class TTLCache:
+    def __init__(self, max_itens=256, ttl=300, diretorio=None):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.diretorio = diretorio
+        self._itens = OrderedDict()  # chave -> (expira_em, valor, em_disco)
+        self._lock = threading.Lock()
+        self._carregando = {}  # chave -> (Lock, threads usando): uma única carga por chave ao mesmo tempo
+        # chave -> geração, enquanto há carga em andamento: invalidate() incrementa, e a
+        # carga que começou antes da invalidação não grava o valor (já desatualizado)
+        self._geracoes = {}
+        self._stats = {'hits': 0, 'hits_disco': 0, 'misses': 0, 'expirados': 0, 'despejados': 0, 'invalidados': 0}
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+    # --- disco ---
+
+    def _arquivo(self, chave):
+        return os.path.join(self.diretorio, quote(chave, safe='') + '.pkl')
+
+    def _ler_disco(self, chave):
+        try:
+            with open(self._arquivo(chave), 'rb') as f:
+                expira_em, valor = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return _AUSENTE, None
+        if expira_em <= time.time():
+            return _AUSENTE, None
+        return valor, expira_em
+
+    def _gravar_disco(self, chave, expira_em, valor):
+        temporario = self._arquivo(chave) + f'.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(temporario, 'wb') as f:
+                pickle.dump((expira_em, valor), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, self._arquivo(chave))
+            return True
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            # Valor não serializável: fica só em memória
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            return False
+
+    # --- memória ---
+
+    def _ler_memoria(self, chave):
+        item = self._itens.get(chave)
+        if item is None:
+            return _AUSENTE
+        expira_em, valor, em_disco = item
+        # O arquivo apagado por outro processo (invalidação) invalida a cópia em memória
+        if expira_em <= time.time() or (em_disco and not os.path.exists(self._arquivo(chave))):
+            del self._itens[chave]
+            self._stats['expirados'] += 1
+            return _AUSENTE
+        self._itens.move_to_end(chave)
+        return valor
+
+    def _gravar_memoria(self, chave, expira_em, valor, em_disco=False):
+        self._itens[chave] = (expira_em, valor, em_disco)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+            self._stats['despejados'] += 1
+
+    # --- API ---
+
+    def get(self, chave, default=None):
+        with self._lock:
+            valor = self._ler_memoria(chave)
+            if valor is not _AUSENTE:
+                self._stats['hits'] += 1
+                return valor
+        if self.diretorio:
+            valor, expira_em = self._ler_disco(chave)
+            if valor is not _AUSENTE:
+                with self._lock:
+                    self._gravar_memoria(chave, expira_em, valor, em_disco=True)
+                    self._stats['hits_disco'] += 1
+                return valor
+        with self._lock:
+            self._stats['misses'] += 1
+        return default
+
+    def set(self, chave, valor, ttl=None, geracao=None):
+        """geracao (get_or_load): grava só se a chave não foi invalidada desde o início da carga."""
+        expira_em = time.time() + (self.ttl if ttl is None else ttl)
+        em_disco = bool(self.diretorio) and self._gravar_disco(chave, expira_em, valor)
+        with self._lock:
+            if geracao is None or self._geracoes.get(chave) == geracao:
+                self._gravar_memoria(chave, expira_em, valor, em_disco)
+                return
+        # Invalidada durante a carga: desfaz a gravação em disco
+        if em_disco and os.path.exists(self._arquivo(chave)):
+            os.remove(self._arquivo(chave))
+
+    def get_or_load(self, chave, carregar, ttl=None):
+        """Devolve o valor em cache ou chama carregar() e guarda o resultado."""
+        valor = self.get(chave, _AUSENTE)
+        if valor is not _AUSENTE:
+            return valor
+        with self._lock:
+            trava, usuarios = self._carregando.get(chave, (None, 0))
+            trava = trava or threading.Lock()
+            self._carregando[chave] = (trava, usuarios + 1)
+            self._geracoes.setdefault(chave, 0)
+        try:
+            with trava:
+                # Outra thread pode ter carregado enquanto esperávamos
+                with self._lock:
+                    valor = self._ler_memoria(chave)
+                    geracao = self._geracoes[chave]
+                if valor is not _AUSENTE:
+                    return valor
+                valor = carregar()
+                self.set(chave, valor, ttl, geracao)
+                return valor
+        finally:
+            # A última thread da chave remove a trava (os dicionários não crescem com as chaves)
+            with self._lock:
+                trava, usuarios = self._carregando[chave]
+                if usuarios == 1:
+                    del self._carregando[chave]
+                    del self._geracoes[chave]
+                else:
+                    self._carregando[chave] = (trava, usuarios - 1)
+
+    def invalidate(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+            if chave in self._geracoes:
+                self._geracoes[chave] += 1
+            self._stats['invalidados'] += 1
+        if self.diretorio and os.path.exists(self._arquivo(chave)):
+            os.remove(self._arquivo(chave))
+
+    def invalidate_prefix(self, prefixo):
+        with self._lock:
+            chaves = [c for c in self._itens if c.startswith(prefixo)]
+            for chave in chaves:
+                del self._itens[chave]
+            for chave in self._geracoes:
+                if chave.startswith(prefixo):
+                    self._geracoes[chave] += 1
+            self._stats['invalidados'] += len(chaves)
+        if self.diretorio:
+            inicio = quote(prefixo, safe='')
+            for nome in os.listdir(self.diretorio):
+                if nome.startswith(inicio) and nome.endswith('.pkl'):
+                    os.remove(os.path.join(self.diretorio, nome))
+
+    def clear(self):
+        self.invalidate_prefix('')
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, itens=len(self._itens))
+        consultas = stats['hits'] + stats['hits_disco'] + stats['misses']
+        stats['taxa_acerto'] = (stats['hits'] + stats['hits_disco']) / consultas if consultas else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Cache padrão do processo, configurado pelo .env."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTLCache(
+                max_itens=int(os.getenv('CACHE_MAX_ITENS', '256')),
+                ttl=float(os.getenv('CACHE_TTL', '300')),
+                diretorio=os.getenv('CACHE_DIR', os.path.normpath(CACHE_DIR_PADRAO)) or None,
+            )
+        return _cache
+
+
+def invalidate(*prefixos):
+    """Usado pelos scripts de carga: invalida as chaves que começam com os prefixos."""
+    cache = get_cache()
+    for prefixo in prefixos:
+        cache.invalidate_prefix(prefixo)
+
+
+def print_stats(stats):
+    print(f"  🗃️  Cache: {stats['hits']} hits, {stats['hits_disco']} hits em disco, {stats['misses']} misses "
+          f"(taxa de acerto {stats['taxa_acerto']:.0%}), {stats['itens']} itens, "
+          f"{stats['despejados']} despejados, {stats['invalidados']} invalidados")
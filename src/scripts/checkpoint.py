@@ -0,0 +1,96 @@
+# Checkpoints das cargas: quais blocos de cada tabela já foram gravados no destino
+#
+# Um arquivo JSON por destino (data/checkpoints/<destino>.json), regravado de
+# forma atômica depois de cada bloco confirmado. Numa nova execução, os blocos
+# já registrados são pulados e a carga continua de onde parou.
+#
+# Cada tabela guarda a assinatura da origem (lake.fingerprint + tamanho do
+# bloco): se os dados do lake mudarem, os blocos antigos não valem mais e a
+# tabela recomeça do zero, com uma nova geração (um id aleatório). As cargas são
+# upserts ou load jobs com id derivado da geração e do bloco: repetir um bloco
+# cujo checkpoint não chegou a ser gravado não duplica nada.
+#
+# Etapas sem blocos (índices, agregados...) usam só finish/is_finished.
+
+import json
+import os
+import threading
+import uuid
+
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', os.path.join('data', 'checkpoints'))
+
+
+class Checkpoint:
+    def __init__(self, destino, diretorio=None):
+        self.caminho = os.path.join(diretorio or CHECKPOINT_DIR, f'{destino}.json')
+        self._lock = threading.Lock()
+        try:
+            with open(self.caminho, encoding='utf-8') as f:
+                self._estado = json.load(f)
+        except FileNotFoundError:
+            self._estado = {}
+
+    def _gravar(self):
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        temporario = f'{self.caminho}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self._estado, f, indent=2)
+        os.replace(temporario, self.caminho)
+
+    def start(self, tabela, assinatura=None):
+        """Começa (ou retoma) a tabela. Devolve quantos blocos já estavam gravados."""
+        with self._lock:
+            atual = self._estado.get(tabela)
+            # Checkpoints sem geração (versão anterior) também recomeçam
+            if atual is None or atual['assinatura'] != assinatura or 'geracao' not in atual:
+                atual = self._estado[tabela] = {'assinatura': assinatura, 'geracao': uuid.uuid4().hex[:12],
+                                                'blocos': {}, 'concluida': False}
+                self._gravar()
+            return len(atual['blocos'])
+
+    def generation(self, tabela):
+        """Id da carga atual da tabela (muda quando a tabela recomeça do zero)."""
+        with self._lock:
+            return self._estado[tabela]['geracao']
+
+    def is_prepared(self, tabela):
+        with self._lock:
+            return bool(self._estado.get(tabela, {}).get('preparada'))
+
+    def prepare(self, tabela):
+        """Registra que o destino já foi preparado (ex.: tabela recriada) para esta geração."""
+        with self._lock:
+            self._estado[tabela]['preparada'] = True
+            self._gravar()
+
+    def done(self, tabela, bloco):
+        with self._lock:
+            return str(bloco) in self._estado.get(tabela, {}).get('blocos', {})
+
+    def mark(self, tabela, bloco, linhas):
+        with self._lock:
+            self._estado[tabela]['blocos'][str(bloco)] = linhas
+            self._gravar()
+
+    def finish(self, tabela, assinatura=None):
+        with self._lock:
+            atual = self._estado.get(tabela)
+            if atual is None or atual['assinatura'] != assinatura:
+                atual = self._estado[tabela] = {'assinatura': assinatura, 'blocos': {}}
+            atual['concluida'] = True
+            self._gravar()
+
+    def is_finished(self, tabela, assinatura=None):
+        with self._lock:
+            atual = self._estado.get(tabela)
+            return bool(atual and atual.get('concluida') and atual['assinatura'] == assinatura)
+
+    def rows(self, tabela):
+        with self._lock:
+            return sum(self._estado.get(tabela, {}).get('blocos', {}).values())
+
+    def clear(self):
+        with self._lock:
+            self._estado = {}
+            if os.path.exists(self.caminho):
+                os.remove(self.caminho)
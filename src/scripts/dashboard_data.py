@@ -0,0 +1,46 @@
+# Leituras do dashboard (notebook e 05_test_queries.py) passando pelo cache
+#
+# Os dados só mudam quando os scripts de carga rodam, e eles invalidam as
+# chaves correspondentes (cache.invalidate). Entre uma carga e outra, as
+# leituras repetidas não custam leituras do Firestore nem bytes do BigQuery.
+
+import hashlib
+
+from cache import get_cache
+from db import BQ_DATASET, get_bigquery_client, get_firestore_client
+from fs_queries import iter_docs
+
+PREFIXO_FIRESTORE = 'firestore:'
+PREFIXO_BIGQUERY = 'bigquery:'
+
+
+def dashboard_metrics(cache=None):
+    """Documento metricas_tempo_real/dashboard ({} se não existir)."""
+    def carregar():
+        doc = get_firestore_client().collection('metricas_tempo_real').document('dashboard').get()
+        return doc.to_dict() if doc.exists else {}
+
+    return (cache or get_cache()).get_or_load(PREFIXO_FIRESTORE + 'metricas_tempo_real/dashboard', carregar)
+
+
+def collection_docs(colecao, campos=None, cache=None):
+    """Todos os documentos de uma coleção, como lista de dicts (com o id em '_id').
+
+    Com campos, só esses campos são lidos (select). A leitura é paginada (fs_queries).
+    """
+    def carregar():
+        return list(iter_docs(get_firestore_client().collection(colecao), campos))
+
+    # Cada projeção é uma chave (os campos entram como hash: o cache em disco usa a chave no nome do arquivo)
+    chave = PREFIXO_FIRESTORE + colecao
+    if campos:
+        chave += '?campos=' + hashlib.md5(','.join(campos).encode()).hexdigest()[:12]
+    return (cache or get_cache()).get_or_load(chave, carregar)
+
+
+def aggregate_df(nome, cache=None):
+    """Tabela de agregado do BigQuery inteira (são pequenas: uma linha por mês/veículo/motorista)."""
+    def carregar():
+        return get_bigquery_client().query(f"SELECT * FROM `{BQ_DATASET}.{nome}`").to_dataframe()
+
+    return (cache or get_cache()).get_or_load(PREFIXO_BIGQUERY + nome, carregar)
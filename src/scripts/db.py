@@ -0,0 +1,239 @@
+# Camada de acesso compartilhada pelos scripts
+#
+#   - pool de conexões PostgreSQL thread-safe (com métricas)
+#   - clientes BigQuery/Firestore únicos por processo
+#   - health check dos três bancos
+#
+# Toda a configuração vem do .env:
+#   POSTGRES_HOST, POSTGRES_PORT, POSTGRES_USER, POSTGRES_PASS, POSTGRES_DB
+#   POSTGRES_POOL_MIN, POSTGRES_POOL_MAX
+#   GCP_PROJECT, BQ_DATASET, GOOGLE_APPLICATION_CREDENTIALS
+#   BQ_LOCAL: arquivo DuckDB usado no lugar do BigQuery (bq_local.py, 11_local_warehouse.py)
+#   INSTRUMENTACAO: mede cada chamada aos três bancos (instrumentation.py)
+#
+# Uso:
+#   with pg_connection() as conn:
+#       with conn.cursor() as cur: ...
+#   client = get_bigquery_client()
+#   db = get_firestore_client()
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.pool import ThreadedConnectionPool
+
+import instrumentation
+
+load_dotenv()
+
+GCP_PROJECT = os.getenv('GCP_PROJECT', 'trabalho-final-bd-463916')
+BQ_DATASET = os.getenv('BQ_DATASET', f'{GCP_PROJECT}.frota_dw')
+
+_lock = threading.Lock()
+_pg_pool = None
+_bigquery_client = None
+_firestore_client = None
+
+
+def _ensure_credentials():
+    # Mesmo padrão dos scripts originais: credentials.json na raiz, se nada for configurado
+    os.environ.setdefault('GOOGLE_APPLICATION_CREDENTIALS', 'credentials.json')
+
+
+def pg_params(**overrides):
+    params = {
+        'host': os.getenv('POSTGRES_HOST'),
+        'port': int(os.getenv('POSTGRES_PORT', '5432')),
+        'user': os.getenv('POSTGRES_USER'),
+        'password': os.getenv('POSTGRES_PASS'),
+        'database': os.getenv('POSTGRES_DB'),
+    }
+    if instrumentation.enabled():
+        params['cursor_factory'] = instrumentation.InstrumentedCursor
+    params.update(overrides)
+    return params
+
+
+def pg_connect(**overrides):
+    """Conexão avulsa (fora do pool), ex.: para criar o banco no setup."""
+    return psycopg2.connect(**pg_params(**overrides))
+
+
+# --- PostgreSQL: pool ---
+
+class PgPool:
+    """ThreadedConnectionPool que espera por uma conexão livre em vez de falhar
+    quando o pool está cheio, e registra métricas de uso."""
+
+    def __init__(self, minconn, maxconn, **params):
+        self._pool = ThreadedConnectionPool(minconn, maxconn, **params)
+        self._livres = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self.maxconn = maxconn
+        self._metricas = {
+            'emprestimos': 0,
+            'em_uso': 0,
+            'pico_em_uso': 0,
+            'esperas': 0,
+            'espera_total_s': 0.0,
+            'conexoes_descartadas': 0,
+        }
+
+    def getconn(self, timeout=None):
+        inicio = time.perf_counter()
+        if not self._livres.acquire(blocking=False):
+            with self._lock:
+                self._metricas['esperas'] += 1
+            if not self._livres.acquire(timeout=timeout if timeout is not None else -1):
+                raise TimeoutError("Nenhuma conexão PostgreSQL livre no pool")
+        try:
+            conn = self._pool.getconn()
+            if conn.closed:
+                # Conexão derrubada pelo servidor: descarta e pega outra
+                self._pool.putconn(conn, close=True)
+                with self._lock:
+                    self._metricas['conexoes_descartadas'] += 1
+                conn = self._pool.getconn()
+        except Exception:
+            self._livres.release()
+            raise
+        with self._lock:
+            self._metricas['emprestimos'] += 1
+            self._metricas['em_uso'] += 1
+            self._metricas['pico_em_uso'] = max(self._metricas['pico_em_uso'], self._metricas['em_uso'])
+            self._metricas['espera_total_s'] += time.perf_counter() - inicio
+        return conn
+
+    def putconn(self, conn, close=False):
+        try:
+            self._pool.putconn(conn, close=close or bool(conn.closed))
+        finally:
+            with self._lock:
+                self._metricas['em_uso'] -= 1
+                if close:
+                    self._metricas['conexoes_descartadas'] += 1
+            self._livres.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+    def metrics(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+        metricas['max_conexoes'] = self.maxconn
+        return metricas
+
+
+def get_pg_pool():
+    global _pg_pool
+    with _lock:
+        if _pg_pool is None:
+            _pg_pool = PgPool(
+                int(os.getenv('POSTGRES_POOL_MIN', '1')),
+                int(os.getenv('POSTGRES_POOL_MAX', '10')),
+                **pg_params(),
+            )
+        return _pg_pool
+
+
+@contextmanager
+def pg_connection(timeout=None):
+    """Empresta uma conexão do pool: commit no fim, rollback em caso de erro."""
+    pool = get_pg_pool()
+    conn = pool.getconn(timeout=timeout)
+    descartar = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        descartar = bool(conn.closed)
+        raise
+    finally:
+        pool.putconn(conn, close=descartar)
+
+
+def close_pg_pool():
+    global _pg_pool
+    with _lock:
+        if _pg_pool is not None:
+            _pg_pool.closeall()
+            _pg_pool = None
+
+
+# --- Google Cloud: clientes únicos ---
+
+def get_bigquery_client():
+    global _bigquery_client
+    with _lock:
+        if _bigquery_client is None:
+            if os.getenv('BQ_LOCAL'):
+                from bq_local import DuckDBClient
+
+                _bigquery_client = DuckDBClient(os.getenv('BQ_LOCAL'))
+            else:
+                from google.cloud import bigquery
+
+                _ensure_credentials()
+                _bigquery_client = bigquery.Client(project=GCP_PROJECT)
+            if instrumentation.enabled():
+                _bigquery_client = instrumentation.InstrumentedBigQuery(_bigquery_client)
+        return _bigquery_client
+
+
+def get_firestore_client():
+    global _firestore_client
+    with _lock:
+        if _firestore_client is None:
+            from google.cloud import firestore
+
+            if not os.getenv('FIRESTORE_EMULATOR_HOST'):
+                _ensure_credentials()
+            _firestore_client = firestore.Client(project=GCP_PROJECT)
+            if instrumentation.enabled():
+                _firestore_client = instrumentation.InstrumentedFirestore(_firestore_client)
+        return _firestore_client
+
+
+# --- Health check ---
+
+def _checar(nome, funcao):
+    inicio = time.perf_counter()
+    try:
+        funcao()
+        return {'backend': nome, 'ok': True, 'latencia_ms': (time.perf_counter() - inicio) * 1000, 'erro': None}
+    except Exception as e:
+        return {'backend': nome, 'ok': False, 'latencia_ms': (time.perf_counter() - inicio) * 1000, 'erro': str(e)}
+
+
+def _checar_postgres():
+    with pg_connection(timeout=5) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+
+
+def _checar_bigquery():
+    list(get_bigquery_client().query("SELECT 1").result())
+
+
+def _checar_firestore():
+    get_firestore_client().collection('metricas_tempo_real').document('dashboard').get()
+
+
+def health_check(backends=('postgres', 'bigquery', 'firestore')):
+    funcoes = {'postgres': _checar_postgres, 'bigquery': _checar_bigquery, 'firestore': _checar_firestore}
+    return [_checar(nome, funcoes[nome]) for nome in backends]
+
+
+def print_health(resultados):
+    for r in resultados:
+        if r['ok']:
+            print(f"  ✅ {r['backend']}: ok ({r['latencia_ms']:.0f} ms)")
+        else:
+            print(f"  ❌ {r['backend']}: {r['erro']}")
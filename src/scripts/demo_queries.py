@@ -0,0 +1,40 @@
+# Leitura das consultas de demonstração (queries/consultas_demo.sql)
+# Usado pelos benchmarks para medir exatamente as consultas documentadas.
+
+import re
+
+CAMINHO_PADRAO = 'queries/consultas_demo.sql'
+
+_TITULO = re.compile(r'^--\s*(\d+)\.\s*(.+)$')
+
+CONSULTAS_POSTGRES = (1, 2, 3)
+CONSULTAS_BIGQUERY = (4, 5, 6)
+
+
+def load_demo_queries(caminho=CAMINHO_PADRAO):
+    """Devolve {número: {'titulo': ..., 'sql': ...}} com as consultas SQL do arquivo.
+
+    As consultas do Firestore e a integrada (7-10) são só comentários no arquivo
+    e ficam de fora.
+    """
+    consultas = {}
+    atual = None
+    with open(caminho, encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            linha = linha.rstrip('\r\n')
+            titulo = _TITULO.match(linha)
+            if titulo:
+                atual = int(titulo.group(1))
+                consultas[atual] = {'titulo': titulo.group(2).strip(), 'linhas': []}
+            elif linha.startswith('-- ===='):
+                atual = None
+            elif atual is not None and not linha.lstrip().startswith('--'):
+                consultas[atual]['linhas'].append(linha)
+
+    resultado = {}
+    for numero, consulta in consultas.items():
+        sql = '\n'.join(consulta['linhas']).strip()
+        if not sql or sql.startswith('/*'):
+            continue
+        resultado[numero] = {'titulo': consulta['titulo'], 'sql': sql.rstrip(';')}
+    return resultado
@@ -0,0 +1,490 @@
+# Carga em leque (fan-out): o data lake é lido uma vez e cada bloco vai para os três bancos
+#
+#   lake.batches ─┬─> fila limitada ─> PostgresSink   (upsert, pg_loader)
+#                 ├─> fila limitada ─> WarehouseSink  (typed_chunk + load job, bq_loader)
+#                 └─> fila limitada ─> FirestoreSink  (documentos montados com fs_docs)
+#
+# Cada tabela é lida numa thread própria e cada destino tem uma fila (e uma
+# thread) por tabela: as três cargas andam ao mesmo tempo, e dentro de cada
+# destino as tabelas independentes também (veiculos e motoristas; viagens e
+# eventos). Uma tabela só começa a ser gravada num destino depois que as tabelas
+# que ela referencia por FK (pg_schema.dependencies) terminaram nesse destino: no
+# PostgreSQL, as viagens só chegam depois de veículos e motoristas confirmados.
+#
+# As filas têm tamanho limitado: se um destino atrasa, a leitura daquela tabela
+# espera por ele e a memória fica limitada a alguns blocos por tabela e destino.
+# O tempo que a leitura passa esperando nas filas entra nas estatísticas e mostra
+# qual destino é o gargalo. Os blocos são compartilhados entre os destinos, então
+# nenhum destino altera o DataFrame recebido.
+#
+# Checkpoints como no resto do pipeline (checkpoint.Checkpoint, um arquivo por
+# destino): cada bloco confirmado é registrado e, numa nova execução, só é lido o
+# que algum destino ainda não tem. Um destino que falha deixa de receber blocos e
+# os outros continuam.
+
+import os
+import queue
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+import lake
+from pg_schema import TABELAS, dependencies
+
+
+class Sink:
+    """Destino da carga em leque: uma fila limitada de blocos e uma thread por tabela.
+
+    Subclasses definem `nome` e `tabelas` e implementam write(tabela, bloco, chunk),
+    chamado em paralelo para tabelas diferentes (nunca para a mesma tabela);
+    start(), table_done(tabela) e finish() são opcionais.
+    """
+
+    nome = None
+    tabelas = ()
+
+    def __init__(self, checkpoint, extra='', tamanho_fila=4):
+        self.checkpoint = checkpoint
+        self.extra = extra  # entra na assinatura dos checkpoints (ex.: particionamento)
+        self.erro = None
+        self.tamanho_fila = tamanho_fila
+        self._filas = {}  # tabela -> fila limitada de (bloco, chunk); None encerra a tabela
+        self._thread = threading.Thread(target=self._executar, name=f'sink-{self.nome}', daemon=True)
+        self._lock = threading.Lock()
+        self._assinaturas = {}
+        self._inicio = None
+        self._stats = {
+            'destino': self.nome,
+            'linhas': 0,
+            'blocos': 0,
+            'ocupado_s': 0.0,          # tempo gravando (somado entre as tabelas)
+            'espera_leitura_s': 0.0,   # tempo em que a leitura ficou bloqueada nesta fila
+            'segundos': 0.0,
+        }
+
+    # --- lado da leitura ---
+
+    def pending(self, assinaturas):
+        """Tabelas que ainda precisam ser lidas para este destino ({tabela: assinatura} -> lista)."""
+        pendentes = []
+        for tabela, assinatura in assinaturas.items():
+            if self.checkpoint.is_finished(tabela, assinatura):
+                print(f"  ⏭️  {self.nome}/{tabela}: já carregada")
+                continue
+            self._begin(tabela, assinatura)
+            pendentes.append(tabela)
+        return pendentes
+
+    def _begin(self, tabela, assinatura):
+        self._assinaturas[tabela] = assinatura
+        self._filas[tabela] = queue.Queue(maxsize=self.tamanho_fila)
+        feitos = self.checkpoint.start(tabela, assinatura)
+        if feitos:
+            print(f"  ↩️  {self.nome}/{tabela}: retomando depois de {feitos} bloco(s)")
+
+    def wants(self, tabela, bloco):
+        return self.erro is None and not self.checkpoint.done(tabela, bloco)
+
+    def submit(self, tabela, bloco, chunk):
+        inicio = time.perf_counter()
+        self._filas[tabela].put((bloco, chunk))
+        with self._lock:
+            self._stats['espera_leitura_s'] += time.perf_counter() - inicio
+
+    def end_table(self, tabela):
+        self._filas[tabela].put(None)
+
+    def launch(self):
+        self._inicio = time.perf_counter()
+        self._thread.start()
+
+    def close(self):
+        self._thread.join()
+        return self.stats()
+
+    # --- threads do destino ---
+
+    def _falhar(self, erro):
+        with self._lock:
+            if self.erro is None:
+                self.erro = erro
+
+    def _executar(self):
+        try:
+            self._medir(self.start)
+        except Exception as e:
+            self._falhar(e)
+        # As tabelas rodam mesmo depois de uma falha: só esvaziam as filas, para a leitura não ficar presa
+        dependencias = dependencies()
+        concluidas = {tabela: threading.Event() for tabela in self._filas}
+        threads = [
+            threading.Thread(target=self._executar_tabela, name=f'sink-{self.nome}-{tabela}', daemon=True,
+                             args=(tabela, [concluidas[d] for d in dependencias.get(tabela, []) if d in concluidas],
+                                   concluidas[tabela]))
+            for tabela in self._filas
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        try:
+            if self.erro is None:
+                self._medir(self.finish)
+        except Exception as e:
+            self._falhar(e)
+        finally:
+            self._stats['segundos'] = time.perf_counter() - self._inicio
+
+    def _executar_tabela(self, tabela, dependencias, concluida):
+        fila = self._filas[tabela]
+        item = ()
+        try:
+            # Só grava depois das tabelas referenciadas por FK (neste destino)
+            for evento in dependencias:
+                evento.wait()
+            while (item := fila.get()) is not None:
+                if self.erro is not None:
+                    continue
+                bloco, chunk = item
+                self._medir(self.write, tabela, bloco, chunk)
+                self.checkpoint.mark(tabela, bloco, len(chunk))
+                with self._lock:
+                    self._stats['linhas'] += len(chunk)
+                    self._stats['blocos'] += 1
+            if self.erro is None:
+                self._medir(self.table_done, tabela)
+        except Exception as e:
+            self._falhar(e)
+            while item is not None:
+                item = fila.get()
+        finally:
+            concluida.set()
+
+    def _medir(self, funcao, *args):
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args)
+        finally:
+            with self._lock:
+                self._stats['ocupado_s'] += time.perf_counter() - inicio
+
+    def stats(self):
+        stats = dict(self._stats, erro=None if self.erro is None else str(self.erro))
+        stats['linhas_por_segundo'] = stats['linhas'] / stats['segundos'] if stats['segundos'] > 0 else 0.0
+        return stats
+
+    # --- a implementar ---
+
+    def start(self):
+        pass
+
+    def table_done(self, tabela):
+        self.checkpoint.finish(tabela, self._assinaturas[tabela])
+
+    def finish(self):
+        pass
+
+
+def fan_out(sinks, chunk_rows=lake.CHUNK_ROWS, diretorio=None):
+    """Lê cada tabela do lake uma vez e entrega os blocos a todos os destinos interessados.
+
+    Devolve {'leitura': {...}, <destino>: stats do destino, ...}.
+    """
+    tabelas = [t for t in TABELAS if any(t in s.tabelas for s in sinks)]
+    origem = {t: f"{lake.fingerprint(t, diretorio)}:{chunk_rows}" for t in tabelas}
+    pendentes = {
+        sink.nome: sink.pending({t: f"{origem[t]}:{sink.extra}" for t in tabelas if t in sink.tabelas})
+        for sink in sinks
+    }
+
+    for sink in sinks:
+        sink.launch()
+    inicio = time.perf_counter()
+    leitura = {'linhas': 0, 'blocos': 0}
+    lock = threading.Lock()
+
+    def ler(tabela, interessados):
+        try:
+            for bloco, chunk in enumerate(lake.batches(tabela, linhas=chunk_rows, diretorio=diretorio)):
+                destinos = [s for s in interessados if s.wants(tabela, bloco)]
+                if not destinos:
+                    continue
+                with lock:
+                    leitura['linhas'] += len(chunk)
+                    leitura['blocos'] += 1
+                for sink in destinos:
+                    sink.submit(tabela, bloco, chunk)
+        except Exception as e:
+            for sink in interessados:
+                sink._falhar(e)
+        finally:
+            for sink in interessados:
+                sink.end_table(tabela)
+
+    # Uma leitura por tabela: cada destino grava as tabelas independentes ao mesmo tempo
+    leitores = []
+    for tabela in tabelas:
+        interessados = [s for s in sinks if tabela in pendentes[s.nome]]
+        if interessados:
+            leitores.append(threading.Thread(target=ler, args=(tabela, interessados), name=f'lake-{tabela}'))
+    for leitor in leitores:
+        leitor.start()
+    for leitor in leitores:
+        leitor.join()
+    leitura['segundos'] = time.perf_counter() - inicio
+
+    resultado = {'leitura': leitura}
+    for sink in sinks:
+        resultado[sink.nome] = sink.close()
+    return resultado
+
+
+def print_stats(resultado):
+    leitura = resultado['leitura']
+    print(f"  📖 leitura: {leitura['linhas']:,} linhas em {leitura['blocos']} bloco(s), {leitura['segundos']:.2f}s")
+    destinos = [stats for nome, stats in resultado.items() if nome != 'leitura']
+    for stats in destinos:
+        situacao = "❌ falhou" if stats['erro'] else f"{stats['linhas_por_segundo']:,.0f} linhas/s"
+        print(f"  - {stats['destino']}: {stats['linhas']:,} linhas em {stats['blocos']} bloco(s), "
+              f"{stats['segundos']:.2f}s (gravando {stats['ocupado_s']:.2f}s, "
+              f"leitura esperou {stats['espera_leitura_s']:.2f}s) | {situacao}")
+    concluidos = [stats for stats in destinos if not stats['erro']]
+    if len(concluidos) > 1:
+        gargalo = max(concluidos, key=lambda s: s['ocupado_s'])
+        print(f"  🐢 gargalo: {gargalo['destino']}")
+
+
+# --- destinos ---
+
+def ensure_database():
+    from db import pg_connect, pg_params
+
+    nome = pg_params()['database']
+    conn = pg_connect(database='postgres')
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", [nome])
+            if cur.fetchone() is None:
+                cur.execute(f'CREATE DATABASE "{nome}"')
+                print(f"📦 Banco {nome} criado")
+    finally:
+        conn.close()
+
+
+class PostgresSink(Sink):
+    nome = 'postgres'
+    tabelas = ('veiculos', 'motoristas', 'viagens', 'eventos')
+
+    def __init__(self, checkpoint, particionado=False, limpar=False, **kwargs):
+        super().__init__(checkpoint, extra=particionado, **kwargs)
+        self.particionado = particionado
+        self.limpar = limpar  # --reiniciar: o upsert não apaga linhas que saíram do lake
+        self.conn = None
+        self._conexoes = {}  # tabela -> conexão (as tabelas são gravadas em paralelo)
+
+    def start(self):
+        from db import pg_connect
+        from pg_schema import create_tables
+
+        ensure_database()
+        self.conn = pg_connect()
+        with self.conn.cursor() as cur:
+            create_tables(cur, particionado=self.particionado, if_not_exists=True)
+            if self.limpar:
+                # Todas juntas: as chaves estrangeiras ficam dentro do mesmo TRUNCATE
+                cur.execute(f"TRUNCATE {', '.join(self.tabelas)}")
+            if self.particionado:
+                from pg_partitions import create_future_partitions
+
+                create_future_partitions(cur)
+        self.conn.commit()
+
+    def write(self, tabela, bloco, chunk):
+        from db import pg_connect
+        from pg_loader import load_dataframe, load_partitioned
+        from pg_schema import PARTICIONAMENTO
+
+        if tabela not in self._conexoes:
+            self._conexoes[tabela] = pg_connect()
+        conn = self._conexoes[tabela]
+        particao = PARTICIONAMENTO.get(tabela) if self.particionado else None
+        with conn.cursor() as cur:
+            if particao:
+                load_partitioned(cur, tabela, chunk, particao, 'upsert')
+            else:
+                load_dataframe(cur, tabela, chunk, 'upsert')
+        conn.commit()
+
+    def finish(self):
+        from pg_schema import create_indexes
+
+        # Índices depois da carga (IF NOT EXISTS: numa retomada, só os que faltam)
+        with self.conn.cursor() as cur:
+            create_indexes(cur)
+        self.conn.commit()
+
+    def close(self):
+        stats = super().close()
+        for conn in [self.conn, *self._conexoes.values()]:
+            if conn is not None:
+                conn.close()
+        return stats
+
+
+class WarehouseSink(Sink):
+    """BigQuery (ou o DuckDB local, com BQ_LOCAL): cada bloco é convertido para os
+    tipos do esquema, gravado em Parquet e acrescentado com um load job de id
+    determinístico (bq_loader.load_chunk). A tabela é recriada quando a carga
+    recomeça do zero e mantida ao retomar."""
+
+    nome = 'bigquery'
+    tabelas = ('veiculos', 'motoristas', 'viagens')
+
+    def __init__(self, checkpoint, dataset_id, **kwargs):
+        super().__init__(checkpoint, **kwargs)
+        self.dataset_id = dataset_id
+
+    def start(self):
+        from bq_loader import BigQueryBackend, DuckDBBackend
+
+        if os.getenv('BQ_LOCAL'):
+            from bq_local import DuckDBClient
+
+            self.backend = DuckDBBackend(os.getenv('BQ_LOCAL'))
+            self.client = DuckDBClient(con=self.backend.con)
+        else:
+            from google.cloud import bigquery
+
+            from db import get_bigquery_client
+
+            self.client = get_bigquery_client()
+            dataset = bigquery.Dataset(self.dataset_id)
+            dataset.location = "US"
+            self.client.create_dataset(dataset, exists_ok=True, timeout=30)
+            self.backend = BigQueryBackend(self.client, self.dataset_id)
+        self._tmpdir = tempfile.TemporaryDirectory(prefix='fanout_bq_')
+        self._criadas = set()
+
+    def write(self, tabela, bloco, chunk):
+        from bq_loader import load_chunk, partition_sorted, prepare_table, typed_chunk
+        from bq_schema import SCHEMAS
+
+        schema = SCHEMAS[tabela]
+        if tabela not in self._criadas:
+            prepare_table(self.backend, tabela, schema, self.checkpoint)
+            self._criadas.add(tabela)
+        caminho = os.path.join(self._tmpdir.name, f'{tabela}_{bloco:05d}.parquet')
+        partition_sorted(typed_chunk(chunk, schema), tabela).to_parquet(caminho, index=False)
+        load_chunk(self.backend, tabela, caminho, schema, self.checkpoint, bloco)
+        os.remove(caminho)
+
+    def finish(self):
+        from bq_aggregates import print_stats as print_aggregate_stats, refresh_aggregates
+
+        self._tmpdir.cleanup()
+        # Agregados só quando algum bloco novo chegou (ou se a última atualização não terminou)
+        if self._stats['blocos'] or not self.checkpoint.is_finished('agregados'):
+            print("📊 Recalculando agregados...")
+            for stats in refresh_aggregates(self.client, self.dataset_id, completo=True):
+                print_aggregate_stats(stats)
+            self.checkpoint.finish('agregados')
+
+
+class FirestoreSink(Sink):
+    """Documentos do Firestore montados durante a leitura.
+
+    Os alertas saem de cada bloco de eventos (id = evento_id). veiculos_status
+    depende da última viagem de cada veículo: o índice é atualizado bloco a bloco e
+    os documentos são gravados no fim, junto com os contadores do dashboard. Por
+    isso o destino é tudo ou nada: se alguma tabela mudou ou ficou pela metade, todas
+    são lidas de novo (os alertas de blocos já gravados só entram na contagem).
+    """
+
+    nome = 'firestore'
+    tabelas = ('veiculos', 'motoristas', 'viagens', 'eventos')
+
+    def __init__(self, checkpoint, **kwargs):
+        super().__init__(checkpoint, **kwargs)
+        self._veiculos = []
+        self._motoristas = []
+        self._do_dia = []
+        self._ultimas = None
+        self._placas = None
+        self._alertas = []
+        self.hoje = pd.Timestamp.today().strftime('%Y-%m-%d')
+
+    def pending(self, assinaturas):
+        if all(self.checkpoint.is_finished(t, a) for t, a in assinaturas.items()):
+            print(f"  ⏭️  {self.nome}: já carregado")
+            return []
+        for tabela, assinatura in assinaturas.items():
+            self._begin(tabela, assinatura)
+        return list(assinaturas)
+
+    def wants(self, tabela, bloco):
+        return self.erro is None
+
+    def start(self):
+        from db import get_firestore_client
+
+        self.db = get_firestore_client()
+
+    def write(self, tabela, bloco, chunk):
+        from fs_docs import ultimas_viagens
+
+        if tabela == 'veiculos':
+            self._veiculos.append(chunk[['id', 'placa', 'modelo', 'tipo', 'km_atual', 'status']])
+        elif tabela == 'motoristas':
+            self._motoristas.append(chunk[['id', 'nome']])
+        elif tabela == 'viagens':
+            ultimas = ultimas_viagens(chunk)
+            if self._ultimas is not None:
+                ultimas = ultimas_viagens(pd.concat([self._ultimas.reset_index(), ultimas.reset_index()]))
+            self._ultimas = ultimas
+            # baseline_from_dataframes só usa as viagens de hoje
+            self._do_dia.append(chunk.loc[chunk['data_saida'].astype(str).str.startswith(self.hoje),
+                                          ['data_saida', 'km_percorridos']])
+        elif tabela == 'eventos':
+            self._write_alerts(bloco, chunk)
+
+    def _write_alerts(self, bloco, chunk):
+        from fs_docs import alert_docs, placas_por_veiculo
+        from fs_writer import BatchWriter
+
+        if self._placas is None:
+            self._placas = placas_por_veiculo(pd.concat(self._veiculos, ignore_index=True))
+        alertas = list(alert_docs(chunk[chunk['resolvido'] == False], self._placas))
+        self._alertas.extend({'prioridade': alerta['prioridade']} for alerta in alertas)
+        if self.checkpoint.done('eventos', bloco):
+            return
+        colecao = self.db.collection('alertas')
+        with BatchWriter(self.db) as writer:
+            for alerta in alertas:
+                writer.set(colecao.document(str(alerta['evento_id'])), alerta)
+
+    def table_done(self, tabela):
+        pass
+
+    def finish(self):
+        from fs_docs import vehicle_status_docs
+        from fs_metrics import MetricsAggregator, baseline_from_dataframes
+        from fs_writer import BatchWriter
+
+        if not self._assinaturas:
+            return
+        df_veiculos = pd.concat(self._veiculos, ignore_index=True)
+        df_motoristas = pd.concat(self._motoristas, ignore_index=True)
+        colecao = self.db.collection('veiculos_status')
+        with BatchWriter(self.db) as writer:
+            for placa, doc in vehicle_status_docs(df_veiculos, self._ultimas, df_motoristas):
+                writer.set(colecao.document(placa), doc)
+
+        # reset() grava os valores absolutos: repetir não conta nada em dobro
+        df_viagens = pd.concat(self._do_dia, ignore_index=True)
+        MetricsAggregator(self.db).reset(baseline_from_dataframes(
+            df_veiculos, df_motoristas, df_viagens, self._alertas, hoje=pd.Timestamp(self.hoje).date()))
+        for tabela, assinatura in self._assinaturas.items():
+            self.checkpoint.finish(tabela, assinatura)
@@ -0,0 +1,114 @@
+# Montagem dos documentos do Firestore a partir dos DataFrames
+#
+# Os índices por veículo (última viagem e placa) são calculados uma única vez,
+# com operações vetorizadas; a montagem dos documentos é então linear no número
+# de veículos/alertas, em vez de varrer df_viagens para cada veículo.
+
+import random
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from geo import geohash_encode
+
+STATUS_OPCOES = {
+    'Disponível': {'cor': 'verde', 'icone': '✅'},
+    'Em viagem': {'cor': 'azul', 'icone': '🚛'},
+    'Manutenção': {'cor': 'vermelho', 'icone': '🔧'}
+}
+
+CORES_PRIORIDADE = {
+    'Alta': {'cor': '#FF0000', 'peso': 3},
+    'Média': {'cor': '#FFA500', 'peso': 2},
+    'Baixa': {'cor': '#008000', 'peso': 1}
+}
+
+RESPONSAVEIS = ['João Silva', 'Maria Santos', 'Pedro Costa', None]
+
+
+def ultimas_viagens(df_viagens):
+    """Última viagem (por data_saida) de cada veículo, indexada por veiculo_id."""
+    ultimas = (df_viagens[['veiculo_id', 'data_saida', 'data_chegada', 'origem', 'destino', 'carga_kg']]
+               .sort_values('data_saida', kind='stable')
+               .drop_duplicates('veiculo_id', keep='last')
+               .set_index('veiculo_id'))
+    ultimas['data_chegada'] = pd.to_datetime(ultimas['data_chegada'])
+    return ultimas
+
+
+def placas_por_veiculo(df_veiculos):
+    return df_veiculos.set_index('id')['placa']
+
+
+def vehicle_status_docs(df_veiculos, ultimas, df_motoristas):
+    """Gera (placa, documento) para a coleção veiculos_status."""
+    base = df_veiculos.join(ultimas[['origem', 'destino', 'data_chegada', 'carga_kg']], on='id')
+
+    # Sorteia um motorista por veículo de uma vez só (usado apenas pelos que estão em viagem)
+    sorteio = np.random.randint(0, len(df_motoristas), len(base)) if len(df_motoristas) else None
+    motorista_ids = df_motoristas['id'].to_numpy()
+    motorista_nomes = df_motoristas['nome'].to_numpy()
+
+    # Posição inicial perto de São Paulo, com o geohash calculado de uma vez
+    latitudes = -23.5505 + np.random.uniform(-2, 2, len(base))
+    longitudes = -46.6333 + np.random.uniform(-2, 2, len(base))
+    geohashes = geohash_encode(latitudes, longitudes)
+
+    agora = datetime.now()
+    for i, veiculo in enumerate(base.itertuples(index=False)):
+        tem_viagem = not pd.isna(veiculo.destino)
+        doc_data = {
+            'veiculo_id': int(veiculo.id),
+            'placa': veiculo.placa,
+            'modelo': veiculo.modelo,
+            'tipo': veiculo.tipo,
+            'status': veiculo.status,
+            'status_info': STATUS_OPCOES[veiculo.status],
+            'ultima_atualizacao': agora,
+            'localizacao_atual': veiculo.destino if tem_viagem else 'Base',
+            'latitude': float(latitudes[i]),
+            'longitude': float(longitudes[i]),
+            'geohash': geohashes[i],
+            'km_atual': int(veiculo.km_atual),
+            'proximo_servico_km': int(veiculo.km_atual) + 5000,
+            'combustivel_nivel': random.randint(20, 100),
+            'temperatura_motor': random.randint(80, 95),
+        }
+
+        # Se em viagem, adicionar info da última viagem
+        if veiculo.status == 'Em viagem' and tem_viagem and sorteio is not None:
+            doc_data['viagem_atual'] = {
+                'origem': veiculo.origem,
+                'destino': veiculo.destino,
+                'previsao_chegada': veiculo.data_chegada.to_pydatetime(),
+                'carga': f"{int(veiculo.carga_kg)} kg",
+                'motorista_id': int(motorista_ids[sorteio[i]]),
+                'motorista_nome': motorista_nomes[sorteio[i]]
+            }
+
+        yield veiculo.placa, doc_data
+
+
+def alert_docs(df_eventos, placas):
+    """Gera os documentos da coleção alertas (apenas eventos não resolvidos)."""
+    abertos = df_eventos[~df_eventos['resolvido'].astype(bool)]
+    datas = pd.to_datetime(abertos['data_evento'])
+    placa_evento = abertos['veiculo_id'].map(placas)
+
+    agora = datetime.now()
+    for evento, data, placa in zip(abertos.itertuples(index=False), datas, placa_evento):
+        data_criacao = data.to_pydatetime()
+        yield {
+            'evento_id': int(evento.id),
+            'veiculo_id': int(evento.veiculo_id),
+            'placa': placa,
+            'tipo': evento.tipo,
+            'prioridade': evento.prioridade,
+            'descricao': evento.descricao,
+            'data_criacao': data_criacao,
+            'tempo_aberto': str(agora - data_criacao).split('.')[0],
+            'responsavel': random.choice(RESPONSAVEIS),
+            'observacoes': [],
+            'prioridade_info': CORES_PRIORIDADE[evento.prioridade],
+        }
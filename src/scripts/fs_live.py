@@ -0,0 +1,153 @@
+# Visão ao vivo do Firestore com snapshot listeners
+#
+# Em vez de reler a coleção inteira a cada atualização (stream()), cada
+# LiveCollection escuta a coleção com on_snapshot e aplica só os documentos
+# alterados (ADDED / MODIFIED / REMOVED) a um dicionário em memória. O custo de
+# cada atualização é proporcional ao número de mudanças, não ao tamanho da frota.
+#
+# LiveView junta veículos e alertas e chama a função de renderização no máximo
+# a cada `intervalo` segundos, e só quando algo mudou.
+#
+# Funciona com o emulador: basta FIRESTORE_EMULATOR_HOST=localhost:8080 (ver db.py).
+
+import threading
+import time
+
+import pandas as pd
+
+from db import get_firestore_client
+
+
+def vehicle_row(doc_id, dados):
+    viagem_atual = dados.get('viagem_atual') or {}
+    return {
+        'placa': dados.get('placa', doc_id),
+        'status': dados.get('status', 'N/A'),
+        'localizacao': dados.get('localizacao_atual', 'N/A'),
+        'lat': dados.get('latitude', 0),
+        'lng': dados.get('longitude', 0),
+        'combustivel': dados.get('combustivel_nivel', 0),
+        # velocidade_atual no documento vem da telemetria (telemetry.py)
+        'velocidade': dados.get('velocidade_atual', viagem_atual.get('velocidade_atual', 0)),
+        'motorista': viagem_atual.get('motorista_nome', 'N/A'),
+    }
+
+
+def alert_row(doc_id, dados):
+    return {'id': doc_id, **{k: v for k, v in dados.items() if k not in ('observacoes', 'prioridade_info')}}
+
+
+class LiveCollection:
+    """Espelho em memória de uma coleção (ou consulta), mantido por um snapshot listener."""
+
+    def __init__(self, query, transformar=None, ao_mudar=None):
+        self.query = query
+        self.transformar = transformar or (lambda doc_id, dados: {'id': doc_id, **dados})
+        self.ao_mudar = ao_mudar
+        self._linhas = {}
+        self._lock = threading.Lock()
+        self._df = None
+        self._watch = None
+        self.pronto = threading.Event()  # primeiro snapshot recebido
+        self.versao = 0
+        self.mudancas_aplicadas = 0
+
+    def _on_snapshot(self, _docs, mudancas, _read_time):
+        with self._lock:
+            for mudanca in mudancas:
+                doc = mudanca.document
+                if mudanca.type.name == 'REMOVED':
+                    self._linhas.pop(doc.id, None)
+                else:
+                    self._linhas[doc.id] = self.transformar(doc.id, doc.to_dict())
+            self.mudancas_aplicadas += len(mudancas)
+            if mudancas:
+                self.versao += 1
+                self._df = None
+        self.pronto.set()
+        if mudancas and self.ao_mudar:
+            self.ao_mudar()
+
+    def start(self):
+        self._watch = self.query.on_snapshot(self._on_snapshot)
+        return self
+
+    def stop(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def dataframe(self):
+        """DataFrame atual; só é reconstruído se houve mudança desde a última chamada."""
+        with self._lock:
+            if self._df is None:
+                self._df = pd.DataFrame(list(self._linhas.values()))
+            return self._df
+
+    def __len__(self):
+        with self._lock:
+            return len(self._linhas)
+
+
+class LiveView:
+    """Veículos e alertas ao vivo, com renderização limitada (throttle)."""
+
+    def __init__(self, db=None, intervalo=2.0):
+        db = db or get_firestore_client()
+        self.intervalo = intervalo
+        self._mudou = threading.Event()
+        self.veiculos = LiveCollection(db.collection('veiculos_status'), vehicle_row, self._mudou.set)
+        self.alertas = LiveCollection(db.collection('alertas'), alert_row, self._mudou.set)
+        self.renderizacoes = 0
+
+    def start(self, timeout=30):
+        for colecao in (self.veiculos, self.alertas):
+            colecao.start()
+        for colecao in (self.veiculos, self.alertas):
+            if not colecao.pronto.wait(timeout):
+                raise TimeoutError("Firestore não enviou o snapshot inicial a tempo")
+        return self
+
+    def stop(self):
+        for colecao in (self.veiculos, self.alertas):
+            colecao.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def run(self, render, duracao=None):
+        """Chama render(df_veiculos, df_alertas) no início e depois a cada mudança,
+        no máximo uma vez a cada `intervalo` segundos. Para após `duracao` segundos
+        (None = até interromper)."""
+        fim = None if duracao is None else time.monotonic() + duracao
+        self._mudou.set()
+        ultima = float('-inf')
+        try:
+            while True:
+                agora = time.monotonic()
+                if fim is not None and agora >= fim:
+                    break
+                espera = ultima + self.intervalo - agora
+                if espera > 0:
+                    # Acumula as mudanças que chegarem até o próximo horário permitido
+                    time.sleep(espera if fim is None else min(espera, fim - agora))
+                    continue
+                if not self._mudou.wait(None if fim is None else fim - agora):
+                    break
+                self._mudou.clear()
+                render(self.veiculos.dataframe(), self.alertas.dataframe())
+                self.renderizacoes += 1
+                ultima = time.monotonic()
+        except KeyboardInterrupt:
+            pass
+
+    def stats(self):
+        return {
+            'veiculos': len(self.veiculos),
+            'alertas': len(self.alertas),
+            'mudancas_aplicadas': self.veiculos.mudancas_aplicadas + self.alertas.mudancas_aplicadas,
+            'renderizacoes': self.renderizacoes,
+        }
@@ -0,0 +1,201 @@
+# Contadores incrementais de metricas_tempo_real/dashboard
+#
+# Em vez de recalcular o dashboard a partir dos DataFrames inteiros, os eventos
+# (veículo muda de status, viagem começa, alerta abre/resolve) viram incrementos
+# atômicos (firestore.Increment). Os incrementos vão para documentos-shard em
+# metricas_tempo_real/dashboard/shards/{n}, escolhidos ao acaso, para que um
+# documento muito escrito não estoure o limite de ~1 escrita/s por documento.
+# consolidate() soma os shards (N leituras) e grava o documento dashboard, com
+# os mesmos campos de antes (o notebook e o 05_test_queries.py não mudam).
+#
+# Os eventos são acumulados em memória e enviados em flush(): um único set com
+# todos os incrementos por vez, em vez de uma escrita por evento.
+#
+# As viagens/km do dia ficam no mapa por_dia dos shards; consolidate() apaga os
+# dias mais antigos que DIAS_POR_DIA, para que os shards não cresçam para sempre.
+#
+# Uso:
+#   metricas = MetricsAggregator(db)
+#   metricas.vehicle_status_changed('Disponível', 'Em viagem')
+#   metricas.trip_started(km=320)
+#   metricas.alert_resolved('Alta')
+#   metricas.flush()          # envia os incrementos e consolida o dashboard
+
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+from google.cloud import firestore
+
+NUM_SHARDS = 10
+# Dias mantidos em por_dia (o dashboard só usa hoje; a folga cobre eventos atrasados)
+DIAS_POR_DIA = 7
+
+CAMPOS_STATUS = {
+    'Disponível': 'veiculos_disponiveis',
+    'Em viagem': 'veiculos_em_viagem',
+    'Manutenção': 'veiculos_manutencao',
+}
+
+CAMPOS_PRIORIDADE = {
+    'Alta': 'alta_prioridade',
+    'Média': 'media_prioridade',
+    'Baixa': 'baixa_prioridade',
+}
+
+CONTADORES = ['frota_total', 'motoristas_total', *CAMPOS_STATUS.values()]
+
+
+def _somar(destino, origem):
+    for campo, valor in origem.items():
+        if isinstance(valor, dict):
+            _somar(destino.setdefault(campo, {}), valor)
+        else:
+            destino[campo] = destino.get(campo, 0) + valor
+
+
+def _incrementos(deltas):
+    return {campo: _incrementos(valor) if isinstance(valor, dict) else firestore.Increment(valor)
+            for campo, valor in deltas.items()}
+
+
+def baseline_from_dataframes(df_veiculos, df_motoristas, df_viagens, alertas, hoje=None):
+    """Valores iniciais dos contadores (usado uma vez, pelo 04_setup_firestore.py)."""
+    hoje = (hoje or date.today()).isoformat()
+    status = df_veiculos['status'].value_counts()
+    do_dia = df_viagens[df_viagens['data_saida'].astype(str).str.startswith(hoje)]
+    prioridades = {}
+    for alerta in alertas:
+        prioridades[alerta['prioridade']] = prioridades.get(alerta['prioridade'], 0) + 1
+
+    contadores = {
+        'frota_total': len(df_veiculos),
+        'motoristas_total': len(df_motoristas),
+        **{campo: int(status.get(s, 0)) for s, campo in CAMPOS_STATUS.items()},
+        'alertas_ativos': {
+            'total': sum(prioridades.values()),
+            **{campo: prioridades.get(p, 0) for p, campo in CAMPOS_PRIORIDADE.items()},
+        },
+        'por_dia': {hoje: {'viagens': len(do_dia), 'km': int(do_dia['km_percorridos'].sum())}},
+    }
+    return contadores
+
+
+class MetricsAggregator:
+    def __init__(self, db, num_shards=NUM_SHARDS, consolidar_a_cada=5.0):
+        self.dashboard_ref = db.collection('metricas_tempo_real').document('dashboard')
+        self.shards_ref = self.dashboard_ref.collection('shards')
+        self.num_shards = num_shards
+        self.consolidar_a_cada = consolidar_a_cada
+        self._db = db
+        self._deltas = {}
+        self._lock = threading.Lock()
+        self._ultima_consolidacao = float('-inf')
+        self.eventos = 0
+        self.escritas = 0
+
+    # --- eventos ---
+
+    def _add(self, deltas):
+        with self._lock:
+            _somar(self._deltas, deltas)
+            self.eventos += 1
+
+    def vehicle_added(self, status):
+        self._add({'frota_total': 1, CAMPOS_STATUS[status]: 1})
+
+    def vehicle_removed(self, status):
+        self._add({'frota_total': -1, CAMPOS_STATUS[status]: -1})
+
+    def vehicle_status_changed(self, antigo, novo):
+        if antigo != novo:
+            self._add({CAMPOS_STATUS[antigo]: -1, CAMPOS_STATUS[novo]: 1})
+
+    def driver_added(self):
+        self._add({'motoristas_total': 1})
+
+    def trip_started(self, km=0, dia=None):
+        dia = (dia or date.today()).isoformat()
+        self._add({'por_dia': {dia: {'viagens': 1, 'km': int(km)}}})
+
+    def alert_opened(self, prioridade):
+        self._add({'alertas_ativos': {'total': 1, CAMPOS_PRIORIDADE[prioridade]: 1}})
+
+    def alert_resolved(self, prioridade):
+        self._add({'alertas_ativos': {'total': -1, CAMPOS_PRIORIDADE[prioridade]: -1}})
+
+    def alert_escalated(self, antiga, nova):
+        if antiga != nova:
+            self._add({'alertas_ativos': {CAMPOS_PRIORIDADE[antiga]: -1, CAMPOS_PRIORIDADE[nova]: 1}})
+
+    # --- escrita ---
+
+    def flush(self, consolidar=None):
+        """Envia os incrementos acumulados para um shard e, se já passou
+        consolidar_a_cada segundos desde a última vez (ou consolidar=True), consolida."""
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+        if deltas:
+            shard = self.shards_ref.document(str(random.randrange(self.num_shards)))
+            shard.set(_incrementos(deltas), merge=True)
+            self.escritas += 1
+        if consolidar or (consolidar is None and time.monotonic() - self._ultima_consolidacao >= self.consolidar_a_cada):
+            return self.consolidate()
+        return None
+
+    def reset(self, contadores):
+        """Zera os shards e grava os valores iniciais (no shard 0)."""
+        batch = self._db.batch()
+        for n in range(self.num_shards):
+            batch.set(self.shards_ref.document(str(n)), contadores if n == 0 else {})
+        batch.commit()
+        with self._lock:
+            self._deltas = {}
+        return self.consolidate()
+
+    def totals(self):
+        totais = {}
+        for shard in self.shards_ref.stream():
+            _somar(totais, shard.to_dict() or {})
+        return totais
+
+    def _prune_days(self, por_dia, hoje):
+        """Apaga de todos os shards os dias de por_dia fora da janela de DIAS_POR_DIA."""
+        limite = (hoje - timedelta(days=DIAS_POR_DIA)).isoformat()
+        antigos = [dia for dia in por_dia if dia < limite]
+        if not antigos:
+            return
+        batch = self._db.batch()
+        for n in range(self.num_shards):
+            batch.set(self.shards_ref.document(str(n)),
+                      {'por_dia': {dia: firestore.DELETE_FIELD for dia in antigos}}, merge=True)
+        batch.commit()
+        self.escritas += 1
+        for dia in antigos:
+            del por_dia[dia]
+
+    def consolidate(self, hoje=None):
+        """Soma os shards e grava o documento dashboard (leitura de N shards, sem DataFrames)."""
+        hoje = hoje or date.today()
+        totais = self.totals()
+        self._prune_days(totais.get('por_dia', {}), hoje)
+        do_dia = totais.get('por_dia', {}).get(hoje.isoformat(), {})
+        alertas = totais.get('alertas_ativos', {})
+        frota = totais.get('frota_total', 0)
+
+        metricas = {
+            'ultima_atualizacao': firestore.SERVER_TIMESTAMP,
+            **{campo: totais.get(campo, 0) for campo in CONTADORES},
+            'viagens_hoje': do_dia.get('viagens', 0),
+            'km_total_hoje': do_dia.get('km', 0),
+            'alertas_ativos': {
+                'total': alertas.get('total', 0),
+                **{campo: alertas.get(campo, 0) for campo in CAMPOS_PRIORIDADE.values()},
+            },
+            'eficiencia_frota': round((frota - totais.get('veiculos_manutencao', 0)) / frota * 100, 1) if frota else 0.0,
+        }
+        self.dashboard_ref.set(metricas)
+        self._ultima_consolidacao = time.monotonic()
+        self.escritas += 1
+        return metricas
@@ -0,0 +1,146 @@
+# Leituras do Firestore com projeção e paginação no servidor
+#
+# stream() numa coleção inteira traz todos os campos de todos os documentos e
+# mantém a resposta aberta até o último. Aqui as leituras
+#   - pedem só os campos usados (select): documentos de veiculos_status com
+#     viagem_atual, ou alertas com observacoes, não trafegam inteiros
+#   - andam em páginas de tamanho fixo com cursor (order_by + start_after + limit):
+#     cada página é uma consulta curta, e a memória fica limitada a uma página
+#   - viram DataFrames página a página (iter_dataframes), com os campos
+#     aninhados achatados ('viagem_atual.motorista_nome')
+#
+# Consultas com filtro de igualdade + ordenação por outro campo precisam de
+# índice composto. Os usados aqui estão em INDICES; para gerar o arquivo do
+# Firebase CLI (ou os comandos gcloud equivalentes):
+#   python src/scripts/fs_queries.py                         # grava firestore.indexes.json
+#   python src/scripts/fs_queries.py --gcloud                # imprime os comandos gcloud
+#
+# Cada documento lido conta como uma leitura, com ou sem projeção: o select
+# reduz bytes e memória, e a paginação (com limite) reduz o número de leituras.
+
+import argparse
+import json
+
+import pandas as pd
+
+PAGE_SIZE = 500
+
+# Campos do mapa/tabela de veículos (notebook, fs_live.vehicle_row)
+CAMPOS_VEICULOS_MAPA = ['placa', 'status', 'localizacao_atual', 'latitude', 'longitude', 'combustivel_nivel',
+                        'velocidade_atual', 'viagem_atual.velocidade_atual', 'viagem_atual.motorista_nome']
+# Consulta 8 de queries/consultas_demo.sql
+CAMPOS_ALERTAS_PRIORITARIOS = ['placa', 'tipo', 'descricao', 'tempo_aberto', 'data_criacao']
+
+# Índices compostos das consultas deste módulo (formato do firestore.indexes.json)
+INDICES = [
+    {   # alertas prioritários sem responsável, mais recentes primeiro (priority_alerts)
+        'collectionGroup': 'alertas',
+        'queryScope': 'COLLECTION',
+        'fields': [
+            {'fieldPath': 'prioridade', 'order': 'ASCENDING'},
+            {'fieldPath': 'responsavel', 'order': 'ASCENDING'},
+            {'fieldPath': 'data_criacao', 'order': 'DESCENDING'},
+        ],
+    },
+    {   # alertas de uma prioridade, mais recentes primeiro (priority_alerts com sem_responsavel=False)
+        'collectionGroup': 'alertas',
+        'queryScope': 'COLLECTION',
+        'fields': [
+            {'fieldPath': 'prioridade', 'order': 'ASCENDING'},
+            {'fieldPath': 'data_criacao', 'order': 'DESCENDING'},
+        ],
+    },
+]
+
+
+def vehicles_by_status(db, status):
+    # O id do documento é a placa: paginando pelo id, a ordem já é a da placa e o
+    # filtro de igualdade usa só o índice automático de status (sem índice composto)
+    return db.collection('veiculos_status').where('status', '==', status)
+
+
+def priority_alerts(db, prioridade='Alta', sem_responsavel=True):
+    """Alertas de uma prioridade, mais recentes primeiro (consulta 8: só os sem responsável)."""
+    from google.cloud import firestore
+
+    consulta = db.collection('alertas').where('prioridade', '==', prioridade)
+    if sem_responsavel:
+        consulta = consulta.where('responsavel', '==', None)
+    return consulta.order_by('data_criacao', direction=firestore.Query.DESCENDING)
+
+
+def paginate(consulta, campos=None, page_size=PAGE_SIZE, limite=None):
+    """Páginas (listas de DocumentSnapshot) de até page_size documentos.
+
+    O cursor é o último documento da página anterior: o cliente completa a ordem da
+    consulta com o id do documento, então a paginação é estável mesmo sem order_by.
+    Com campos, inclua os campos do order_by: o cursor é montado a partir deles.
+    limite para depois de tantos documentos.
+    """
+    if campos:
+        consulta = consulta.select(campos)
+    ultimo = None
+    lidos = 0
+    while limite is None or lidos < limite:
+        tamanho = page_size if limite is None else min(page_size, limite - lidos)
+        pagina_consulta = consulta.limit(tamanho)
+        if ultimo is not None:
+            pagina_consulta = pagina_consulta.start_after(ultimo)
+        pagina = list(pagina_consulta.stream())
+        if not pagina:
+            return
+        yield pagina
+        lidos += len(pagina)
+        if len(pagina) < tamanho:
+            return
+        ultimo = pagina[-1]
+
+
+def iter_docs(consulta, campos=None, page_size=PAGE_SIZE, limite=None):
+    """Documentos como dicts (com o id em '_id'), página a página."""
+    for pagina in paginate(consulta, campos, page_size, limite):
+        for doc in pagina:
+            yield {**doc.to_dict(), '_id': doc.id}
+
+
+def iter_dataframes(consulta, campos=None, page_size=PAGE_SIZE, limite=None):
+    """Um DataFrame por página. Campos aninhados viram colunas 'pai.filho'; com campos,
+    as colunas são sempre '_id' + campos (NaN onde o documento não tem o campo)."""
+    for pagina in paginate(consulta, campos, page_size, limite):
+        df = pd.json_normalize([{**doc.to_dict(), '_id': doc.id} for doc in pagina])
+        yield df.reindex(columns=['_id', *campos]) if campos else df
+
+
+def read_dataframe(consulta, campos=None, page_size=PAGE_SIZE, limite=None):
+    paginas = list(iter_dataframes(consulta, campos, page_size, limite))
+    if not paginas:
+        return pd.DataFrame(columns=['_id', *(campos or [])])
+    return pd.concat(paginas, ignore_index=True)
+
+
+def indexes_json():
+    return {'indexes': INDICES, 'fieldOverrides': []}
+
+
+def gcloud_commands(database='(default)'):
+    comandos = []
+    for indice in INDICES:
+        campos = ' '.join(f"--field-config=field-path={campo['fieldPath']},order={campo['order'].lower()}"
+                          for campo in indice['fields'])
+        comandos.append(f"gcloud firestore indexes composite create --database='{database}' "
+                        f"--collection-group={indice['collectionGroup']} --query-scope=collection {campos}")
+    return comandos
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Índices compostos das consultas do Firestore")
+    parser.add_argument('--saida', default='firestore.indexes.json', help="Arquivo para o Firebase CLI")
+    parser.add_argument('--gcloud', action='store_true', help="Imprime os comandos gcloud em vez de gravar o arquivo")
+    args = parser.parse_args()
+
+    if args.gcloud:
+        print('\n'.join(gcloud_commands()))
+    else:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(indexes_json(), f, indent=2, ensure_ascii=False)
+        print(f"✅ {len(INDICES)} índices compostos em {args.saida} (firebase deploy --only firestore:indexes)")
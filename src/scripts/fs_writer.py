@@ -0,0 +1,146 @@
+# Escrita em lote no Firestore
+#
+# Agrupa operações (set/delete) em WriteBatch de até 500 operações (limite do
+# Firestore) e faz o commit dos lotes em paralelo, com um número limitado de
+# lotes em voo. Commits que falham por contenção/indisponibilidade são
+# repetidos com backoff exponencial.
+#
+# Funciona igual contra o emulador: basta definir FIRESTORE_EMULATOR_HOST.
+#
+# Uso:
+#   with BatchWriter(db) as writer:
+#       writer.set(db.collection('x').document('a'), {...})
+#   print_stats(writer.stats())
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.api_core import exceptions as gexc
+
+from instrumentation import count
+
+MAX_OPERACOES_LOTE = 500
+
+ERROS_TRANSITORIOS = (
+    gexc.Aborted,
+    gexc.DeadlineExceeded,
+    gexc.ServiceUnavailable,
+    gexc.ResourceExhausted,
+    gexc.InternalServerError,
+)
+
+
+class BatchWriter:
+    def __init__(self, db, batch_size=MAX_OPERACOES_LOTE, max_workers=8, max_retries=5, backoff_base=0.5):
+        if not 1 <= batch_size <= MAX_OPERACOES_LOTE:
+            raise ValueError(f"batch_size deve estar entre 1 e {MAX_OPERACOES_LOTE}")
+        self.db = db
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        # Limita lotes em voo (os pendentes ficam em memória)
+        self._em_voo = threading.BoundedSemaphore(max_workers * 2)
+        self._futuros = []
+        self._operacoes = []
+        self._lock = threading.Lock()
+
+        self._inicio = time.perf_counter()
+        self._fim = None
+        self._contadores = {'operacoes': 0, 'lotes': 0, 'retries': 0}
+
+    # --- operações ---
+
+    def set(self, ref, dados, merge=False):
+        self._adicionar(('set', ref, dados, merge))
+
+    def delete(self, ref):
+        self._adicionar(('delete', ref, None, False))
+
+    def _adicionar(self, operacao):
+        self._operacoes.append(operacao)
+        if len(self._operacoes) >= self.batch_size:
+            self._enviar()
+
+    # --- commit dos lotes ---
+
+    def _enviar(self):
+        if not self._operacoes:
+            return
+        operacoes, self._operacoes = self._operacoes, []
+        self._em_voo.acquire()
+        futuro = self._executor.submit(self._commit, operacoes)
+        futuro.add_done_callback(lambda _: self._em_voo.release())
+        self._futuros.append(futuro)
+
+    def _commit(self, operacoes):
+        tentativa = 0
+        while True:
+            batch = self.db.batch()
+            for tipo, ref, dados, merge in operacoes:
+                if tipo == 'set':
+                    batch.set(ref, dados, merge=merge)
+                else:
+                    batch.delete(ref)
+            try:
+                batch.commit()
+                break
+            except ERROS_TRANSITORIOS:
+                tentativa += 1
+                if tentativa > self.max_retries:
+                    raise
+                with self._lock:
+                    self._contadores['retries'] += 1
+                count('retries', backend='firestore')
+                # Backoff exponencial com jitter
+                time.sleep(self.backoff_base * (2 ** (tentativa - 1)) * (0.5 + random.random()))
+
+        with self._lock:
+            self._contadores['operacoes'] += len(operacoes)
+            self._contadores['lotes'] += 1
+
+    def flush(self):
+        self._enviar()
+        futuros, self._futuros = self._futuros, []
+        for futuro in futuros:
+            futuro.result()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown()
+            self._fim = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- estatísticas ---
+
+    def stats(self):
+        segundos = (self._fim or time.perf_counter()) - self._inicio
+        with self._lock:
+            stats = dict(self._contadores)
+        stats['segundos'] = segundos
+        stats['operacoes_por_segundo'] = stats['operacoes'] / segundos if segundos > 0 else 0.0
+        return stats
+
+
+def delete_collection(writer, colecao, page_size=1000):
+    """Apaga todos os documentos de uma coleção sem ler o conteúdo deles."""
+    total = 0
+    for ref in colecao.list_documents(page_size=page_size):
+        writer.delete(ref)
+        total += 1
+    return total
+
+
+def print_stats(stats, descricao='operações'):
+    print(f"  ⏱️  {stats['operacoes']:,} {descricao} em {stats['lotes']} lote(s), {stats['segundos']:.2f}s "
+          f"({stats['operacoes_por_segundo']:,.0f}/s, {stats['retries']} retry(s))")
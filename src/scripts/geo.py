@@ -0,0 +1,192 @@
+# Consultas espaciais sobre a posição dos veículos
+#
+#   - geohash (vetorizado): gravado em veiculos_status junto com latitude/longitude,
+#     permite buscar uma região no Firestore por intervalos de prefixo, sem ler
+#     a coleção inteira (query_radius_firestore)
+#   - SpatialIndex: índice em grade, em memória, para os N mais próximos e buscas
+#     por raio / retângulo, filtradas por status e tipo
+#
+# A grade não trata a volta da longitude em ±180° (a frota opera no Brasil).
+
+import numpy as np
+import pandas as pd
+
+RAIO_TERRA_KM = 6371.0
+KM_POR_GRAU = 111.32
+_BASE32 = np.frombuffer(b'0123456789bcdefghjkmnpqrstuvwxyz', dtype='uint8')
+
+# Cidades atendidas (as mesmas do gerador de dados)
+CIDADES = {
+    'São Paulo': (-23.5505, -46.6333),
+    'Rio de Janeiro': (-22.9068, -43.1729),
+    'Belo Horizonte': (-19.9167, -43.9345),
+    'Curitiba': (-25.4284, -49.2733),
+    'Porto Alegre': (-30.0346, -51.2177),
+    'Salvador': (-12.9714, -38.5014),
+    'Recife': (-8.0476, -34.8770),
+    'Fortaleza': (-3.7319, -38.5267),
+    'Brasília': (-15.7939, -47.8828),
+    'Goiânia': (-16.6869, -49.2648),
+}
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = (np.radians(v) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(a))
+
+
+# --- geohash ---
+
+def geohash_encode(lat, lng, precisao=9):
+    """Geohash de arrays de latitude/longitude (ou de um único ponto)."""
+    escalar = np.ndim(lat) == 0
+    lat = np.atleast_1d(np.asarray(lat, dtype='float64'))
+    lng = np.atleast_1d(np.asarray(lng, dtype='float64'))
+    bits = precisao * 5
+    bits_lng = (bits + 1) // 2
+    bits_lat = bits // 2
+
+    # Posição de cada coordenada na grade de 2^bits células
+    i_lng = np.clip(((lng + 180) / 360 * (1 << bits_lng)).astype('int64'), 0, (1 << bits_lng) - 1)
+    i_lat = np.clip(((lat + 90) / 180 * (1 << bits_lat)).astype('int64'), 0, (1 << bits_lat) - 1)
+
+    # Intercala os bits (longitude nas posições pares, a partir do bit mais significativo)
+    codigo = np.zeros(len(lat), dtype='int64')
+    for b in range(bits):
+        if b % 2 == 0:
+            bit = (i_lng >> (bits_lng - 1 - b // 2)) & 1
+        else:
+            bit = (i_lat >> (bits_lat - 1 - b // 2)) & 1
+        codigo = (codigo << 1) | bit
+
+    # Um byte ASCII por caractere; a matriz (n, precisao) vira n strings sem laço em Python
+    caracteres = np.stack([_BASE32[(codigo >> (5 * (precisao - 1 - k))) & 31] for k in range(precisao)], axis=1)
+    resultado = np.ascontiguousarray(caracteres).view(f'S{precisao}').ravel().astype(str)
+    return str(resultado[0]) if escalar else resultado
+
+
+def geohash_precision(dlat, dlng):
+    """Maior precisão cuja célula (em graus) ainda é maior que a distância pedida nos dois eixos."""
+    for precisao in range(12, 0, -1):
+        bits = precisao * 5
+        if 180 / (1 << bits // 2) >= dlat and 360 / (1 << (bits + 1) // 2) >= dlng:
+            return precisao
+    return 1
+
+
+def geohash_cells(lat, lng, raio_km):
+    """Prefixos geohash que cobrem o círculo (célula do centro e vizinhas)."""
+    dlat = raio_km / KM_POR_GRAU
+    dlng = min(180.0, raio_km / (KM_POR_GRAU * max(np.cos(np.radians(lat)), 0.01)))
+    precisao = geohash_precision(dlat, dlng)
+    lats = np.array([lat - dlat, lat, lat + dlat]).repeat(3)
+    lngs = np.tile([lng - dlng, lng, lng + dlng], 3)
+    return sorted(set(geohash_encode(np.clip(lats, -90, 90), np.clip(lngs, -180, 180), precisao).tolist()))
+
+
+def query_radius_firestore(db, lat, lng, raio_km, status=None, tipo=None):
+    """Veículos de veiculos_status dentro do raio, lendo só as células geohash da região."""
+    colecao = db.collection('veiculos_status')
+    encontrados = {}
+    for prefixo in geohash_cells(lat, lng, raio_km):
+        consulta = colecao.where('geohash', '>=', prefixo).where('geohash', '<', prefixo + '~')
+        for doc in consulta.stream():
+            encontrados[doc.id] = doc.to_dict()
+
+    df = pd.DataFrame(list(encontrados.values()))
+    if df.empty:
+        return df
+    df['distancia_km'] = haversine_km(lat, lng, df['latitude'].to_numpy(), df['longitude'].to_numpy())
+    filtro = df['distancia_km'] <= raio_km
+    if status is not None:
+        filtro &= df['status'].isin(np.atleast_1d(status))
+    if tipo is not None:
+        filtro &= df['tipo'].isin(np.atleast_1d(tipo))
+    return df[filtro].sort_values('distancia_km').reset_index(drop=True)
+
+
+# --- índice em memória ---
+
+class SpatialIndex:
+    """Índice em grade sobre um DataFrame com latitude/longitude (+ status, tipo...).
+
+    Os pontos são ordenados pela chave da célula; cada linha de células de uma
+    consulta vira um intervalo contíguo (searchsorted), e só esses candidatos
+    têm a distância calculada.
+    """
+
+    def __init__(self, df, celula_graus=0.25, lat='latitude', lng='longitude'):
+        self.celula = celula_graus
+        self.colunas = int(np.ceil(360 / celula_graus))
+        chaves = self._chave(df[lat].to_numpy(), df[lng].to_numpy())
+        ordem = np.argsort(chaves, kind='stable')
+        self.df = df.iloc[ordem].reset_index(drop=True)
+        self.chaves = chaves[ordem]
+        self.lat = self.df[lat].to_numpy(dtype='float64')
+        self.lng = self.df[lng].to_numpy(dtype='float64')
+
+    def _linha_coluna(self, lat, lng):
+        linha = np.floor((np.asarray(lat) + 90) / self.celula).astype('int64')
+        coluna = np.floor((np.asarray(lng) + 180) / self.celula).astype('int64')
+        return linha, np.clip(coluna, 0, self.colunas - 1)
+
+    def _chave(self, lat, lng):
+        linha, coluna = self._linha_coluna(lat, lng)
+        return linha * self.colunas + coluna
+
+    def _candidatos(self, lat_min, lat_max, lng_min, lng_max):
+        l0, c0 = self._linha_coluna(lat_min, lng_min)
+        l1, c1 = self._linha_coluna(lat_max, lng_max)
+        linhas = np.arange(l0, l1 + 1)
+        inicios = np.searchsorted(self.chaves, linhas * self.colunas + c0, side='left')
+        fins = np.searchsorted(self.chaves, linhas * self.colunas + c1, side='right')
+        if not len(linhas):
+            return np.array([], dtype='int64')
+        return np.concatenate([np.arange(i, f) for i, f in zip(inicios, fins)])
+
+    def _filtrar(self, indices, status, tipo):
+        for coluna, valores in (('status', status), ('tipo', tipo)):
+            if valores is not None:
+                indices = indices[np.isin(self.df[coluna].to_numpy()[indices], np.atleast_1d(valores))]
+        return indices
+
+    def within_bbox(self, lat_min, lat_max, lng_min, lng_max, status=None, tipo=None):
+        indices = self._candidatos(lat_min, lat_max, lng_min, lng_max)
+        dentro = ((self.lat[indices] >= lat_min) & (self.lat[indices] <= lat_max)
+                  & (self.lng[indices] >= lng_min) & (self.lng[indices] <= lng_max))
+        indices = self._filtrar(indices[dentro], status, tipo)
+        return self.df.iloc[indices].reset_index(drop=True)
+
+    def within_radius(self, lat, lng, raio_km, status=None, tipo=None):
+        dlat = raio_km / KM_POR_GRAU
+        dlng = min(180.0, raio_km / (KM_POR_GRAU * max(np.cos(np.radians(lat)), 0.01)))
+        indices = self._candidatos(max(-90.0, lat - dlat), min(90.0, lat + dlat),
+                                   max(-180.0, lng - dlng), min(180.0, lng + dlng))
+        indices = self._filtrar(indices, status, tipo)
+        distancias = haversine_km(lat, lng, self.lat[indices], self.lng[indices])
+        dentro = distancias <= raio_km
+        ordem = np.argsort(distancias[dentro], kind='stable')
+        resultado = self.df.iloc[indices[dentro][ordem]].reset_index(drop=True)
+        return resultado.assign(distancia_km=distancias[dentro][ordem])
+
+    def nearest(self, lat, lng, n=5, status=None, tipo=None):
+        """Os n mais próximos: busca por raio, dobrando o raio até achar n pontos."""
+        raio = self.celula * KM_POR_GRAU
+        while True:
+            resultado = self.within_radius(lat, lng, raio, status, tipo)
+            if len(resultado) >= n or raio >= np.pi * RAIO_TERRA_KM:
+                return resultado.head(n)
+            raio *= 2
+
+
+def brute_force_radius(df, lat, lng, raio_km, status=None, tipo=None):
+    """Varredura completa (referência para o benchmark)."""
+    distancias = haversine_km(lat, lng, df['latitude'].to_numpy(), df['longitude'].to_numpy())
+    filtro = distancias <= raio_km
+    if status is not None:
+        filtro &= df['status'].isin(np.atleast_1d(status)).to_numpy()
+    if tipo is not None:
+        filtro &= df['tipo'].isin(np.atleast_1d(tipo)).to_numpy()
+    resultado = df[filtro].assign(distancia_km=distancias[filtro])
+    return resultado.sort_values('distancia_km', kind='stable').reset_index(drop=True)
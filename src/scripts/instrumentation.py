@@ -0,0 +1,513 @@
+# Instrumentação das chamadas aos bancos: spans, métricas e perfil
+#
+# Com INSTRUMENTACAO=1, os clientes de db.py passam a medir cada chamada:
+#   - PostgreSQL: cur.execute / executemany / copy_expert (InstrumentedCursor)
+#   - BigQuery:   client.query (+ result/to_dataframe), insert_rows_json, load jobs
+#                 (bytes processados/faturados e cache hit de cada consulta)
+#   - Firestore:  .set / .update / .delete / .get / .stream, commits de WriteBatch
+#                 (leituras e escritas, como na cobrança do Firestore)
+# Cada chamada vira um span (tempo, linhas, bytes, erro; spans aninhados guardam
+# o pai) e alimenta as métricas: histograma de latência por backend/operação e
+# contadores (linhas, bytes, erros, retries, bytes faturados, leituras/escritas).
+#
+# Saídas (.env):
+#   INSTRUMENTACAO_SPANS=spans.jsonl          um span por linha, gravado na hora
+#   INSTRUMENTACAO_PROMETHEUS=metricas.prom   métricas no formato texto do Prometheus (no fim do processo,
+#                                             ex.: para o textfile collector do node_exporter)
+#   INSTRUMENTACAO_RESUMO=1                   tabela por backend/operação impressa no fim do processo
+#
+# Perfil das transformações em Python (montagem de documentos, geração de dados...):
+#   with profile('montagem_documentos'): ...
+# não faz nada por padrão; com INSTRUMENTACAO_PERFIL=cprofile (ou pyinstrument, se
+# instalado) grava o perfil em INSTRUMENTACAO_PERFIL_DIR (padrão: profiles/).
+#
+# Uso direto (ex.: em trechos que não passam por db.py):
+#   with span('postgres', 'COPY', tabela='viagens') as s:
+#       ...
+#       s['linhas'] = n
+#   count('retries', backend='firestore')
+
+import atexit
+import bisect
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2.extensions
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Limites dos buckets do histograma de latência, em segundos (como no Prometheus)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MAX_SPANS = 10_000
+PREFIXO_METRICAS = 'frota'
+
+_lock = threading.Lock()
+_local = threading.local()
+_ids = itertools.count(1)
+_spans = deque(maxlen=MAX_SPANS)
+_histogramas = {}  # (backend, operacao) -> {'buckets': [...], 'soma': s, 'n': n, 'max': s}
+_contadores = {}   # (nome, (('label', valor), ...)) -> total
+
+
+def enabled():
+    return os.getenv('INSTRUMENTACAO', '').lower() not in ('', '0', 'false', 'nao', 'não')
+
+
+# --- spans e métricas ---
+
+def count(nome, valor=1, **labels):
+    chave = (nome, tuple(sorted(labels.items())))
+    with _lock:
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+
+
+def _observar(backend, operacao, segundos):
+    with _lock:
+        h = _histogramas.get((backend, operacao))
+        if h is None:
+            h = _histogramas[(backend, operacao)] = {'buckets': [0] * len(BUCKETS), 'soma': 0.0, 'n': 0, 'max': 0.0}
+        i = bisect.bisect_left(BUCKETS, segundos)
+        if i < len(BUCKETS):
+            h['buckets'][i] += 1
+        h['soma'] += segundos
+        h['n'] += 1
+        h['max'] = max(h['max'], segundos)
+
+
+def _gravar_span(registro):
+    caminho = os.getenv('INSTRUMENTACAO_SPANS')
+    with _lock:
+        _spans.append(registro)
+        if caminho:
+            with open(caminho, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+
+
+@contextmanager
+def span(backend, operacao, **atributos):
+    """Mede um trecho. O dict devolvido recebe atributos durante a execução
+    (linhas, bytes, ...); 'linhas' e 'bytes' também viram contadores."""
+    pilha = getattr(_local, 'pilha', None)
+    if pilha is None:
+        pilha = _local.pilha = []
+    pai = pilha[-1] if pilha else None
+    atual = {'span': next(_ids)}
+    atual['trace'] = pai['trace'] if pai else atual['span']
+    pilha.append(atual)
+
+    inicio_epoch = time.time()
+    inicio = time.perf_counter()
+    erro = None
+    try:
+        yield atributos
+    except BaseException as e:
+        erro = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        segundos = time.perf_counter() - inicio
+        # remove em vez de pop: um gerador abandonado (stream) pode fechar o span fora de ordem
+        pilha.remove(atual)
+        _observar(backend, operacao, segundos)
+        if erro is not None:
+            count('erros', backend=backend, operacao=operacao)
+        for metrica in ('linhas', 'bytes'):
+            if atributos.get(metrica):
+                count(metrica, atributos[metrica], backend=backend, operacao=operacao)
+        _gravar_span({
+            'trace': atual['trace'],
+            'span': atual['span'],
+            'pai': pai['span'] if pai else None,
+            'backend': backend,
+            'operacao': operacao,
+            'inicio': inicio_epoch,
+            'duracao_ms': segundos * 1000,
+            'erro': erro,
+            'thread': threading.current_thread().name,
+            **atributos,
+        })
+
+
+def spans():
+    with _lock:
+        return list(_spans)
+
+
+def snapshot():
+    """Cópia das métricas: {'histogramas': {...}, 'contadores': {...}}."""
+    with _lock:
+        return {
+            'histogramas': {chave: {**h, 'buckets': list(h['buckets'])} for chave, h in _histogramas.items()},
+            'contadores': dict(_contadores),
+        }
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _histogramas.clear()
+        _contadores.clear()
+
+
+# --- exportação ---
+
+def _labels(pares):
+    if not pares:
+        return ''
+    texto = ','.join(f'{nome}="{str(valor)}"'.replace('\n', ' ') for nome, valor in pares)
+    return '{' + texto + '}'
+
+
+def prometheus_text():
+    """Métricas no formato texto do Prometheus (0.0.4)."""
+    dados = snapshot()
+    nome = f'{PREFIXO_METRICAS}_backend_latencia_segundos'
+    linhas = [f'# HELP {nome} Latência das chamadas aos bancos', f'# TYPE {nome} histogram']
+    for (backend, operacao), h in sorted(dados['histogramas'].items()):
+        base = (('backend', backend), ('operacao', operacao))
+        acumulado = 0
+        for limite, n in zip(BUCKETS, h['buckets']):
+            acumulado += n
+            linhas.append(f'{nome}_bucket{_labels(base + (("le", repr(limite)),))} {acumulado}')
+        linhas.append(f'{nome}_bucket{_labels(base + (("le", "+Inf"),))} {h["n"]}')
+        linhas.append(f'{nome}_sum{_labels(base)} {h["soma"]}')
+        linhas.append(f'{nome}_count{_labels(base)} {h["n"]}')
+
+    por_nome = {}
+    for (metrica, pares), valor in dados['contadores'].items():
+        por_nome.setdefault(metrica, []).append((pares, valor))
+    for metrica, series in sorted(por_nome.items()):
+        nome = f'{PREFIXO_METRICAS}_{metrica}_total'
+        linhas.append(f'# TYPE {nome} counter')
+        for pares, valor in sorted(series):
+            linhas.append(f'{nome}{_labels(pares)} {valor}')
+    return '\n'.join(linhas) + '\n'
+
+
+def export_prometheus(caminho):
+    # Grava num temporário e renomeia: quem lê (node_exporter) nunca vê o arquivo pela metade
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(prometheus_text())
+    os.replace(temporario, caminho)
+
+
+def print_summary():
+    dados = snapshot()
+    if not dados['histogramas']:
+        return
+    linhas = {}
+    for (metrica, pares), valor in dados['contadores'].items():
+        rotulos = dict(pares)
+        if metrica == 'linhas':
+            linhas[(rotulos.get('backend'), rotulos.get('operacao'))] = valor
+    print("\n📈 Chamadas aos bancos")
+    print(f"  {'backend':<10} {'operação':<22} {'chamadas':>9} {'total (s)':>10} {'média (ms)':>11} "
+          f"{'máx (ms)':>9} {'linhas':>12}")
+    for (backend, operacao), h in sorted(dados['histogramas'].items(), key=lambda item: -item[1]['soma']):
+        print(f"  {backend:<10} {operacao:<22} {h['n']:>9,} {h['soma']:>10.2f} {h['soma'] / h['n'] * 1000:>11.1f} "
+              f"{h['max'] * 1000:>9.1f} {linhas.get((backend, operacao), 0):>12,}")
+    extras = [(metrica, dict(pares), valor) for (metrica, pares), valor in dados['contadores'].items()
+              if metrica in ('retries', 'erros', 'bigquery_bytes_faturados', 'firestore_leituras', 'firestore_escritas')]
+    totais = {}
+    for metrica, _, valor in extras:
+        totais[metrica] = totais.get(metrica, 0) + valor
+    for metrica, valor in sorted(totais.items()):
+        print(f"  - {metrica}: {valor:,}")
+
+
+def _no_fim():
+    caminho = os.getenv('INSTRUMENTACAO_PROMETHEUS')
+    if caminho:
+        export_prometheus(caminho)
+    if os.getenv('INSTRUMENTACAO_RESUMO'):
+        print_summary()
+
+
+atexit.register(_no_fim)
+
+
+# --- perfil das transformações em Python ---
+
+@contextmanager
+def profile(nome):
+    """Perfil (cProfile ou pyinstrument) do trecho, se INSTRUMENTACAO_PERFIL estiver definido."""
+    ferramenta = os.getenv('INSTRUMENTACAO_PERFIL', '').lower()
+    if not ferramenta:
+        yield
+        return
+    diretorio = os.getenv('INSTRUMENTACAO_PERFIL_DIR', 'profiles')
+    os.makedirs(diretorio, exist_ok=True)
+
+    if ferramenta == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("⚠️  pyinstrument não instalado (pip install pyinstrument): perfil ignorado")
+            yield
+            return
+        perfil = Profiler()
+        perfil.start()
+        try:
+            yield
+        finally:
+            perfil.stop()
+            caminho = os.path.join(diretorio, f'{nome}.html')
+            with open(caminho, 'w', encoding='utf-8') as f:
+                f.write(perfil.output_html())
+            print(f"🔬 Perfil de {nome} salvo em {caminho}")
+        return
+
+    import cProfile
+    import pstats
+
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+        caminho = os.path.join(diretorio, f'{nome}.prof')
+        perfil.dump_stats(caminho)
+        print(f"🔬 Perfil de {nome} salvo em {caminho} (snakeviz {caminho}); funções mais caras:")
+        pstats.Stats(perfil).sort_stats('cumulative').print_stats(10)
+
+
+# --- PostgreSQL ---
+
+def _operacao_sql(consulta, cursor):
+    if hasattr(consulta, 'as_string'):
+        consulta = consulta.as_string(cursor)
+    if isinstance(consulta, bytes):
+        consulta = consulta.decode('utf-8', 'replace')
+    palavras = str(consulta).split(None, 1)
+    return palavras[0].upper() if palavras else '?'
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Cursor do psycopg2 com um span por execute/executemany/copy_expert (cursor_factory)."""
+
+    def execute(self, query, vars=None):
+        with span('postgres', _operacao_sql(query, self)) as s:
+            resultado = super().execute(query, vars)
+            if self.rowcount >= 0:
+                s['linhas'] = self.rowcount
+            return resultado
+
+    def executemany(self, query, vars_list):
+        with span('postgres', _operacao_sql(query, self) + ' (executemany)') as s:
+            resultado = super().executemany(query, vars_list)
+            if self.rowcount >= 0:
+                s['linhas'] = self.rowcount
+            return resultado
+
+    def copy_expert(self, sql, file, size=8192):
+        with span('postgres', 'COPY') as s:
+            inicio = file.tell() if hasattr(file, 'tell') else None
+            resultado = super().copy_expert(sql, file, size)
+            if self.rowcount >= 0:
+                s['linhas'] = self.rowcount
+            if inicio is not None:
+                s['bytes'] = file.tell() - inicio
+            return resultado
+
+
+# --- BigQuery ---
+
+class _Proxy:
+    """Repassa tudo ao objeto original; as subclasses instrumentam alguns métodos."""
+
+    def __init__(self, alvo):
+        object.__setattr__(self, '_alvo', alvo)
+
+    def __getattr__(self, nome):
+        return getattr(self._alvo, nome)
+
+    def __setattr__(self, nome, valor):
+        setattr(self._alvo, nome, valor)
+
+    def __iter__(self):
+        return iter(self._alvo)
+
+    def __repr__(self):
+        return f'<instrumentado {self._alvo!r}>'
+
+
+def _original(objeto):
+    return objeto._alvo if isinstance(objeto, _Proxy) else objeto
+
+
+def _registrar_job(job, s):
+    """Estatísticas do job concluído (atributos ausentes no substituto local ficam de fora)."""
+    for atributo, chave in (('total_bytes_processed', 'bytes'), ('total_bytes_billed', 'bytes_faturados'),
+                            ('cache_hit', 'cache_hit'), ('output_rows', 'linhas'), ('job_id', 'job_id')):
+        valor = getattr(job, atributo, None)
+        if valor is not None:
+            s.setdefault(chave, valor)
+    if s.get('bytes_faturados'):
+        count('bigquery_bytes_faturados', s['bytes_faturados'])
+
+
+class _InstrumentedJob(_Proxy):
+    def __init__(self, alvo, operacao):
+        super().__init__(alvo)
+        object.__setattr__(self, '_operacao', operacao)
+
+    def result(self, *args, **kwargs):
+        with span('bigquery', f'{self._operacao}.result') as s:
+            resultado = self._alvo.result(*args, **kwargs)
+            linhas = getattr(resultado, 'total_rows', None)
+            if linhas is None and isinstance(resultado, list):
+                linhas = len(resultado)
+            if linhas is not None:
+                s['linhas'] = linhas
+            _registrar_job(self._alvo, s)
+            return resultado
+
+    def to_dataframe(self, *args, **kwargs):
+        with span('bigquery', f'{self._operacao}.to_dataframe') as s:
+            df = self._alvo.to_dataframe(*args, **kwargs)
+            s['linhas'] = len(df)
+            _registrar_job(self._alvo, s)
+            return df
+
+
+class InstrumentedBigQuery(_Proxy):
+    """bigquery.Client (ou bq_local.DuckDBClient) com spans nas consultas e cargas."""
+
+    def query(self, query, *args, **kwargs):
+        with span('bigquery', 'query'):
+            job = self._alvo.query(query, *args, **kwargs)
+        return _InstrumentedJob(job, 'query')
+
+    def insert_rows_json(self, table, json_rows, *args, **kwargs):
+        with span('bigquery', 'insert_rows_json', linhas=len(json_rows)) as s:
+            erros = self._alvo.insert_rows_json(table, json_rows, *args, **kwargs)
+            if erros:
+                s['linhas_com_erro'] = len(erros)
+            return erros
+
+    def _load(self, metodo, *args, **kwargs):
+        with span('bigquery', metodo):
+            job = getattr(self._alvo, metodo)(*args, **kwargs)
+        return _InstrumentedJob(job, metodo)
+
+    def load_table_from_dataframe(self, *args, **kwargs):
+        return self._load('load_table_from_dataframe', *args, **kwargs)
+
+    def load_table_from_file(self, *args, **kwargs):
+        return self._load('load_table_from_file', *args, **kwargs)
+
+    def load_table_from_json(self, *args, **kwargs):
+        return self._load('load_table_from_json', *args, **kwargs)
+
+    def load_table_from_uri(self, *args, **kwargs):
+        return self._load('load_table_from_uri', *args, **kwargs)
+
+
+# --- Firestore ---
+
+# Métodos que devolvem outra referência/consulta (instrumentada também)
+_ENCADEADOS = {'collection', 'document', 'where', 'order_by', 'limit', 'limit_to_last', 'offset',
+               'select', 'start_at', 'start_after', 'end_at', 'end_before', 'collection_group'}
+
+
+def _caminho(ref):
+    return getattr(ref, 'path', None) or getattr(ref, 'id', None) or getattr(getattr(ref, '_parent', None), 'id', None)
+
+
+class _InstrumentedFirestoreRef(_Proxy):
+    """DocumentReference / CollectionReference / Query: leituras e escritas contadas."""
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._alvo, nome)
+        if nome in _ENCADEADOS:
+            return lambda *args, **kwargs: _InstrumentedFirestoreRef(atributo(*args, **kwargs))
+        return atributo
+
+    def _escrita(self, metodo, *args, **kwargs):
+        with span('firestore', metodo, documento=_caminho(self._alvo)):
+            resultado = getattr(self._alvo, metodo)(*args, **kwargs)
+        count('firestore_escritas')
+        return resultado
+
+    def set(self, *args, **kwargs):
+        return self._escrita('set', *args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        return self._escrita('update', *args, **kwargs)
+
+    def create(self, *args, **kwargs):
+        return self._escrita('create', *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._escrita('delete', *args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        with span('firestore', 'get', colecao=_caminho(self._alvo)) as s:
+            resultado = self._alvo.get(*args, **kwargs)
+            s['linhas'] = len(resultado) if isinstance(resultado, list) else 1
+        count('firestore_leituras', s['linhas'])
+        return resultado
+
+    def stream(self, *args, **kwargs):
+        # O tempo inclui o consumo do gerador (é quando os documentos chegam)
+        with span('firestore', 'stream', colecao=_caminho(self._alvo)) as s:
+            lidos = 0
+            try:
+                for doc in self._alvo.stream(*args, **kwargs):
+                    lidos += 1
+                    yield doc
+            finally:
+                s['linhas'] = lidos
+                count('firestore_leituras', lidos)
+
+    def list_documents(self, *args, **kwargs):
+        with span('firestore', 'list_documents', colecao=_caminho(self._alvo)) as s:
+            lidos = 0
+            try:
+                for ref in self._alvo.list_documents(*args, **kwargs):
+                    lidos += 1
+                    yield ref
+            finally:
+                s['linhas'] = lidos
+
+
+class _InstrumentedBatch(_Proxy):
+    def __init__(self, alvo):
+        super().__init__(alvo)
+        object.__setattr__(self, '_operacoes', 0)
+
+    def _operacao(self, metodo, ref, *args, **kwargs):
+        object.__setattr__(self, '_operacoes', self._operacoes + 1)
+        return getattr(self._alvo, metodo)(_original(ref), *args, **kwargs)
+
+    def set(self, ref, *args, **kwargs):
+        return self._operacao('set', ref, *args, **kwargs)
+
+    def update(self, ref, *args, **kwargs):
+        return self._operacao('update', ref, *args, **kwargs)
+
+    def create(self, ref, *args, **kwargs):
+        return self._operacao('create', ref, *args, **kwargs)
+
+    def delete(self, ref, *args, **kwargs):
+        return self._operacao('delete', ref, *args, **kwargs)
+
+    def commit(self, *args, **kwargs):
+        with span('firestore', 'batch.commit', linhas=self._operacoes):
+            resultado = self._alvo.commit(*args, **kwargs)
+        count('firestore_escritas', self._operacoes)
+        return resultado
+
+
+class InstrumentedFirestore(_InstrumentedFirestoreRef):
+    """firestore.Client com spans e contagem de leituras/escritas."""
+
+    def batch(self):
+        return _InstrumentedBatch(self._alvo.batch())
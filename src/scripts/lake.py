@@ -0,0 +1,217 @@
+# Data lake em Parquet: formato de troca entre o gerador e as cargas
+#
+# O 01_generate_data.py grava cada tabela em data/lake/<tabela>/, já com os tipos
+# do DDL (pg_schema.py / bq_schema.py); os setups 02, 03 e 04 leem daqui em vez
+# de reinterpretar os CSVs a cada execução. viagens e eventos são particionadas
+# por mês (data/lake/viagens/mes=2025-06/part-*.parquet), então um filtro de
+# período só abre os arquivos dos meses pedidos.
+#
+# Tipos: INTEGER -> int32, DECIMAL -> float64 (como o FLOAT do BigQuery),
+# TIMESTAMP -> timestamp[s] sem fuso (como no PostgreSQL), BOOLEAN -> bool.
+#
+# Leitura:
+#   read('viagens', colunas=['veiculo_id', 'km_percorridos'], filtro=period_filter('viagens', '2025-05-01'))
+#   for df in batches('viagens', linhas=100_000): ...    # memória limitada a um lote
+#
+# Para converter CSVs já existentes em data/:
+#   python src/scripts/lake.py
+
+import hashlib
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+LAKE_DIR = os.getenv('LAKE_DIR', os.path.join('data', 'lake'))
+CHUNK_ROWS = 500_000
+COLUNA_MES = 'mes'
+
+ESQUEMAS = {
+    'veiculos': pa.schema([
+        pa.field('id', pa.int32(), nullable=False),
+        pa.field('placa', pa.string(), nullable=False),
+        ('modelo', pa.string()),
+        ('tipo', pa.string()),
+        ('ano', pa.int32()),
+        ('km_atual', pa.int32()),
+        ('capacidade_carga', pa.int32()),
+        ('consumo_medio', pa.float64()),
+        ('status', pa.string()),
+    ]),
+    'motoristas': pa.schema([
+        pa.field('id', pa.int32(), nullable=False),
+        pa.field('nome', pa.string(), nullable=False),
+        ('salario', pa.float64()),
+    ]),
+    'viagens': pa.schema([
+        pa.field('id', pa.int32(), nullable=False),
+        ('veiculo_id', pa.int32()),
+        ('motorista_id', pa.int32()),
+        ('data_saida', pa.timestamp('s')),
+        ('data_chegada', pa.timestamp('s')),
+        ('origem', pa.string()),
+        ('destino', pa.string()),
+        ('km_percorridos', pa.int32()),
+        ('combustivel_litros', pa.float64()),
+        ('custo_combustivel', pa.float64()),
+        ('carga_kg', pa.int32()),
+    ]),
+    'eventos': pa.schema([
+        pa.field('id', pa.int32(), nullable=False),
+        ('veiculo_id', pa.int32()),
+        ('tipo', pa.string()),
+        ('data_evento', pa.timestamp('s')),
+        ('descricao', pa.string()),
+        ('prioridade', pa.string()),
+        ('resolvido', pa.bool_()),
+        ('km_veiculo', pa.int32()),
+    ]),
+}
+
+# Tabelas particionadas por mês e a coluna de data usada (mesma do pg_schema.PARTICIONAMENTO)
+PARTICOES = {
+    'viagens': 'data_saida',
+    'eventos': 'data_evento',
+}
+
+_PARTICIONAMENTO = ds.partitioning(pa.schema([(COLUNA_MES, pa.string())]), flavor='hive')
+
+
+def table_dir(tabela, diretorio=None):
+    return os.path.join(diretorio or LAKE_DIR, tabela)
+
+
+def exists(tabela, diretorio=None):
+    caminho = table_dir(tabela, diretorio)
+    return os.path.isdir(caminho) and any(True for _ in os.scandir(caminho))
+
+
+def reset(tabela, diretorio=None):
+    caminho = table_dir(tabela, diretorio)
+    shutil.rmtree(caminho, ignore_errors=True)
+    os.makedirs(caminho)
+
+
+def to_arrow(df, tabela):
+    """DataFrame -> pyarrow.Table com o esquema da tabela (falha se algum valor não couber no tipo)."""
+    esquema = ESQUEMAS[tabela]
+    return pa.Table.from_pandas(df[esquema.names], schema=esquema, preserve_index=False)
+
+
+def write_part(df, tabela, parte, diretorio=None):
+    """Grava um bloco da tabela. Blocos diferentes (parte) podem ser gravados em paralelo."""
+    tabela_arrow = to_arrow(df, tabela)
+    particao = PARTICOES.get(tabela)
+    if particao is None:
+        ds.write_dataset(tabela_arrow, table_dir(tabela, diretorio), format='parquet',
+                         basename_template=f'part-{parte:05d}-{{i}}.parquet',
+                         existing_data_behavior='overwrite_or_ignore')
+        return tabela_arrow.num_rows
+
+    # Ordenado pela data: dentro de cada mês, as estatísticas dos row groups
+    # também permitem pular blocos num filtro por dia
+    tabela_arrow = tabela_arrow.sort_by(particao)
+    mes = pc.strftime(tabela_arrow[particao], format='%Y-%m')
+    ds.write_dataset(tabela_arrow.append_column(COLUNA_MES, mes), table_dir(tabela, diretorio), format='parquet',
+                     partitioning=_PARTICIONAMENTO, basename_template=f'part-{parte:05d}-{{i}}.parquet',
+                     existing_data_behavior='overwrite_or_ignore')
+    return tabela_arrow.num_rows
+
+
+def dataset(tabela, diretorio=None):
+    esquema = ESQUEMAS[tabela]
+    if tabela in PARTICOES:
+        esquema = esquema.append(pa.field(COLUNA_MES, pa.string()))
+        return ds.dataset(table_dir(tabela, diretorio), format='parquet', schema=esquema,
+                          partitioning=_PARTICIONAMENTO)
+    return ds.dataset(table_dir(tabela, diretorio), format='parquet', schema=esquema)
+
+
+def period_filter(tabela, inicio=None, fim=None):
+    """Filtro [inicio, fim) sobre a coluna de data da tabela. Também filtra a
+    coluna de partição, para que só os arquivos dos meses do período sejam abertos."""
+    coluna = PARTICOES[tabela]
+    partes = []
+    if inicio is not None:
+        inicio = pd.Timestamp(inicio)
+        partes += [ds.field(COLUNA_MES) >= inicio.strftime('%Y-%m'),
+                   ds.field(coluna) >= pa.scalar(inicio.to_pydatetime(), pa.timestamp('s'))]
+    if fim is not None:
+        fim = pd.Timestamp(fim)
+        partes += [ds.field(COLUNA_MES) <= fim.strftime('%Y-%m'),
+                   ds.field(coluna) < pa.scalar(fim.to_pydatetime(), pa.timestamp('s'))]
+    filtro = None
+    for parte in partes:
+        filtro = parte if filtro is None else filtro & parte
+    return filtro
+
+
+# Inteiros e booleanos como tipos "nullable" do pandas: uma coluna com nulos
+# continua inteira (sem virar float64), e o COPY do PostgreSQL não recebe "123.0"
+_TIPOS_PANDAS = {pa.int32(): pd.Int32Dtype(), pa.bool_(): pd.BooleanDtype()}.get
+
+
+def _colunas(tabela, colunas):
+    # Sem projeção explícita, a coluna de partição (mes) não é devolvida
+    return list(colunas) if colunas is not None else ESQUEMAS[tabela].names
+
+
+def read(tabela, colunas=None, filtro=None, diretorio=None):
+    """Lê a tabela inteira (só as colunas e linhas pedidas) como DataFrame."""
+    tabela_arrow = dataset(tabela, diretorio).to_table(columns=_colunas(tabela, colunas), filter=filtro)
+    return tabela_arrow.to_pandas(types_mapper=_TIPOS_PANDAS)
+
+
+def batches(tabela, colunas=None, filtro=None, linhas=CHUNK_ROWS, diretorio=None):
+    """Lê a tabela em DataFrames de até ~`linhas` linhas (memória limitada a um lote).
+
+    Os lotes do scanner (um por row group) são juntados até `linhas`: cada
+    bloco vira uma carga (COPY, load job), e blocos pequenos demais custam caro.
+    """
+    scanner = dataset(tabela, diretorio).scanner(columns=_colunas(tabela, colunas), filter=filtro, batch_size=linhas)
+    pendentes, acumuladas = [], 0
+    for lote in scanner.to_batches():
+        if acumuladas and acumuladas + lote.num_rows > linhas:
+            yield pa.Table.from_batches(pendentes).to_pandas(types_mapper=_TIPOS_PANDAS)
+            pendentes, acumuladas = [], 0
+        if lote.num_rows:
+            pendentes.append(lote)
+            acumuladas += lote.num_rows
+    if acumuladas:
+        yield pa.Table.from_batches(pendentes).to_pandas(types_mapper=_TIPOS_PANDAS)
+
+
+def count(tabela, filtro=None, diretorio=None):
+    return dataset(tabela, diretorio).count_rows(filter=filtro)
+
+
+def fingerprint(tabela, diretorio=None):
+    """Assinatura dos arquivos da tabela (nomes, tamanhos e datas): muda quando o lake é regravado."""
+    raiz = table_dir(tabela, diretorio)
+    arquivos = []
+    for pasta, _, nomes in os.walk(raiz):
+        for nome in nomes:
+            info = os.stat(os.path.join(pasta, nome))
+            arquivos.append(f"{os.path.relpath(os.path.join(pasta, nome), raiz)}:{info.st_size}:{info.st_mtime_ns}")
+    return hashlib.md5('\n'.join(sorted(arquivos)).encode()).hexdigest()
+
+
+def from_csv(tabela, caminho_csv, diretorio=None, linhas=CHUNK_ROWS):
+    """Converte um CSV (formato antigo de data/) para o lake, em blocos."""
+    reset(tabela, diretorio)
+    datas = [campo.name for campo in ESQUEMAS[tabela] if pa.types.is_timestamp(campo.type)]
+    total = 0
+    for parte, chunk in enumerate(pd.read_csv(caminho_csv, chunksize=linhas, parse_dates=datas)):
+        # CSVs antigos podem não ter colunas acrescentadas depois (ex.: km_veiculo): ficam nulas
+        total += write_part(chunk.reindex(columns=ESQUEMAS[tabela].names), tabela, parte, diretorio)
+    return total
+
+
+if __name__ == '__main__':
+    for tabela in ESQUEMAS:
+        caminho = os.path.join('data', f'{tabela}.csv')
+        if os.path.exists(caminho):
+            print(f"📦 {tabela}: {from_csv(tabela, caminho):,} linhas -> {table_dir(tabela)}")
@@ -0,0 +1,189 @@
+# Carga no PostgreSQL, a partir do data lake (lake.py) ou de CSVs
+#
+# Quatro métodos disponíveis:
+#   - 'copy':  COPY FROM STDIN em blocos (mais rápido, padrão)
+#   - 'batch': execute_values em lotes (fallback quando COPY não é permitido)
+#   - 'row':   um INSERT por linha (comportamento original, mantido para comparação)
+#   - 'upsert': COPY numa tabela temporária + INSERT ... ON CONFLICT pela chave primária
+#              (idempotente: recarregar um bloco não duplica linhas; usado por 12_run_pipeline.py)
+#
+# Com checkpoint (checkpoint.Checkpoint), cada bloco é confirmado (commit) e
+# registrado; numa nova execução, os blocos já registrados são pulados.
+
+import io
+import time
+from datetime import date
+
+import pandas as pd
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+import lake
+from pg_partitions import ensure_partitions, partition_name
+
+METODOS = ('copy', 'batch', 'row', 'upsert')
+CHUNK_ROWS = 100_000
+PAGE_SIZE = 5_000
+
+
+def _rows(chunk):
+    # astype(object) converte numpy -> tipos Python (psycopg2 não adapta np.int64)
+    chunk = chunk.astype(object).where(chunk.notna(), None)
+    return chunk.itertuples(index=False, name=None)
+
+
+def copy_chunk(cur, tabela, chunk):
+    buf = io.StringIO()
+    chunk.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    comando = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+        sql.Identifier(tabela),
+        sql.SQL(', ').join(map(sql.Identifier, chunk.columns)),
+    )
+    cur.copy_expert(comando.as_string(cur), buf)
+
+
+def insert_batch(cur, tabela, chunk, page_size=PAGE_SIZE):
+    comando = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+        sql.Identifier(tabela),
+        sql.SQL(', ').join(map(sql.Identifier, chunk.columns)),
+    )
+    execute_values(cur, comando.as_string(cur), _rows(chunk), page_size=page_size)
+
+
+def insert_rows(cur, tabela, chunk):
+    comando = sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
+        sql.Identifier(tabela),
+        sql.SQL(', ').join(map(sql.Identifier, chunk.columns)),
+        sql.SQL(', ').join(sql.Placeholder() * len(chunk.columns)),
+    )
+    for row in _rows(chunk):
+        cur.execute(comando, row)
+
+
+_CHAVES = {}
+
+
+def primary_key(cur, tabela):
+    """Colunas da chave primária (nas partições, a herdada da tabela pai)."""
+    if tabela not in _CHAVES:
+        cur.execute("""
+            SELECT a.attname
+            FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = %s::regclass AND i.indisprimary
+            ORDER BY array_position(i.indkey, a.attnum)
+        """, [tabela])
+        _CHAVES[tabela] = [linha[0] for linha in cur.fetchall()]
+    return _CHAVES[tabela]
+
+
+def upsert_chunk(cur, tabela, chunk):
+    """COPY numa tabela temporária e INSERT ... ON CONFLICT na tabela final.
+    Linhas iguais às existentes não são reescritas (nem disparam o trigger de atualizado_em)."""
+    chave = primary_key(cur, tabela)
+    temporaria = f'_carga_{tabela}'
+    colunas = list(chunk.columns)
+    cur.execute(sql.SQL("CREATE TEMP TABLE IF NOT EXISTS {} (LIKE {} INCLUDING DEFAULTS)").format(
+        sql.Identifier(temporaria), sql.Identifier(tabela)))
+    cur.execute(sql.SQL("TRUNCATE {}").format(sql.Identifier(temporaria)))
+    copy_chunk(cur, temporaria, chunk)
+
+    atualizar = [c for c in colunas if c not in chave]
+    comando = sql.SQL("INSERT INTO {tabela} AS t ({colunas}) SELECT {colunas} FROM {temporaria} "
+                      "ON CONFLICT ({chave}) ").format(
+        tabela=sql.Identifier(tabela),
+        colunas=sql.SQL(', ').join(map(sql.Identifier, colunas)),
+        temporaria=sql.Identifier(temporaria),
+        chave=sql.SQL(', ').join(map(sql.Identifier, chave)),
+    )
+    if atualizar:
+        comando += sql.SQL("DO UPDATE SET {atribuicoes} WHERE ({atuais}) IS DISTINCT FROM ({novos})").format(
+            atribuicoes=sql.SQL(', ').join(sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c)) for c in atualizar),
+            atuais=sql.SQL(', ').join(sql.SQL("t.{}").format(sql.Identifier(c)) for c in atualizar),
+            novos=sql.SQL(', ').join(sql.SQL("EXCLUDED.{}").format(sql.Identifier(c)) for c in atualizar),
+        )
+    else:
+        comando += sql.SQL("DO NOTHING")
+    cur.execute(comando)
+
+
+def load_dataframe(cur, tabela, chunk, metodo='copy'):
+    if metodo == 'copy':
+        copy_chunk(cur, tabela, chunk)
+    elif metodo == 'upsert':
+        upsert_chunk(cur, tabela, chunk)
+    elif metodo == 'batch':
+        insert_batch(cur, tabela, chunk)
+    elif metodo == 'row':
+        insert_rows(cur, tabela, chunk)
+    else:
+        raise ValueError(f"Método de carga inválido: {metodo} (use {', '.join(METODOS)})")
+
+
+def load_partitioned(cur, tabela, chunk, coluna, metodo='copy'):
+    """Divide o bloco por mês de `coluna` e grava cada parte direto na partição
+    mensal (criando-a se preciso), sem o roteamento linha a linha pela tabela pai."""
+    if pd.api.types.is_datetime64_any_dtype(chunk[coluna]):
+        meses = chunk[coluna].dt.strftime('%Y-%m')  # lake: coluna já tipada
+    else:
+        meses = chunk[coluna].str.slice(0, 7)  # CSV: 'YYYY-MM-DD HH:MM:SS' -> 'YYYY-MM'
+    # A chave da partição é NOT NULL no DDL: recusa o bloco antes de gravar qualquer parte
+    sem_data = int(meses.isna().sum())
+    if sem_data:
+        raise ValueError(f"{tabela}: {sem_data} linha(s) sem {coluna} (chave da partição, NOT NULL)")
+    for mes, grupo in chunk.groupby(meses, sort=True):
+        inicio = date.fromisoformat(f"{mes}-01")
+        ensure_partitions(cur, tabela, inicio, inicio)
+        load_dataframe(cur, partition_name(tabela, inicio), grupo, metodo)
+
+
+def load_chunks(conn, tabela, chunks, metodo='copy', particao=None, checkpoint=None):
+    """Carrega os blocos (DataFrames) e devolve as estatísticas da carga.
+
+    Com particao (nome da coluna de data), cada bloco é roteado para as partições mensais.
+    Com checkpoint, cada bloco é confirmado e registrado, e os já registrados são pulados.
+    """
+    inicio = time.perf_counter()
+    linhas = 0
+    pulados = 0
+    with conn.cursor() as cur:
+        for bloco, chunk in enumerate(chunks):
+            if checkpoint is not None and checkpoint.done(tabela, bloco):
+                pulados += 1
+                continue
+            if particao:
+                load_partitioned(cur, tabela, chunk, particao, metodo)
+            else:
+                load_dataframe(cur, tabela, chunk, metodo)
+            linhas += len(chunk)
+            if checkpoint is not None:
+                conn.commit()
+                checkpoint.mark(tabela, bloco, len(chunk))
+    segundos = time.perf_counter() - inicio
+    return {
+        'tabela': tabela,
+        'metodo': metodo,
+        'linhas': linhas,
+        'blocos_pulados': pulados,
+        'segundos': segundos,
+        'linhas_por_segundo': linhas / segundos if segundos > 0 else 0.0,
+    }
+
+
+def load_csv(conn, tabela, caminho, metodo='copy', chunk_rows=CHUNK_ROWS, particao=None):
+    # dtype=str evita inferência de tipos: o PostgreSQL converte os textos
+    chunks = pd.read_csv(caminho, chunksize=chunk_rows, dtype=str, keep_default_na=False, na_values=[''])
+    return load_chunks(conn, tabela, chunks, metodo, particao)
+
+
+def load_lake(conn, tabela, metodo='copy', chunk_rows=CHUNK_ROWS, particao=None, diretorio=None, checkpoint=None):
+    """Carrega a tabela do data lake: só as colunas do esquema, já tipadas, em lotes de chunk_rows."""
+    chunks = lake.batches(tabela, linhas=chunk_rows, diretorio=diretorio)
+    return load_chunks(conn, tabela, chunks, metodo, particao, checkpoint)
+
+
+def print_stats(stats):
+    pulados = f", {stats['blocos_pulados']} bloco(s) já carregado(s)" if stats.get('blocos_pulados') else ""
+    print(f"  - {stats['tabela']}: {stats['linhas']:,} linhas em {stats['segundos']:.2f}s "
+          f"({stats['linhas_por_segundo']:,.0f} linhas/s, método {stats['metodo']}{pulados})")
@@ -0,0 +1,134 @@
+# Gerenciamento das partições mensais de viagens/eventos (schema particionado)
+#
+#   - ensure_partitions: cria as partições mensais que cobrem um intervalo (movendo
+#     para elas as linhas do mês que estavam na partição default)
+#   - create_future_partitions: garante as partições dos próximos meses
+#   - detach_old_partitions: desanexa as partições antigas e as move para o
+#     schema de arquivo (ou apaga)
+
+from datetime import date
+
+from psycopg2 import sql
+
+from pg_schema import PARTICIONAMENTO
+
+SCHEMA_ARQUIVO = 'arquivo'
+
+
+def month_start(valor):
+    return date(valor.year, valor.month, 1)
+
+
+def add_months(mes, n):
+    total = mes.year * 12 + (mes.month - 1) + n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def partition_name(tabela, mes):
+    return f"{tabela}_{mes.year:04d}_{mes.month:02d}"
+
+
+def is_partitioned(cur, tabela):
+    cur.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.relname = %s AND n.nspname = current_schema()
+        )
+    """, (tabela,))
+    return cur.fetchone()[0]
+
+
+def _exists(cur, nome):
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (nome,))
+    return cur.fetchone()[0]
+
+
+def _create_partition(cur, tabela, nome, inicio, fim):
+    """Cria a partição [inicio, fim). O PostgreSQL recusa a partição nova enquanto a
+    default tiver linhas desse intervalo: elas são movidas para uma tabela avulsa,
+    que depois é anexada como partição (na mesma transação)."""
+    coluna = PARTICIONAMENTO[tabela]
+    default = f"{tabela}_default"
+    no_intervalo = sql.SQL("{} >= %s AND {} < %s").format(sql.Identifier(coluna), sql.Identifier(coluna))
+    na_default = False
+    if _exists(cur, default):
+        cur.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM {} WHERE {})").format(
+            sql.Identifier(default), no_intervalo), (inicio, fim))
+        na_default = cur.fetchone()[0]
+    if not na_default:
+        cur.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+            sql.Identifier(nome), sql.Identifier(tabela)), (inicio, fim))
+        return
+    cur.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)").format(
+        sql.Identifier(nome), sql.Identifier(tabela)))
+    cur.execute(sql.SQL("WITH movidas AS (DELETE FROM {} WHERE {} RETURNING *) INSERT INTO {} SELECT * FROM movidas").format(
+        sql.Identifier(default), no_intervalo, sql.Identifier(nome)), (inicio, fim))
+    cur.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s)").format(
+        sql.Identifier(tabela), sql.Identifier(nome)), (inicio, fim))
+
+
+def ensure_partitions(cur, tabela, inicio, fim):
+    """Cria (se não existirem) as partições mensais de tabela entre os meses de inicio e fim, inclusive."""
+    criadas = []
+    mes = month_start(inicio)
+    ultimo = month_start(fim)
+    while mes <= ultimo:
+        nome = partition_name(tabela, mes)
+        if not _exists(cur, nome):
+            _create_partition(cur, tabela, nome, mes, add_months(mes, 1))
+        criadas.append(nome)
+        mes = add_months(mes, 1)
+    return criadas
+
+
+def create_future_partitions(cur, meses_a_frente=3, hoje=None):
+    hoje = hoje or date.today()
+    criadas = []
+    for tabela in PARTICIONAMENTO:
+        criadas += ensure_partitions(cur, tabela, hoje, add_months(month_start(hoje), meses_a_frente))
+    return criadas
+
+
+def list_partitions(cur, tabela):
+    """Partições mensais de tabela, como [(nome, mes)], em ordem."""
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        JOIN pg_namespace n ON n.oid = p.relnamespace
+        WHERE p.relname = %s AND n.nspname = current_schema()
+    """, (tabela,))
+    particoes = []
+    for (nome,) in cur.fetchall():
+        sufixo = nome[len(tabela) + 1:]
+        try:
+            ano, mes = sufixo.split('_')
+            particoes.append((nome, date(int(ano), int(mes), 1)))
+        except ValueError:
+            continue  # partição default
+    return sorted(particoes, key=lambda p: p[1])
+
+
+def detach_old_partitions(cur, tabela, manter_meses, apagar=False, hoje=None):
+    """Desanexa as partições com mais de manter_meses meses. Arquiva no schema
+    'arquivo' (continuam consultáveis) ou apaga, se apagar=True."""
+    limite = add_months(month_start(hoje or date.today()), -manter_meses)
+    if not apagar:
+        cur.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(SCHEMA_ARQUIVO)))
+
+    removidas = []
+    for nome, mes in list_partitions(cur, tabela):
+        if mes >= limite:
+            break
+        cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+            sql.Identifier(tabela), sql.Identifier(nome)))
+        if apagar:
+            cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(nome)))
+        else:
+            cur.execute(sql.SQL("ALTER TABLE {} SET SCHEMA {}").format(
+                sql.Identifier(nome), sql.Identifier(SCHEMA_ARQUIVO)))
+        removidas.append(nome)
+    return removidas
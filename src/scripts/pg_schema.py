@@ -0,0 +1,179 @@
+# Definição das tabelas do PostgreSQL (operacional)
+# Compartilhado entre o setup (02_setup_postgres.py) e os benchmarks.
+
+import re
+
+# Ordem importa: tabelas referenciadas por FK vêm antes
+TABELAS = {
+    'veiculos': """
+        CREATE TABLE veiculos (
+            id INTEGER PRIMARY KEY,
+            placa VARCHAR(10) UNIQUE NOT NULL,
+            modelo VARCHAR(100),
+            tipo VARCHAR(50),
+            ano INTEGER,
+            km_atual INTEGER,
+            capacidade_carga INTEGER,
+            consumo_medio DECIMAL(5,2),
+            status VARCHAR(20),
+            atualizado_em TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """,
+    'motoristas': """
+        CREATE TABLE motoristas (
+            id INTEGER PRIMARY KEY,
+            nome VARCHAR(255) NOT NULL,
+            salario DECIMAL(10, 2),
+            atualizado_em TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """,
+    'viagens': """
+        CREATE TABLE viagens (
+            id INTEGER PRIMARY KEY,
+            veiculo_id INTEGER REFERENCES veiculos(id),
+            motorista_id INTEGER REFERENCES motoristas(id),
+            data_saida TIMESTAMP,
+            data_chegada TIMESTAMP,
+            origem VARCHAR(100),
+            destino VARCHAR(100),
+            km_percorridos INTEGER,
+            combustivel_litros DECIMAL(8,2),
+            custo_combustivel DECIMAL(10,2),
+            carga_kg INTEGER,
+            atualizado_em TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """,
+    'eventos': """
+        CREATE TABLE eventos (
+            id INTEGER PRIMARY KEY,
+            veiculo_id INTEGER REFERENCES veiculos(id),
+            tipo VARCHAR(100),
+            data_evento TIMESTAMP,
+            descricao TEXT,
+            prioridade VARCHAR(20),
+            resolvido BOOLEAN,
+            km_veiculo INTEGER,
+            atualizado_em TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """,
+}
+
+
+# Versão particionada (opcional) das tabelas que crescem sem limite: partições
+# mensais por intervalo de data. A chave de partição precisa fazer parte da PK.
+# As partições em si são criadas por pg_partitions.py.
+PARTICIONAMENTO = {
+    'viagens': 'data_saida',
+    'eventos': 'data_evento',
+}
+
+TABELAS_PARTICIONADAS = {
+    'viagens': """
+        CREATE TABLE viagens (
+            id INTEGER NOT NULL,
+            veiculo_id INTEGER REFERENCES veiculos(id),
+            motorista_id INTEGER REFERENCES motoristas(id),
+            data_saida TIMESTAMP NOT NULL,
+            data_chegada TIMESTAMP,
+            origem VARCHAR(100),
+            destino VARCHAR(100),
+            km_percorridos INTEGER,
+            combustivel_litros DECIMAL(8,2),
+            custo_combustivel DECIMAL(10,2),
+            carga_kg INTEGER,
+            atualizado_em TIMESTAMP NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, data_saida)
+        ) PARTITION BY RANGE (data_saida)
+    """,
+    'eventos': """
+        CREATE TABLE eventos (
+            id INTEGER NOT NULL,
+            veiculo_id INTEGER REFERENCES veiculos(id),
+            tipo VARCHAR(100),
+            data_evento TIMESTAMP NOT NULL,
+            descricao TEXT,
+            prioridade VARCHAR(20),
+            resolvido BOOLEAN,
+            km_veiculo INTEGER,
+            atualizado_em TIMESTAMP NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, data_evento)
+        ) PARTITION BY RANGE (data_evento)
+    """,
+}
+
+
+# atualizado_em é mantido por trigger e serve de marca d'água para a
+# sincronização incremental com o Data Warehouse (06_sync_incremental.py)
+FUNCAO_ATUALIZADO_EM = """
+    CREATE OR REPLACE FUNCTION set_atualizado_em() RETURNS trigger AS $$
+    BEGIN
+        NEW.atualizado_em = now();
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def dependencies():
+    """{tabela: [tabelas referenciadas por FK]}, a partir do DDL."""
+    return {tabela: sorted(set(re.findall(r'REFERENCES (\w+)', ddl)) - {tabela}) for tabela, ddl in TABELAS.items()}
+
+
+def existing_tables(cur):
+    cur.execute("SELECT tablename FROM pg_tables WHERE schemaname = current_schema()")
+    return {linha[0] for linha in cur.fetchall()}
+
+
+def create_tables(cur, drop=False, particionado=False, if_not_exists=False):
+    """Cria as tabelas. Com if_not_exists, as que já existem (de uma execução anterior) são mantidas."""
+    if drop:
+        for tabela in reversed(list(TABELAS)):
+            cur.execute(f"DROP TABLE IF EXISTS {tabela} CASCADE")
+    cur.execute(FUNCAO_ATUALIZADO_EM)
+    existentes = existing_tables(cur) if if_not_exists else set()
+    for tabela, ddl in TABELAS.items():
+        if tabela in existentes:
+            continue
+        if particionado and tabela in TABELAS_PARTICIONADAS:
+            cur.execute(TABELAS_PARTICIONADAS[tabela])
+            # Partição padrão: recebe o que não cair em nenhuma partição mensal
+            cur.execute(f"CREATE TABLE {tabela}_default PARTITION OF {tabela} DEFAULT")
+        else:
+            cur.execute(ddl)
+        cur.execute(f"""
+            CREATE TRIGGER trg_{tabela}_atualizado_em BEFORE UPDATE ON {tabela}
+            FOR EACH ROW EXECUTE FUNCTION set_atualizado_em()
+        """)
+        cur.execute(f"CREATE INDEX idx_{tabela}_atualizado_em ON {tabela} (atualizado_em)")
+
+
+# Índices de apoio às consultas operacionais (queries/consultas_demo.sql, 1-3).
+# Criados depois da carga em massa: construir o índice uma vez é bem mais
+# barato do que mantê-lo a cada linha inserida.
+MANUTENCOES = "('Manutenção Preventiva', 'Revisão Completa')"
+
+INDICES = [
+    # Junções viagens -> veiculos/motoristas; (veiculo_id, data_chegada) atende a consulta 2
+    "CREATE INDEX IF NOT EXISTS idx_viagens_veiculo_chegada ON viagens (veiculo_id, data_chegada)",
+    "CREATE INDEX IF NOT EXISTS idx_viagens_motorista ON viagens (motorista_id)",
+    # BRIN: índices minúsculos para colunas de tempo que crescem junto com a tabela
+    # (as viagens/eventos chegam em ordem cronológica). Atendem "últimos N dias" (consulta 3).
+    "CREATE INDEX IF NOT EXISTS brin_viagens_data_saida ON viagens USING brin (data_saida)",
+    "CREATE INDEX IF NOT EXISTS brin_viagens_data_chegada ON viagens USING brin (data_chegada)",
+    "CREATE INDEX IF NOT EXISTS brin_eventos_data_evento ON eventos USING brin (data_evento)",
+    # Eventos por veículo/tipo e, parcial, só as manutenções com o km (consulta 1)
+    "CREATE INDEX IF NOT EXISTS idx_eventos_veiculo_tipo ON eventos (veiculo_id, tipo)",
+    f"CREATE INDEX IF NOT EXISTS idx_eventos_manutencao ON eventos (veiculo_id, km_veiculo) "
+    f"WHERE tipo IN {MANUTENCOES}",
+    # Parcial: só os veículos em viagem (consulta 2)
+    "CREATE INDEX IF NOT EXISTS idx_veiculos_em_viagem ON veiculos (id) WHERE status = 'Em viagem'",
+    "CREATE INDEX IF NOT EXISTS idx_veiculos_status ON veiculos (status)",
+]
+
+
+def create_indexes(cur):
+    for ddl in INDICES:
+        cur.execute(ddl)
+    # Estatísticas atualizadas para o planner escolher os índices novos
+    for tabela in TABELAS:
+        cur.execute(f"ANALYZE {tabela}")
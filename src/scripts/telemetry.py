@@ -0,0 +1,391 @@
+# Ingestão de telemetria dos veículos (posição e sensores)
+#
+# Fluxo:
+#   fonte (arquivo de replay / socket TCP, uma mensagem JSON por linha)
+#     -> fila limitada (cheia = a fonte espera: backpressure)
+#     -> micro-lotes (até batch_size mensagens ou max_espera segundos)
+#     -> validação vetorizada (pandas)
+#     -> Firestore: só o estado mais recente de cada veículo, a cada firestore_segundos (veiculos_status);
+#        placas sem documento em veiculos_status são rejeitadas (não criam documentos parciais)
+#     -> Data Warehouse: histórico bruto, acumulado e carregado em bloco (tabela telemetria)
+#
+# Mensagem:
+#   {"placa": "ABC1D23", "ts": "2025-06-20T14:03:11Z", "latitude": -23.55, "longitude": -46.63,
+#    "velocidade": 72.5, "combustivel_nivel": 64, "temperatura_motor": 88, "km_atual": 152340}
+
+import json
+import os
+import queue
+import socketserver
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from bq_schema import SCHEMAS
+from fs_writer import BatchWriter
+from geo import geohash_encode
+
+TABELA = 'telemetria'
+SCHEMA = SCHEMAS[TABELA]
+CAMPOS = [nome for nome, _, _ in SCHEMA]
+NUMERICOS = [nome for nome, tipo, _ in SCHEMA if tipo in ('FLOAT', 'INTEGER')]
+
+# Faixas válidas (fora delas a mensagem é descartada)
+LIMITES = {
+    'latitude': (-90, 90),
+    'longitude': (-180, 180),
+    'velocidade': (0, 250),
+    'combustivel_nivel': (0, 100),
+    'temperatura_motor': (-40, 150),
+    'km_atual': (0, 10_000_000),
+}
+OBRIGATORIOS = ['placa', 'ts', 'latitude', 'longitude']
+
+# Placas desconhecidas fazem a lista de veiculos_status ser relida, no máximo a cada tantos segundos
+RECARGA_PLACAS_S = 300
+
+# Campos de veiculos_status atualizados pela telemetria
+CAMPOS_FIRESTORE = {
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'velocidade': 'velocidade_atual',
+    'combustivel_nivel': 'combustivel_nivel',
+    'temperatura_motor': 'temperatura_motor',
+    'km_atual': 'km_atual',
+}
+
+
+def validate_batch(linhas):
+    """Converte e valida um lote de linhas JSON. Devolve (DataFrame válido, nº de inválidas)."""
+    registros = []
+    for linha in linhas:
+        try:
+            registro = json.loads(linha)
+        except (ValueError, TypeError):
+            continue
+        if isinstance(registro, dict):
+            registros.append(registro)
+
+    df = pd.DataFrame.from_records(registros, columns=CAMPOS)
+    df['placa'] = df['placa'].astype('string').str.strip().fillna('')
+    df['ts'] = pd.to_datetime(df['ts'], utc=True, errors='coerce')
+    for campo in NUMERICOS:
+        df[campo] = pd.to_numeric(df[campo], errors='coerce')
+
+    validas = df[OBRIGATORIOS].notna().all(axis=1) & (df['placa'] != '')
+    for campo, (minimo, maximo) in LIMITES.items():
+        validas &= df[campo].isna() | df[campo].between(minimo, maximo)
+
+    df = df[validas]
+    df = df.assign(km_atual=df['km_atual'].round().astype('Int64'))
+    return df.reset_index(drop=True), len(linhas) - len(df)
+
+
+def latest_per_vehicle(df):
+    """Estado mais recente de cada veículo no lote (uma escrita por veículo)."""
+    return df.sort_values('ts', kind='stable').drop_duplicates('placa', keep='last')
+
+
+class TelemetryPipeline:
+    def __init__(self, db=None, backend=None, batch_size=5_000, max_espera=0.5, tamanho_fila=50_000,
+                 firestore_segundos=2.0, warehouse_linhas=200_000, warehouse_segundos=30.0,
+                 motor_alertas=None, metricas=None):
+        self.db = db
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_espera = max_espera
+        self.firestore_segundos = firestore_segundos
+        # Opcional: alert_rules.AlertEngine avaliado sobre os estados enviados ao Firestore
+        self.motor_alertas = motor_alertas
+        self.metricas = metricas
+        self.warehouse_linhas = warehouse_linhas
+        self.warehouse_segundos = warehouse_segundos
+
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self._parar = threading.Event()
+        self._consumidor = None
+        self._writer = BatchWriter(db) if db is not None else None
+
+        # Estado mais recente por veículo ainda não enviado ao Firestore: vários
+        # reportes do mesmo veículo dentro da janela viram uma única escrita
+        self._pendentes = None
+        self._ultima_escrita = time.monotonic()
+
+        # Histórico para o warehouse: um envio em andamento por vez
+        self._buffer = []
+        self._buffer_linhas = 0
+        self._ultimo_envio = time.monotonic()
+        self._carga = ThreadPoolExecutor(max_workers=1) if backend is not None else None
+        self._carga_pendente = None
+        if backend is not None:
+            backend.ensure_table(TABELA, SCHEMA)
+
+        self._ultimo_ts = {}  # placa -> ts já enviado ao Firestore (descarta mensagens atrasadas)
+        self._placas = None  # ids de veiculos_status (só estas placas são atualizadas)
+        self._placas_lidas_em = float('-inf')
+        self._lock = threading.Lock()
+        self._inicio = None
+        self._fim = None
+        self._contadores = {
+            'recebidas': 0, 'validas': 0, 'invalidas': 0, 'lotes': 0,
+            'atualizacoes_firestore': 0, 'linhas_warehouse': 0, 'cargas_warehouse': 0,
+            'fila_pico': 0, 'espera_backpressure_s': 0.0, 'alertas_alterados': 0,
+            'placas_desconhecidas': 0,
+        }
+
+    # --- entrada ---
+
+    def submit(self, linha):
+        """Enfileira uma mensagem; bloqueia enquanto a fila estiver cheia."""
+        try:
+            self.fila.put_nowait(linha)
+        except queue.Full:
+            inicio = time.perf_counter()
+            self.fila.put(linha)
+            with self._lock:
+                self._contadores['espera_backpressure_s'] += time.perf_counter() - inicio
+        with self._lock:
+            self._contadores['recebidas'] += 1
+            self._contadores['fila_pico'] = max(self._contadores['fila_pico'], self.fila.qsize())
+
+    # --- processamento ---
+
+    def _proximo_lote(self):
+        try:
+            linhas = [self.fila.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        prazo = time.monotonic() + self.max_espera
+        while len(linhas) < self.batch_size:
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                linhas.append(self.fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return linhas
+
+    def _consumir(self):
+        while not (self._parar.is_set() and self.fila.empty()):
+            linhas = self._proximo_lote()
+            if linhas:
+                self._processar(linhas)
+                continue
+            if self._pendentes is not None and time.monotonic() - self._ultima_escrita >= self.firestore_segundos:
+                self._atualizar_firestore()
+            if self._buffer and time.monotonic() - self._ultimo_envio >= self.warehouse_segundos:
+                self._enviar_warehouse()
+
+    def _processar(self, linhas):
+        df, invalidas = validate_batch(linhas)
+        with self._lock:
+            self._contadores['lotes'] += 1
+            self._contadores['validas'] += len(df)
+            self._contadores['invalidas'] += invalidas
+        if df.empty:
+            return
+
+        if self._writer is not None:
+            ultimos = df if self._pendentes is None else pd.concat([self._pendentes, df], ignore_index=True)
+            self._pendentes = latest_per_vehicle(ultimos)
+            if time.monotonic() - self._ultima_escrita >= self.firestore_segundos:
+                self._atualizar_firestore()
+
+        if self.backend is not None:
+            self._buffer.append(df)
+            self._buffer_linhas += len(df)
+            if (self._buffer_linhas >= self.warehouse_linhas
+                    or time.monotonic() - self._ultimo_envio >= self.warehouse_segundos):
+                self._enviar_warehouse()
+
+    def _placas_conhecidas(self, placas):
+        """Filtro das placas com documento em veiculos_status. A lista de ids é lida uma vez
+        e relida (no máximo a cada RECARGA_PLACAS_S) quando aparece uma placa desconhecida."""
+        desconhecidas = self._placas is None or not placas.isin(self._placas).all()
+        if desconhecidas and time.monotonic() - self._placas_lidas_em >= RECARGA_PLACAS_S:
+            self._placas = {ref.id for ref in self.db.collection('veiculos_status').list_documents()}
+            self._placas_lidas_em = time.monotonic()
+        return placas.isin(self._placas)
+
+    def _atualizar_firestore(self):
+        ultimos, self._pendentes = self._pendentes, None
+        self._ultima_escrita = time.monotonic()
+        if ultimos is None:
+            return
+        # set(merge=True) numa placa sem cadastro criaria um documento só com a telemetria
+        conhecidas = self._placas_conhecidas(ultimos['placa'])
+        with self._lock:
+            self._contadores['placas_desconhecidas'] += int((~conhecidas).sum())
+        ultimos = ultimos[conhecidas]
+        anterior = pd.to_datetime(ultimos['placa'].map(self._ultimo_ts), utc=True)
+        novos = ultimos[anterior.isna() | (ultimos['ts'] > anterior)]
+        # Geohash da nova posição (consultas por região no Firestore, ver geo.py)
+        novos = novos.assign(geohash=geohash_encode(novos['latitude'].to_numpy(), novos['longitude'].to_numpy()))
+        colecao = self.db.collection('veiculos_status')
+        for registro in novos.to_dict('records'):
+            dados = {destino: registro[origem] for origem, destino in CAMPOS_FIRESTORE.items()
+                     if not pd.isna(registro[origem])}
+            if 'km_atual' in dados:
+                dados['km_atual'] = int(dados['km_atual'])
+            dados['geohash'] = registro['geohash']
+            dados['ultima_atualizacao'] = registro['ts'].to_pydatetime()
+            self._writer.set(colecao.document(registro['placa']), dados, merge=True)
+        self._ultimo_ts.update(zip(novos['placa'], novos['ts']))
+        if self.motor_alertas is not None:
+            estados = novos.rename(columns={o: d for o, d in CAMPOS_FIRESTORE.items() if o != d})
+            alteracoes = self.motor_alertas.apply(self.db, self._writer, estados, self.metricas)
+            with self._lock:
+                self._contadores['alertas_alterados'] += sum(alteracoes.values())
+        # Espera os commits do lote: se o Firestore ficar lento, a fila enche e a fonte espera
+        self._writer.flush()
+        if self.metricas is not None:
+            self.metricas.flush()
+        with self._lock:
+            self._contadores['atualizacoes_firestore'] += len(novos)
+
+    def _enviar_warehouse(self):
+        if not self._buffer:
+            return
+        df = pd.concat(self._buffer, ignore_index=True)
+        self._buffer, self._buffer_linhas = [], 0
+        self._ultimo_envio = time.monotonic()
+        # No máximo uma carga em andamento: a próxima espera a anterior terminar
+        if self._carga_pendente is not None:
+            self._carga_pendente.result()
+        self._carga_pendente = self._carga.submit(self._carregar, df.sort_values(['ts', 'placa'], kind='stable'))
+
+    def _carregar(self, df):
+        with tempfile.TemporaryDirectory(prefix='telemetria_') as tmpdir:
+            caminho = os.path.join(tmpdir, 'telemetria.parquet')
+            df.to_parquet(caminho, index=False)
+            self.backend.load_file(TABELA, caminho, SCHEMA)
+        with self._lock:
+            self._contadores['linhas_warehouse'] += len(df)
+            self._contadores['cargas_warehouse'] += 1
+
+    # --- ciclo de vida ---
+
+    def start(self):
+        self._inicio = time.perf_counter()
+        self._consumidor = threading.Thread(target=self._consumir, name='telemetria', daemon=True)
+        self._consumidor.start()
+        return self
+
+    def stop(self):
+        """Processa o que ainda está na fila, descarrega o histórico e encerra."""
+        self._parar.set()
+        self._consumidor.join()
+        try:
+            if self._writer is not None:
+                self._atualizar_firestore()
+            self._enviar_warehouse()
+            if self._carga_pendente is not None:
+                self._carga_pendente.result()
+        finally:
+            if self._carga is not None:
+                self._carga.shutdown()
+            if self._writer is not None:
+                self._writer.close()
+            self._fim = time.perf_counter()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        segundos = (self._fim or time.perf_counter()) - (self._inicio or time.perf_counter())
+        with self._lock:
+            stats = dict(self._contadores)
+        stats['fila_atual'] = self.fila.qsize()
+        stats['segundos'] = segundos
+        stats['mensagens_por_segundo'] = stats['validas'] / segundos if segundos > 0 else 0.0
+        return stats
+
+
+# --- fontes ---
+
+def replay_file(pipeline, caminho, taxa=None):
+    """Envia as linhas de um arquivo JSONL; taxa = mensagens/s (None = o mais rápido possível)."""
+    inicio = time.perf_counter()
+    with open(caminho, encoding='utf-8') as arquivo:
+        for n, linha in enumerate(arquivo, 1):
+            linha = linha.strip()
+            if linha:
+                pipeline.submit(linha)
+            if taxa:
+                adiantado = n / taxa - (time.perf_counter() - inicio)
+                if adiantado > 0:
+                    time.sleep(adiantado)
+
+
+def serve_socket(pipeline, host='0.0.0.0', porta=9009):
+    """Servidor TCP: cada conexão envia mensagens JSON, uma por linha. Com a fila
+    cheia a leitura para e o TCP segura os clientes (backpressure ponta a ponta)."""
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for linha in self.rfile:
+                linha = linha.strip()
+                if linha:
+                    pipeline.submit(linha.decode('utf-8', errors='replace'))
+
+    class Servidor(socketserver.ThreadingTCPServer):
+        allow_reuse_address = True
+        daemon_threads = True
+
+    return Servidor((host, porta), Handler)
+
+
+def generate_replay(caminho, placas, mensagens, inicio=None, intervalo_s=5, invalidas=0.001, seed=42):
+    """Gera um arquivo de replay: cada veículo envia uma mensagem a cada intervalo_s
+    segundos, com posição em passeio aleatório. Uma fração das linhas é inválida."""
+    rng = np.random.default_rng(seed)
+    placas = np.asarray(placas)
+    n = len(placas)
+    inicio = pd.Timestamp(inicio or pd.Timestamp.now(tz='UTC').floor('s'))
+
+    indice = np.arange(mensagens)
+    veiculo = indice % n
+    rodada = indice // n
+    lat0 = -23.5505 + rng.uniform(-2, 2, n)
+    lng0 = -46.6333 + rng.uniform(-2, 2, n)
+    passo = rng.normal(0, 0.002, (mensagens, 2))
+    # Passeio aleatório por veículo: soma acumulada dos passos de cada um
+    deslocamento = pd.DataFrame(passo).groupby(veiculo).cumsum().to_numpy()
+
+    df = pd.DataFrame({
+        'placa': placas[veiculo],
+        'ts': inicio + pd.to_timedelta(rodada * intervalo_s + rng.uniform(0, 1, mensagens), unit='s'),
+        'latitude': np.round(lat0[veiculo] + deslocamento[:, 0], 6),
+        'longitude': np.round(lng0[veiculo] + deslocamento[:, 1], 6),
+        'velocidade': np.round(np.clip(rng.normal(70, 20, mensagens), 0, 120), 1),
+        'combustivel_nivel': np.round(np.clip(100 - rodada * 0.05 - rng.uniform(0, 60, n)[veiculo], 0, 100), 1),
+        'temperatura_motor': np.round(rng.normal(88, 4, mensagens), 1),
+        'km_atual': (rng.integers(10_000, 300_000, n)[veiculo] + rodada * intervalo_s * 70 // 3600).astype(int),
+    })
+    df['ts'] = df['ts'].dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    linhas = df.to_json(orient='records', lines=True, force_ascii=False).splitlines()
+
+    ruins = rng.choice(mensagens, int(mensagens * invalidas), replace=False) if invalidas else []
+    for i in ruins:
+        linhas[i] = linhas[i].replace('"latitude":', '"latitude":999,"_":') if i % 2 else '{mensagem quebrada'
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        arquivo.write('\n'.join(linhas) + '\n')
+    return len(linhas)
+
+
+def print_stats(stats):
+    print(f"  📡 {stats['recebidas']:,} recebidas, {stats['validas']:,} válidas, {stats['invalidas']:,} inválidas "
+          f"em {stats['segundos']:.2f}s ({stats['mensagens_por_segundo']:,.0f} msgs/s, {stats['lotes']} lotes)")
+    print(f"  🔥 Firestore: {stats['atualizacoes_firestore']:,} atualizações (estado mais recente por veículo), "
+          f"{stats['alertas_alterados']:,} alertas criados/escalados/resolvidos")
+    if stats['placas_desconhecidas']:
+        print(f"  ⚠️  {stats['placas_desconhecidas']:,} estado(s) de placas sem documento em veiculos_status descartado(s)")
+    print(f"  🏢 Warehouse: {stats['linhas_warehouse']:,} linhas em {stats['cargas_warehouse']} carga(s)")
+    print(f"  🚦 Fila: pico de {stats['fila_pico']:,} mensagens, {stats['espera_backpressure_s']:.2f}s de espera da fonte")
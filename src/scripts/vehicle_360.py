@@ -0,0 +1,133 @@
+# Visão 360° do veículo (consulta 10 de consultas_demo.sql)
+#
+# As três fontes são consultadas ao mesmo tempo, cada uma com seu timeout:
+#   - PostgreSQL: dados básicos + últimas viagens
+#   - BigQuery: métricas agregadas (analise_por_veiculo) e ranking de km
+#   - Firestore: status em tempo real + alertas ativos
+#
+# A latência total fica próxima da fonte mais lenta (e nunca passa do maior
+# timeout). Uma fonte que falha ou estoura o tempo volta como None, com o motivo
+# em 'erros' e 'parcial' = True; as outras são devolvidas normalmente.
+
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+from google.cloud import bigquery
+
+from db import BQ_DATASET, get_bigquery_client, get_firestore_client, pg_connection
+
+TIMEOUTS = {'postgres': 2.0, 'bigquery': 10.0, 'firestore': 3.0}
+ULTIMAS_VIAGENS = 10
+
+# Compartilhado entre as chamadas: evita criar threads a cada consulta
+_executor = ThreadPoolExecutor(max_workers=12, thread_name_prefix='visao360')
+
+
+def fetch_postgres(placa, timeout):
+    with pg_connection(timeout=timeout) as conn, conn.cursor() as cur:
+        # Garante que a consulta não fica presa no servidor depois do timeout
+        cur.execute("SET LOCAL statement_timeout = %s", (int(timeout * 1000),))
+        cur.execute("""
+            SELECT id, placa, modelo, tipo, ano, km_atual, capacidade_carga, consumo_medio, status
+            FROM veiculos
+            WHERE placa = %s
+        """, (placa,))
+        linha = cur.fetchone()
+        if linha is None:
+            return None
+        veiculo = dict(zip([c.name for c in cur.description], linha))
+
+        cur.execute("""
+            SELECT v.id, v.data_saida, v.data_chegada, v.origem, v.destino, v.km_percorridos,
+                   v.custo_combustivel, m.nome as motorista
+            FROM viagens v
+            LEFT JOIN motoristas m ON m.id = v.motorista_id
+            WHERE v.veiculo_id = %s
+            ORDER BY v.data_saida DESC
+            LIMIT %s
+        """, (veiculo['id'], ULTIMAS_VIAGENS))
+        colunas = [c.name for c in cur.description]
+        veiculo['ultimas_viagens'] = [dict(zip(colunas, l)) for l in cur.fetchall()]
+        return veiculo
+
+
+def fetch_bigquery(placa, timeout):
+    client = get_bigquery_client()
+    query = f"""
+    SELECT * FROM (
+        SELECT
+            *,
+            RANK() OVER (ORDER BY km_total DESC) as ranking_km,
+            COUNT(*) OVER () as total_veiculos
+        FROM `{BQ_DATASET}.analise_por_veiculo`
+    )
+    WHERE placa = @placa
+    """
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter('placa', 'STRING', placa)])
+    linhas = list(client.query(query, job_config=job_config, timeout=timeout).result(timeout=timeout))
+    return dict(linhas[0].items()) if linhas else None
+
+
+def fetch_firestore(placa, timeout):
+    db = get_firestore_client()
+    status = db.collection('veiculos_status').document(placa).get(timeout=timeout)
+    alertas = db.collection('alertas').where('placa', '==', placa).stream(timeout=timeout)
+    return {
+        'status': status.to_dict() if status.exists else None,
+        'alertas': [doc.to_dict() for doc in alertas],
+    }
+
+
+FONTES = {
+    'postgres': fetch_postgres,
+    'bigquery': fetch_bigquery,
+    'firestore': fetch_firestore,
+}
+
+
+def _medir(funcao, placa, timeout):
+    inicio = time.perf_counter()
+    resultado = funcao(placa, timeout)
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+def vehicle_360(placa, timeouts=None, fontes=None):
+    """Consulta as fontes em paralelo e consolida a visão do veículo.
+
+    Devolve {'placa', <fonte>: dados ou None, 'latencias_ms', 'erros', 'parcial', 'total_ms'}.
+    """
+    timeouts = {**TIMEOUTS, **(timeouts or {})}
+    fontes = fontes or list(FONTES)
+
+    inicio = time.perf_counter()
+    futuros = {fonte: _executor.submit(_medir, FONTES[fonte], placa, timeouts[fonte]) for fonte in fontes}
+
+    resultado = {'placa': placa, 'latencias_ms': {}, 'erros': {}}
+    # Espera cada fonte até o seu próprio prazo, contado a partir do disparo
+    for fonte in sorted(fontes, key=lambda f: timeouts[f]):
+        restante = max(0.0, inicio + timeouts[fonte] - time.perf_counter())
+        try:
+            dados, latencia = futuros[fonte].result(timeout=restante)
+            resultado[fonte] = dados
+            resultado['latencias_ms'][fonte] = latencia
+        except FuturesTimeout:
+            resultado[fonte] = None
+            resultado['latencias_ms'][fonte] = timeouts[fonte] * 1000
+            resultado['erros'][fonte] = f"timeout ({timeouts[fonte]:.1f}s)"
+        except Exception as e:
+            resultado[fonte] = None
+            resultado['latencias_ms'][fonte] = (time.perf_counter() - inicio) * 1000
+            resultado['erros'][fonte] = str(e)
+
+    resultado['parcial'] = bool(resultado['erros'])
+    resultado['total_ms'] = (time.perf_counter() - inicio) * 1000
+    return resultado
+
+
+def print_latencies(resultado):
+    soma = sum(resultado['latencias_ms'].values())
+    for fonte, latencia in sorted(resultado['latencias_ms'].items(), key=lambda item: -item[1]):
+        marca = f"❌ {resultado['erros'][fonte]}" if fonte in resultado['erros'] else "✅"
+        print(f"  ⏱️  {fonte:10s} {latencia:8.0f} ms {marca}")
+    print(f"  ⏱️  {'total':10s} {resultado['total_ms']:8.0f} ms (em sequência seriam ~{soma:.0f} ms)")
@@ -0,0 +1,122 @@
+# Sincronização incremental PostgreSQL -> Data Warehouse
+#
+# Para cada tabela, o warehouse guarda uma marca d'água (high-water mark) com o
+# maior atualizado_em já sincronizado. Cada execução lê do PostgreSQL só as
+# linhas alteradas depois da marca, com cursor do lado do servidor (sem trazer a
+# tabela inteira para a memória), grava os blocos em Parquet e aplica todos de uma
+# vez: uma staging recebe os blocos e um único MERGE pelo id atualiza a tabela (um
+# MERGE por bloco releria a tabela de destino inteira a cada bloco). A marca só é
+# gravada depois do MERGE; uma execução interrompida recomeça da marca anterior.
+# Nas tabelas de bq_schema.ANTERIORES (viagens), os valores antigos das colunas que
+# definem as chaves dos agregados são guardados antes do MERGE (bq_aggregates.py).
+#
+# Sem marca (primeira sincronização depois do 03_setup_bigquery.py), a leitura
+# parte do maior atualizado_em que o warehouse já tem. Tabelas carregadas do lake
+# não têm atualizado_em: aí entram só as linhas com id acima do maior existente, e
+# alterações feitas no PostgreSQL entre o setup e a primeira sincronização não são
+# trazidas (rode a primeira sincronização logo depois do setup).
+#
+# atualizado_em vem do now() do trigger, que é o início da transação: uma transação
+# longa que confirma depois de uma sincronização grava linhas "mais antigas" que a
+# marca já salva. Por isso a leitura volta SYNC_ATRASO_S segundos antes da marca
+# (o MERGE é idempotente; reler linhas já sincronizadas não muda nada). Transações
+# mais longas que esse atraso ainda podem escapar: aumente-o se for o caso.
+
+import os
+import tempfile
+import time
+
+import pandas as pd
+from psycopg2 import sql
+
+from bq_loader import partition_sorted, typed_chunk
+from bq_schema import ANTERIORES
+
+CHUNK_ROWS = 200_000
+SYNC_ATRASO_S = int(os.getenv('SYNC_ATRASO_S', '300'))
+
+# viagens e eventos também são alteradas depois de inseridas (chegada, resolução)
+SYNC_TABELAS = {
+    'veiculos': {'coluna': 'atualizado_em'},
+    'motoristas': {'coluna': 'atualizado_em'},
+    'viagens': {'coluna': 'atualizado_em'},
+    'eventos': {'coluna': 'atualizado_em'},
+}
+
+
+def _texto_marca(valor):
+    # O warehouse devolve TIMESTAMP com fuso (UTC); no PostgreSQL a coluna é timestamp sem fuso
+    valor = pd.Timestamp(valor)
+    if valor.tzinfo is not None:
+        valor = valor.tz_convert('UTC').tz_localize(None)
+    return str(valor)
+
+
+def sync_table(conn, backend, tabela, schema, coluna, chunk_rows=CHUNK_ROWS, atraso_s=SYNC_ATRASO_S):
+    inicio = time.perf_counter()
+    backend.ensure_table(tabela, schema)
+    marca = backend.get_state(tabela)
+    desde_id = None
+    if marca is None:
+        # Primeira sincronização: parte do que a carga do setup já trouxe
+        maximo = backend.max_value(tabela, coluna)
+        if maximo is not None:
+            marca = _texto_marca(maximo)
+        else:
+            # Carregada do lake (atualizado_em nulo): só as linhas novas, pelo id
+            desde_id = backend.max_value(tabela, 'id')
+    colunas = [nome for nome, _, _ in schema]
+
+    query = sql.SQL("SELECT {colunas}, {coluna} AS _marca FROM {tabela}").format(
+        colunas=sql.SQL(', ').join(map(sql.Identifier, colunas)),
+        coluna=sql.Identifier(coluna),
+        tabela=sql.Identifier(tabela),
+    )
+    params = []
+    if marca is not None:
+        # >= e com atraso: várias linhas podem ter o mesmo atualizado_em, e transações
+        # longas confirmam linhas com atualizado_em anterior à marca (o MERGE é idempotente)
+        query += sql.SQL(" WHERE {} >= %s::timestamp - make_interval(secs => %s)").format(sql.Identifier(coluna))
+        params.extend([marca, atraso_s])
+    elif desde_id is not None:
+        query += sql.SQL(" WHERE id > %s")
+        params.append(int(desde_id))
+    query += sql.SQL(" ORDER BY {}").format(sql.Identifier(coluna))
+
+    linhas = 0
+    caminhos = []
+    with tempfile.TemporaryDirectory(prefix=f'sync_{tabela}_') as tmpdir:
+        # Cursor nomeado = cursor do lado do servidor
+        with conn.cursor(name=f'sync_{tabela}') as cur:
+            cur.itersize = chunk_rows
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                df = pd.DataFrame(rows, columns=colunas + ['_marca'])
+                caminho = os.path.join(tmpdir, f'{tabela}-{len(caminhos):05d}.parquet')
+                partition_sorted(typed_chunk(df[colunas], schema), tabela).to_parquet(caminho, index=False)
+                caminhos.append(caminho)
+                marca = str(df['_marca'].iloc[-1])
+                linhas += len(df)
+        conn.rollback()  # encerra a transação de leitura
+
+        if caminhos:
+            backend.merge_files(tabela, caminhos, schema, anteriores=ANTERIORES.get(tabela))
+            backend.set_state(tabela, coluna, marca)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'tabela': tabela,
+        'linhas': linhas,
+        'blocos': len(caminhos),
+        'marca': marca,
+        'segundos': segundos,
+        'linhas_por_segundo': linhas / segundos if segundos > 0 else 0.0,
+    }
+
+
+def print_stats(stats):
+    print(f"  - {stats['tabela']}: {stats['linhas']:,} linhas novas/alteradas "
+          f"em {stats['segundos']:.2f}s ({stats['linhas_por_segundo']:,.0f} linhas/s), marca = {stats['marca']}")
@@ -0,0 +1,96 @@
+# Refresh incremental dos agregados (bq_aggregates.py) sobre o warehouse local (DuckDB)
+#
+# Uso:
+#   python -m pytest tests
+#
+# O warehouse é montado a partir de data/lake, e as viagens alteradas chegam pelo mesmo
+# caminho da sincronização (merge_files, guardando os valores anteriores das chaves).
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scripts'))
+pytest.importorskip('duckdb')
+pytest.importorskip('google.cloud.bigquery')
+
+from bq_aggregates import AGREGADOS, refresh_aggregates  # noqa: E402
+from bq_loader import DuckDBBackend, typed_chunk  # noqa: E402
+from bq_local import DuckDBClient  # noqa: E402
+from bq_schema import ANTERIORES, SCHEMAS  # noqa: E402
+
+DS = 'frota_dw'
+
+
+@pytest.fixture
+def warehouse():
+    backend = DuckDBBackend()
+    client = DuckDBClient(con=backend.con)
+    client.attach_lake(materializar=True)
+    refresh_aggregates(client, DS, completo=True)
+    return backend, client
+
+
+def _viagem(backend, viagem_id, **alteracoes):
+    """Linha de viagens como o PostgreSQL devolve (datas sem fuso), com as alterações."""
+    df = backend.con.execute("SELECT * FROM viagens WHERE id = ?", [viagem_id]).df()
+    for coluna in ('data_saida', 'data_chegada'):
+        df[coluna] = df[coluna].dt.tz_convert('UTC').dt.tz_localize(None)
+    df['atualizado_em'] = pd.Timestamp('2025-07-02 10:00:00')
+    for coluna, valor in alteracoes.items():
+        df[coluna] = valor
+    return df
+
+
+def _sincronizar(backend, tmp_path, viagens):
+    """Aplica as linhas alteradas como warehouse_sync.sync_table."""
+    caminho = str(tmp_path / 'viagens.parquet')
+    typed_chunk(viagens, SCHEMAS['viagens']).to_parquet(caminho, index=False)
+    backend.merge_files('viagens', [caminho], SCHEMAS['viagens'], anteriores=ANTERIORES['viagens'])
+
+
+def _confere(client):
+    """Cada agregado materializado é igual ao cálculo completo."""
+    for nome, config in AGREGADOS.items():
+        chave = config['chave']
+        esperado = client.query(config['calculo'].format(ds=DS, filtro='TRUE')).to_dataframe()
+        esperado = esperado.drop(columns='atualizado_em').sort_values(chave).reset_index(drop=True)
+        atual = client.query(f"SELECT * FROM `{DS}.{nome}`").to_dataframe()
+        atual = atual[esperado.columns].sort_values(chave).reset_index(drop=True)
+        pd.testing.assert_frame_equal(atual, esperado, obj=nome)
+
+
+def test_viagem_alterada_recalcula_o_agregado(warehouse, tmp_path):
+    backend, client = warehouse
+    viagem = _viagem(backend, 1)
+    mes = viagem['data_saida'].iloc[0].strftime('%Y-%m')
+    km_antes = client.query(f"SELECT km_total FROM `{DS}.resumo_mensal` WHERE mes = '{mes}'").result()[0]['km_total']
+
+    _sincronizar(backend, tmp_path, _viagem(backend, 1, km_percorridos=viagem['km_percorridos'] + 100_000))
+    stats = refresh_aggregates(client, DS)
+
+    assert [s['chaves'] for s in stats] == [1, 1, 1]
+    km_depois = client.query(f"SELECT km_total FROM `{DS}.resumo_mensal` WHERE mes = '{mes}'").result()[0]['km_total']
+    assert km_depois == km_antes + 100_000
+    _confere(client)
+
+
+def test_viagem_que_muda_de_chave_recalcula_a_chave_antiga(warehouse, tmp_path):
+    backend, client = warehouse
+    viagem = _viagem(backend, 1)
+    veiculos, motoristas = backend.con.execute(
+        "SELECT (SELECT MAX(id) FROM veiculos), (SELECT MAX(id) FROM motoristas)").fetchone()
+
+    # Outro mês, outro veículo e outro motorista: as chaves antigas também perdem a viagem
+    _sincronizar(backend, tmp_path, _viagem(
+        backend, 1,
+        data_saida=viagem['data_saida'] - pd.Timedelta(days=62),
+        veiculo_id=viagem['veiculo_id'] % veiculos + 1,
+        motorista_id=viagem['motorista_id'] % motoristas + 1,
+    ))
+    stats = refresh_aggregates(client, DS)
+
+    assert [s['chaves'] for s in stats] == [2, 2, 2]
+    _confere(client)